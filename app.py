@@ -16,7 +16,9 @@ from src.controllers.utils import (
     initialize_session_state,
     process_user_input,
 )
-from src.models.data_manager import load_music_data
+from src.models.data_manager import load_track_store, refresh_track_store
+from src.models.dataset_registry import resolve_dataset
+from src.models.streaming_loader import ProgressiveDataset
 from src.views.sidebar import (
     export_chat_history,
     handle_sidebar_actions,
@@ -25,7 +27,11 @@ from src.views.sidebar import (
     sync_current_chat,
 )
 from src.views.styles import load_custom_css
-from src.views.ui_components import render_main_data_analysis, render_statistics
+from src.views.ui_components import (
+    isolated,
+    render_dashboard,
+    render_session_statistics,
+)
 
 st.set_page_config(
     page_title="Moodify AI",
@@ -34,6 +40,9 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Seconds between dashboard refreshes while the dataset is still loading
+LOADING_REFRESH_S = 5
+
 
 def main():
     """Main application function with minimalist design"""
@@ -75,7 +84,10 @@ def main():
 
     if st.session_state.df is None:
         with st.spinner("Loading database musik..."):
-            st.session_state.df = load_music_data()
+            st.session_state.df = load_track_store()
+    else:
+        # Versions written by other workers (delta ingestion) reach the shared handle
+        refresh_track_store()
 
     if st.session_state.agent is None and st.session_state.df is not None:
         with st.spinner("Setting up AI assistant..."):
@@ -85,6 +97,19 @@ def main():
     df = st.session_state.df
     agent = st.session_state.agent
 
+    isolated(render_chat)(df, agent)
+
+    st.markdown("---")
+
+    # While loading, the dashboard refreshes itself instead of waiting for a full rerun
+    loading = isinstance(df, ProgressiveDataset) and not df.finished
+    isolated(render_dataset_panel, run_every=LOADING_REFRESH_S if loading else None)(
+        df, loading
+    )
+
+
+def render_chat(df, agent):
+    """Chat history and input; a chat turn reruns only this part of the page"""
     for message in st.session_state.messages:
         if message["role"] == "user":
             st.markdown(
@@ -97,17 +122,47 @@ def main():
                 unsafe_allow_html=True,
             )
 
+    if st.session_state.get("show_statistics", True):
+        render_session_statistics()
+
     user_input = st.chat_input("Cerita mood kamu atau tanya tentang musik...")
     if user_input and df is not None and agent is not None:
         process_user_input(user_input, agent, df)
         sync_current_chat()
 
-    st.markdown("---")
 
-    if st.session_state.get("show_statistics", True) and df is not None:
-        render_statistics(df)
-        render_main_data_analysis(df)
+def render_dataset_panel(df, loading: bool):
+    """Loading notice and dashboard of the current dataset version"""
+    if isinstance(df, ProgressiveDataset) and not df.finished:
+        st.caption(
+            f"⏳ Database musik masih dimuat ({df.rows_loaded:,} lagu siap), rekomendasi sudah bisa dipakai."
+        )
+    elif loading:
+        # Loading finished or failed: one full run stops the refresh timer
+        st.rerun()
+    elif isinstance(df, ProgressiveDataset) and df.failed:
+        st.error(
+            f"❌ Database musik gagal dimuat ({df.rows_loaded:,} lagu tersedia): {df.error}"
+        )
+        if st.button("🔄 Muat ulang database", key="reload_dataset"):
+            # The loader starts a fresh load for a handle that failed
+            load_track_store.__wrapped__.clear()
+            st.session_state.df = None
+            st.session_state.agent = None
+            st.rerun()
+
+    if isinstance(df, ProgressiveDataset):
+        # Problems the background loader could not show itself
+        for message in df.metrics.warnings:
+            st.warning(message)
+        if df.complete and df.metrics.cache_error:
+            st.warning(
+                f"⚠️ Cache database gagal ditulis, data dilayani dari memori: {df.metrics.cache_error}"
+            )
 
+    dashboard_df = resolve_dataset(df)
+    if st.session_state.get("show_statistics", True) and dashboard_df is not None:
+        render_dashboard(dashboard_df)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,403 @@
+"""
+Benchmarks - Timing and quality harnesses for the recommendation pipeline
+Run through `python -m src.cli bench ...`; nothing in the app imports this module
+"""
+
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.config.app_config import (
+    INTENT_EXAMPLES,
+    INTENT_LOG_PATH,
+    MOOD_CONTEXT_BOOST,
+    MOOD_KEYWORDS,
+)
+from src.models.dataset_registry import resolve_dataset
+from src.models.ingest_schema import read_spotify_csv
+from src.models.intent_classifier import (
+    DIRECT_CONFIDENCE,
+    DIRECT_INTENTS,
+    IntentClassifier,
+    NgramCentroidClassifier,
+    is_agent_turn,
+    load_logged_turns,
+)
+from src.models.mood_scores import get_mood_scores
+from src.models.music_analyzer import (
+    MOOD_CRITERIA,
+    MOOD_RESOLVER,
+    get_song_recommendations,
+    get_song_recommendations_batch,
+)
+from src.models.sampling import gumbel_top_k, make_rng
+from src.models.similarity import get_similarity_index
+from src.models.track_store import TrackStore
+
+# LEGACY SAMPLER
+
+def get_diversified_recommendations(
+    df: pd.DataFrame,
+    mood: str,
+    n_recommendations: int = 5,
+    rng: Optional[np.random.Generator] = None,
+) -> pd.DataFrame:
+    """
+    Legacy sampler: genre-stratified weighted draws from a range-filtered frame
+    Kept as the baseline benchmark_recommendations compares against
+    """
+    if len(df) <= n_recommendations:
+        return df
+
+    rng = rng if rng is not None else make_rng()
+
+    recommendations = pd.DataFrame()
+
+    # 1. STRATIFIED SAMPLING by genre (if genre column exists)
+    if "track_genre" in df.columns or "genre" in df.columns:
+        genre_col = "track_genre" if "track_genre" in df.columns else "genre"
+        genre_counts = df[genre_col].value_counts()
+        top_genres = genre_counts.head(3).index.tolist()
+        songs_per_genre = max(1, n_recommendations // len(top_genres))
+
+        for genre in top_genres:
+            genre_songs = df[df[genre_col] == genre]
+            if not genre_songs.empty:
+                sampled = weighted_sample(
+                    genre_songs, min(songs_per_genre, len(genre_songs)), rng
+                )
+                recommendations = pd.concat([recommendations, sampled])
+
+    # 2. FILL REMAINING SLOTS with weighted random sampling
+    remaining_slots = n_recommendations - len(recommendations)
+    if remaining_slots > 0:
+        remaining_df = (
+            df[~df.index.isin(recommendations.index)]
+            if not recommendations.empty
+            else df
+        )
+        if not remaining_df.empty:
+            additional = weighted_sample(
+                remaining_df, min(remaining_slots, len(remaining_df)), rng
+            )
+            recommendations = pd.concat([recommendations, additional])
+
+    return recommendations.head(n_recommendations)
+
+def weighted_sample(
+    df: pd.DataFrame, n: int, rng: Optional[np.random.Generator] = None
+) -> pd.DataFrame:
+    """
+    Weighted sampling based on popularity with randomization factor
+    """
+    if len(df) <= n:
+        return df
+
+    rng = rng if rng is not None else make_rng()
+
+    # Use popularity for weighting if available
+    if "popularity" in df.columns:
+        # Normalize popularity to create weights
+        popularity = np.nan_to_num(df["popularity"].to_numpy(dtype=np.float64))
+        max_pop = popularity.max()
+
+        if max_pop > 0:
+            weights = popularity / max_pop
+        else:
+            weights = np.ones(len(df)) / len(df)
+
+        # Add random factor to avoid always picking the most popular
+        random_factor = rng.random(len(df)) * 0.4
+        combined_weights = weights * 0.6 + random_factor * 0.4
+
+        # One-shot weighted draw without replacement (Gumbel top-k, O(n))
+        positions = gumbel_top_k(combined_weights, n, rng)
+        return df.iloc[positions]
+    else:
+        # Simple random sampling if no popularity column
+        return df.iloc[rng.choice(len(df), size=n, replace=False)]
+
+# MOOD EXTRACTION AND RECOMMENDATIONS
+
+# Chat-style messages for benchmark_mood_extraction
+SAMPLE_MESSAGES = [
+    "Lagi sedih nih, abis putus sama pacar",
+    "mau lagu buat workout di gym pagi ini",
+    "analisis musik happy dong",
+    "siapa itu Taylor Swift?",
+    "pengen yang santai buat nemenin kerja sambil ngopi",
+    "lagi kangen masa lalu, rasanya bittersweet banget",
+    "rekomendasi lagu romantis buat dinner sama pasangan",
+    "hari ini biasa aja sih, gak ada yang spesial",
+]
+
+def benchmark_mood_extraction(
+    messages: Optional[List[str]] = None, repeats: int = 200
+) -> Dict[str, float]:
+    """
+    Per-message cost (µs) of the keyword-by-keyword substring scan, the compiled
+    matcher, and the memoized resolver (repeat lookups, as within one message)
+    """
+    messages = messages or SAMPLE_MESSAGES
+
+    def legacy_extract(text):
+        # Original loop: one substring search per context and mood keyword
+        text = text.lower()
+        mood_scores = {}
+        for keyword, boosted_mood in MOOD_CONTEXT_BOOST.items():
+            if keyword in text:
+                mood_scores[boosted_mood] = mood_scores.get(boosted_mood, 0) + 3
+        for mood, keywords in MOOD_KEYWORDS.items():
+            score = 0
+            for keyword in keywords:
+                if keyword in text:
+                    score += len(keyword.split())
+            mood_scores[mood] = mood_scores.get(mood, 0) + score
+        if mood_scores:
+            detected_mood = max(mood_scores.keys(), key=lambda x: mood_scores[x])
+            return detected_mood if mood_scores[detected_mood] > 0 else "neutral"
+        return "neutral"
+
+    report = {}
+    for label, extract in (
+        ("scan_us", legacy_extract),
+        ("matcher_us", MOOD_RESOLVER.matcher.best),
+        ("resolver_us", MOOD_RESOLVER.resolve),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for message in messages:
+                extract(message)
+        report[label] = round((time.perf_counter() - start) / (repeats * len(messages)) * 1e6, 2)
+
+    report["speedup"] = round(report["scan_us"] / report["matcher_us"], 1)
+    return report
+
+def benchmark_recommendations(
+    df, moods: Optional[List[str]] = None, n: int = 5, repeats: int = 20
+) -> pd.DataFrame:
+    """
+    Per-request latency (ms) of the legacy filter-and-scan path vs. mood-score ranking
+    """
+    df = resolve_dataset(df)
+    moods = moods or list(MOOD_CRITERIA)
+    frame = df.take(np.arange(len(df))) if isinstance(df, TrackStore) else df
+
+    def legacy_request(mood):
+        # Original pipeline: copy, chained masks, value_counts + per-genre scans
+        filtered_df = frame.copy()
+        for feature, (min_val, max_val) in MOOD_CRITERIA[mood].items():
+            if feature in frame.columns:
+                filtered_df = filtered_df[
+                    (filtered_df[feature] >= min_val) & (filtered_df[feature] <= max_val)
+                ]
+        if filtered_df.empty:
+            return []
+        return get_diversified_recommendations(filtered_df, mood, n).to_dict("records")
+
+    # Index build happens once at load time, keep it out of the timed loop
+    get_mood_scores(df, MOOD_CRITERIA)
+
+    rows = []
+    for mood in moods:
+        timings = {}
+        for label, request in (
+            ("legacy_ms", legacy_request),
+            ("scored_ms", lambda mood: get_song_recommendations(df, mood, n)),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                request(mood)
+            timings[label] = (time.perf_counter() - start) / repeats * 1000
+        rows.append({"mood": mood, **timings})
+
+    report = pd.DataFrame(rows).set_index("mood")
+    report["speedup"] = (report["legacy_ms"] / report["scored_ms"]).round(1)
+    return report.round(3)
+
+def benchmark_batch_recommendations(
+    df, n_requests: int = 1000, n: int = 5, seed: int = 0
+) -> Dict[str, float]:
+    """
+    Throughput of get_song_recommendations_batch vs. a loop of single calls
+    """
+    df = resolve_dataset(df)
+    rng = np.random.default_rng(seed)
+    moods = list(MOOD_CRITERIA)
+    requests = [
+        (f"user-{i}", moods[int(rng.integers(len(moods)))], n, ()) for i in range(n_requests)
+    ]
+
+    # Index build happens once at load time, keep it out of the timed runs
+    get_mood_scores(df, MOOD_CRITERIA)
+
+    start = time.perf_counter()
+    for _, mood, size, _ in requests:
+        get_song_recommendations(df, mood, size)
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_song_recommendations_batch(df, requests)
+    batch_s = time.perf_counter() - start
+
+    return {
+        "requests": n_requests,
+        "loop_s": round(loop_s, 4),
+        "batch_s": round(batch_s, 4),
+        "loop_rps": round(n_requests / loop_s, 1),
+        "batch_rps": round(n_requests / batch_s, 1),
+        "speedup": round(loop_s / batch_s, 1),
+    }
+
+# SIMILARITY
+
+def benchmark_similarity(data, n_queries: int = 50, k: int = 10, seed: int = 0) -> List[dict]:
+    """Per-query latency (ms) and recall@k of each index kind against the exact scan"""
+    rng = np.random.default_rng(seed)
+    queries = rng.integers(len(data), size=n_queries)
+    exact = get_similarity_index(data, "exact")
+    truth = [set(exact.search(exact.vector(q), k)[0].tolist()) for q in queries]
+
+    report = []
+    for kind in ("exact", "lsh"):
+        index = get_similarity_index(data, kind)
+        start = time.perf_counter()
+        results = [index.search(exact.vector(q), k)[0] for q in queries]
+        elapsed = (time.perf_counter() - start) / n_queries * 1000
+        recall = np.mean([len(t & set(r.tolist())) / k for t, r in zip(truth, results)])
+        report.append({"index": kind, "query_ms": round(elapsed, 3), "recall": round(recall, 3)})
+    return report
+
+# INTENT CLASSIFIER
+
+def seed_cross_validation(examples: Dict[str, List[str]] = INTENT_EXAMPLES) -> Dict:
+    """
+    Leave-one-out over the seed examples: each message is classified by a
+    model trained on all the others
+
+    direct_precision is the share of messages confident enough to skip the
+    agent whose intent was right, the number that sets DIRECT_CONFIDENCE.
+    """
+    texts = [text for texts in examples.values() for text in texts]
+    labels = [intent for intent, texts in examples.items() for _ in texts]
+
+    correct = direct = direct_correct = 0
+    for i, (text, label) in enumerate(zip(texts, labels)):
+        model = NgramCentroidClassifier().fit(texts[:i] + texts[i + 1 :], labels[:i] + labels[i + 1 :])
+        intent, confidence = model.predict(text)
+        correct += intent == label
+        if intent in DIRECT_INTENTS and confidence >= DIRECT_CONFIDENCE:
+            direct += 1
+            direct_correct += intent == label
+
+    return {
+        "examples": len(texts),
+        "intent_agreement": round(correct / len(texts), 3),
+        "direct": direct,
+        "direct_correct": direct_correct,
+        "direct_precision": round(direct_correct / direct, 3) if direct else None,
+    }
+
+def benchmark_intent_classifier(path: Optional[str] = INTENT_LOG_PATH) -> Dict:
+    """
+    Routing mix of logged traffic, and agreement with the agent's own tool
+    choice on the turns it answered
+
+    The classifier under test is trained on the seed examples only, so the
+    agent turns it is scored on are unseen. Routed turns have no agent label,
+    so answer quality on them is not scored here; seed_cross_validation gives
+    the direct precision. Mood agreement counts turns where the agent called
+    a mood tool.
+    """
+    logged = [turn for turn in load_logged_turns(path) if turn.get("text")]
+    if not logged:
+        return {"turns": 0}
+
+    routes = Counter(turn.get("route", "agent") for turn in logged)
+    turns = [turn for turn in logged if is_agent_turn(turn)]
+    report = {
+        "turns": len(logged),
+        "routes": dict(routes),
+        "routed_share": round(1 - routes["agent"] / len(logged), 3),
+    }
+    if not turns:
+        return report
+
+    classifier = IntentClassifier(INTENT_EXAMPLES, MOOD_KEYWORDS, MOOD_RESOLVER)
+    start = time.perf_counter()
+    predictions = [classifier.predict(turn["text"]) for turn in turns]
+    classifier_ms = (time.perf_counter() - start) / len(turns) * 1000
+
+    mood_turns = [(turn, p) for turn, p in zip(turns, predictions) if turn.get("mood")]
+    by_intent = defaultdict(list)
+    for turn, prediction in zip(turns, predictions):
+        by_intent[turn["intent"]].append(prediction.intent == turn["intent"])
+
+    report.update(
+        {
+            "agent_turns": len(turns),
+            "intent_agreement": round(
+                float(np.mean([p.intent == t["intent"] for t, p in zip(turns, predictions)])), 3
+            ),
+            "intent_agreement_by_intent": {
+                k: round(float(np.mean(v)), 3) for k, v in by_intent.items()
+            },
+            "mood_agreement": round(float(np.mean([p.mood == t["mood"] for t, p in mood_turns])), 3)
+            if mood_turns
+            else None,
+            # Agent turns the classifier would now answer directly
+            "would_route_share": round(
+                float(np.mean([p.direct for p in predictions])), 3
+            ),
+            "classifier_ms": round(classifier_ms, 3),
+            "agent_ms": round(float(np.mean([turn.get("latency_ms", 0) for turn in turns])), 1),
+        }
+    )
+    return report
+
+# MEMORY
+
+# Legacy loader rule: object columns below this unique ratio became category
+LEGACY_CATEGORY_RATIO = 0.5
+
+def build_dtype_report(file_path, nrows=None) -> pd.DataFrame:
+    """
+    Compare per-column memory of the legacy loader against the schema loader
+
+    The legacy loader parsed every column with default dtypes and then converted
+    object columns with < 50% unique values to category.
+    """
+    legacy_df = pd.read_csv(file_path, nrows=nrows, low_memory=False)
+    for col in legacy_df.select_dtypes(include=["object"]).columns:
+        if legacy_df[col].nunique() / len(legacy_df) < LEGACY_CATEGORY_RATIO:
+            legacy_df[col] = legacy_df[col].astype("category")
+
+    schema_df = read_spotify_csv(file_path, nrows=nrows)
+
+    legacy_bytes = legacy_df.memory_usage(deep=True, index=False)
+    schema_bytes = schema_df.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame(
+        {
+            "legacy_dtype": legacy_df.dtypes.astype(str),
+            "schema_dtype": schema_df.dtypes.astype(str),
+            "legacy_bytes": legacy_bytes,
+            "schema_bytes": schema_bytes,
+        }
+    )
+    # Columns dropped by usecols cost nothing under the schema
+    report["schema_dtype"] = report["schema_dtype"].fillna("(not loaded)")
+    report["schema_bytes"] = report["schema_bytes"].fillna(0).astype(np.int64)
+    report["saved_bytes"] = report["legacy_bytes"] - report["schema_bytes"]
+    report["saved_pct"] = (report["saved_bytes"] / report["legacy_bytes"] * 100).round(1)
+
+    total = report[["legacy_bytes", "schema_bytes", "saved_bytes"]].sum()
+    report.loc["TOTAL", ["legacy_bytes", "schema_bytes", "saved_bytes"]] = total
+    report.loc["TOTAL", "saved_pct"] = round(
+        total["saved_bytes"] / total["legacy_bytes"] * 100, 1
+    )
+
+    return report.sort_values("saved_bytes", ascending=False)
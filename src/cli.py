@@ -0,0 +1,157 @@
+"""
+Moodify CLI - Operational commands that run outside the Streamlit app
+Usage: python -m src.cli warmup [--file spotify_data.csv]
+       python -m src.cli ingest-delta PATH [--file spotify_data.csv]
+       python -m src.cli bench {moods,recommendations,batch,similarity,intents,dtypes} [--file spotify_data.csv]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from src import benchmarks
+from src.models.artifacts import ARTIFACT_DIR
+from src.models.dashboard_aggregates import get_dashboard_aggregates
+from src.models.data_manager import get_load_metrics, get_music_loader, ingest_delta
+from src.models.dataset_registry import resolve_dataset
+from src.models.mood_index import get_mood_index
+from src.models.mood_scores import get_mood_scores
+from src.models.music_analyzer import MOOD_CRITERIA
+from src.models.similarity import get_similarity_index
+from src.models.streaming_loader import ProgressiveDataset
+from src.models.track_store import TrackStore
+
+# Artifacts the app maps at startup instead of building on the first request
+WARMUP_STEPS = {
+    "mood_scores": lambda store: get_mood_scores(store, MOOD_CRITERIA),
+    "mood_index": lambda store: get_mood_index(store, MOOD_CRITERIA),
+    "similarity": lambda store: get_similarity_index(store, "exact"),
+    "similarity_lsh": lambda store: get_similarity_index(store, "lsh"),
+    "dashboard_aggregates": get_dashboard_aggregates,
+}
+
+# Benchmarks that run against the loaded dataset
+BENCHMARKS = {
+    "recommendations": benchmarks.benchmark_recommendations,
+    "batch": benchmarks.benchmark_batch_recommendations,
+    "similarity": benchmarks.benchmark_similarity,
+}
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+def _load_complete(file_path: str):
+    """Dataset handle for `file_path` once its load has finished"""
+    dataset = get_music_loader(file_path).handle()
+    if isinstance(dataset, ProgressiveDataset):
+        dataset.wait_until_complete()
+        if dataset.error is not None:
+            raise RuntimeError(f"Loading {file_path} failed: {dataset.error}")
+    if dataset is None:
+        raise RuntimeError(f"{file_path} could not be loaded")
+    return dataset
+
+def warmup(file_path: str = "spotify_data.csv") -> dict:
+    """Build the columnar cache and every versioned artifact for `file_path`"""
+    dataset = _load_complete(file_path)
+
+    store = resolve_dataset(dataset)
+    if not isinstance(store, TrackStore):
+        reason = get_music_loader(file_path).metrics.cache_error or "unknown error"
+        raise RuntimeError(
+            f"Columnar cache could not be written ({reason}); artifacts need a mapped store"
+        )
+
+    report = {"dataset": store.version, "rows": len(store), "load": get_load_metrics(file_path)}
+    steps = {}
+    for name, step in WARMUP_STEPS.items():
+        start = time.perf_counter()
+        step(store)
+        steps[name] = round(time.perf_counter() - start, 3)
+    report["artifacts_s"] = steps
+    report["artifacts_mb"] = round(_dir_size(os.path.join(store.path, ARTIFACT_DIR)) / 1e6, 1)
+    return report
+
+def ingest(delta_path: str, file_path: str = "spotify_data.csv") -> dict:
+    """
+    Apply a delta CSV/JSONL to the dataset and its cache
+
+    Apps already running pick the new cache version up on their next rerun
+    (refresh_track_store) and keep serving the old one until then.
+    """
+    if not os.path.exists(delta_path):
+        raise FileNotFoundError(delta_path)
+
+    return ingest_delta(_load_complete(file_path), delta_path, file_path)
+
+def bench(name: str, file_path: str = "spotify_data.csv"):
+    """Run one benchmark harness; the dataset is loaded only for those that need it"""
+    if name == "moods":
+        return benchmarks.benchmark_mood_extraction()
+    if name == "intents":
+        return {
+            "seed_cross_validation": benchmarks.seed_cross_validation(),
+            "logged_turns": benchmarks.benchmark_intent_classifier(),
+        }
+    if name == "dtypes":
+        return benchmarks.build_dtype_report(file_path)
+    return BENCHMARKS[name](resolve_dataset(_load_complete(file_path)))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="moodify")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warmup_parser = commands.add_parser(
+        "warmup", help="prebuild the dataset cache and derived artifacts before serving"
+    )
+    warmup_parser.add_argument("--file", default="spotify_data.csv", help="source CSV")
+    delta_parser = commands.add_parser(
+        "ingest-delta", help="apply new or changed tracks (CSV/JSONL keyed by track_id)"
+    )
+    delta_parser.add_argument("path", help="delta file")
+    delta_parser.add_argument("--file", default="spotify_data.csv", help="source CSV")
+    bench_parser = commands.add_parser("bench", help="time a part of the pipeline")
+    bench_parser.add_argument(
+        "name", choices=["moods", "intents", "dtypes", *BENCHMARKS], help="benchmark to run"
+    )
+    bench_parser.add_argument("--file", default="spotify_data.csv", help="source CSV")
+
+    args = parser.parse_args(argv)
+    if args.command == "warmup":
+        try:
+            report = warmup(args.file)
+        except Exception as e:
+            print(f"warmup failed: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(report, indent=2))
+    elif args.command == "ingest-delta":
+        try:
+            summary = ingest(args.path, args.file)
+        except Exception as e:
+            print(f"ingest-delta failed: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(summary, indent=2, default=str))
+        # Applied, but only in memory: the next start would not have it
+        if summary.get("applied") and not summary.get("cache_written"):
+            return 1
+    elif args.command == "bench":
+        try:
+            report = bench(args.name, args.file)
+        except Exception as e:
+            print(f"bench failed: {e}", file=sys.stderr)
+            return 1
+        if isinstance(report, pd.DataFrame):
+            print(report.to_string())
+        else:
+            print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
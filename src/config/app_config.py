@@ -3,8 +3,26 @@ Application configuration - Constants and configuration settings
 Defines mood keywords, settings, and application constants
 """
 
+import os
+
 # CONFIGURATION & CONSTANTS
 
+# Execution engine for mood filtering: "pandas" (reference) or "polars"
+QUERY_BACKEND = os.getenv("MOODIFY_QUERY_BACKEND", "pandas")
+
+# Nearest-neighbour index for "songs like this": "exact" (BLAS scan) or "lsh"
+SIMILARITY_INDEX = os.getenv("MOODIFY_SIMILARITY_INDEX", "exact")
+
+# Where LFS objects are downloaded from when spotify_data.csv is only a pointer
+LFS_MEDIA_URL = os.getenv(
+    "MOODIFY_LFS_MEDIA_URL",
+    "https://media.githubusercontent.com/media/masuden0000/Celerates_Moodify/main",
+)
+
+# Seed for recommendation sampling; unset means fresh entropy per request
+_seed = os.getenv("MOODIFY_RECOMMENDATION_SEED")
+RECOMMENDATION_SEED = int(_seed) if _seed else None
+
 # Mood keywords for advanced mood detection
 MOOD_KEYWORDS = {
     "happy": [
@@ -327,6 +345,206 @@ MOOD_KEYWORDS = {
     ],
 }
 
+# Context keywords that add a strong hint for one mood
+MOOD_CONTEXT_BOOST = {
+    "workout": "energetic",
+    "gym": "energetic",
+    "olahraga": "energetic",
+    "party": "happy",
+    "galau": "sad",
+    "putus": "sad",
+    "sarapan": "happy",
+    "makan pagi": "happy",
+    "santai": "calm",
+    "relax": "calm",
+    "romantic": "romantic",
+    "cinta": "romantic",
+    # The agent's mood mapping (see its prompt table) where the keyword lists disagree
+    "semangat": "energetic",
+    "jogging": "energetic",
+    "kerja": "calm",
+    "belajar": "calm",
+    "fokus": "calm",
+    "rileks": "calm",
+    "istirahat": "calm",
+    "kangen": "romantic",
+    "rindu": "romantic",
+    "sayang": "romantic",
+    "valentine": "romantic",
+}
+
+# Weak activity hints (from the agent's old mood mapping); they only decide
+# when no mood keyword matched
+MOOD_HINTS = {
+    "makan": "happy",
+    "lapar": "happy",
+    "libur": "happy",
+    "suka": "happy",
+    "pagi": "energetic",
+    "bangun": "energetic",
+    "run": "energetic",
+    "jalan": "calm",
+    "macet": "calm",
+    "duduk": "calm",
+    "cape": "sad",
+    "bengong": "sad",
+    "pacar": "romantic",
+}
+
+# Other names for the canonical moods (keys of MOOD_KEYWORDS)
+MOOD_ALIASES = {
+    "energy": "energetic",
+    "energi": "energetic",
+    "enerjik": "energetic",
+    "senang": "happy",
+    "bahagia": "happy",
+    "sedih": "sad",
+    "tenang": "calm",
+    "romantis": "romantic",
+    "melankolis": "melancholic",
+    "netral": "neutral",
+}
+
+# Seed messages per chat intent for the local intent classifier; logged agent
+# turns (INTENT_LOG_PATH, when enabled) are added to these at startup
+INTENT_EXAMPLES = {
+    "recommend": [
+        "lagi sedih nih",
+        "lagi happy banget hari ini",
+        "rekomendasi lagu dong",
+        "kasih rekomendasi lagu buat workout",
+        "mau lagu buat nemenin belajar",
+        "putar lagu yang semangat",
+        "lagu buat galau dong",
+        "butuh lagu santai buat sore",
+        "recommend me some happy songs",
+        "suggest songs for a rainy day",
+        "lagu romantis buat pacar",
+        "playlist buat party",
+        "mood gw lagi jelek, kasih lagu",
+        "abis putus, pengen dengerin lagu",
+        "lagi capek pulang kerja",
+        "lagu yang enak buat tidur",
+        "ada lagu energik buat lari pagi",
+        "pengen lagu yang bikin tenang",
+        "lagi bete, butuh lagu",
+        "kasih lagu happy dong",
+        "lagi kangen mantan nih",
+        "putarin musik buat nyetir",
+        "songs for studying please",
+        "lagu buat jatuh cinta",
+    ],
+    "analyze": [
+        "analisis musik sad",
+        "analisis karakteristik musik sedih",
+        "analyze music with happy mood",
+        "bagaimana ciri musik happy",
+        "fitur audio lagu energetic",
+        "karakteristik lagu romantis",
+        "statistik musik calm",
+        "ciri-ciri lagu galau",
+        "analisis mood melancholic",
+        "what are the audio features of sad songs",
+        "jelaskan karakteristik musik tenang",
+        "rata-rata energy lagu happy",
+        "analisis lagu energetic dong",
+        "gimana karakteristik audio musik romantis",
+        "tempo rata-rata lagu sedih berapa",
+        "bedah fitur musik melancholic",
+        "analyze the danceability of happy music",
+        "statistik valence lagu galau",
+    ],
+    "similar": [
+        "lagu mirip blinding lights",
+        "lagu yang mirip shape of you",
+        "yang vibe-nya kayak lagu ini",
+        "songs like bohemian rhapsody",
+        "similar to someone like you",
+        "cari lagu mirip kayak yellow coldplay",
+        "lagu lain yang kayak perfect ed sheeran",
+        "rekomendasi lagu serupa dengan hello adele",
+        "lagu yang mirip sama lagu ini dong",
+        "ada lagu lain yang mirip bohemian rhapsody",
+        "carikan lagu mirip perfect",
+        "lagu sejenis fix you coldplay",
+        "more songs like this one",
+        "mirip kayak lagu yellow",
+    ],
+    "lyrics": [
+        "lirik lagu shape of you",
+        "cari lirik bohemian rhapsody",
+        "lyrics right now one direction",
+        "kata-kata lagu perfect",
+        "minta lirik someone like you",
+        "teks lagu yellow coldplay",
+        "chord dan lirik lagu hello",
+        "syair lagu bunga citra lestari",
+        "lirik fix you coldplay",
+        "liriknya lagu hello adele dong",
+        "lyrics of bohemian rhapsody",
+        "kasih lirik lagu perfect ed sheeran",
+        "mau tau lirik lagu ini",
+        "lirik lagu sheila on 7 dan",
+    ],
+    "search": [
+        "siapa itu taylor swift",
+        "info tentang band coldplay",
+        "cari info tentang ed sheeran",
+        "kapan album terbaru adele rilis",
+        "who is the lead singer of queen",
+        "berapa grammy yang dimenangkan beyonce",
+        "sejarah musik jazz",
+        "konser bruno mars di jakarta kapan",
+        "siapa penyanyi lagu hello",
+        "info album coldplay terbaru",
+        "siapa personel band sheila on 7",
+        "kapan the beatles terbentuk",
+        "taylor swift itu siapa",
+        "cari info tentang genre kpop",
+    ],
+    "identity": [
+        "kamu siapa",
+        "siapa kamu",
+        "nama kamu siapa",
+        "who are you",
+        "kamu bisa apa aja",
+        "kamu itu ai apa",
+        "what can you do",
+        "moodify itu apa",
+        "kamu bot apa",
+        "lo siapa sih",
+        "kamu dibuat siapa",
+        "apa yang bisa kamu lakukan",
+        "kenalin diri kamu dong",
+        "are you chatgpt",
+    ],
+    "chat": [
+        "halo",
+        "hai apa kabar",
+        "makasih ya",
+        "terima kasih banyak",
+        "oke sip",
+        "good morning",
+        "hari ini cuaca gimana",
+        "lo suka makan apa",
+        "ceritain lelucon dong",
+        "wkwk lucu banget",
+        "selamat pagi",
+        "oke makasih infonya",
+        "gimana kabarmu hari ini",
+        "hehe",
+        "siapa presiden indonesia",
+        "bantu kerjain pr matematika dong",
+    ],
+}
+
+# Opt-in log of chat turns (raw message, route or agent tool, latency) used to
+# train and evaluate the intent classifier; off unless MOODIFY_INTENT_LOG is a path
+INTENT_LOG_PATH = os.getenv("MOODIFY_INTENT_LOG") or None
+
+# Past this size the log rotates to "<path>.1", so at most two files are kept
+INTENT_LOG_MAX_BYTES = int(os.getenv("MOODIFY_INTENT_LOG_MAX_BYTES", 5 * 1024 * 1024))
+
 # Emoji mappings for moods and genres
 MOOD_EMOJIS = {
     "happy": "😊",
@@ -372,3 +590,10 @@ try:
     LLM_AVAILABLE = True
 except ImportError:
     LLM_AVAILABLE = False
+
+try:
+    import polars
+
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
@@ -0,0 +1,138 @@
+"""
+Agent tools - The functions behind the agent's tools
+Shared by the agent's tool wrappers and the intent router, which calls them without the LLM
+"""
+
+from typing import Dict, List, Sequence
+
+import pandas as pd
+
+from src.models.music_analyzer import (
+    analyze_mood_features,
+    format_similar_songs,
+    format_song_recommendations,
+    get_similar_songs,
+    get_song_recommendations,
+    resolve_mood,
+    search_music_info,
+)
+from src.services.debug_logger import log_error, log_system
+
+# Exact answer the agent prompt requires for "siapa kamu" questions
+IDENTITY_RESPONSE = "Gw adalah Moodify AI, asisten musikmu! 🎵 Gw di sini buat bantu lo nemuin lagu yang pas sama mood dan vibe lo. Mau dengerin musik apa hari ini?"
+
+
+class ToolResult(str):
+    """
+    A tool's formatted answer that also carries the songs it picked
+
+    Being a str, it is what the agent reads as the observation; the songs ride
+    along in the executor's intermediate steps, so the controller shows the
+    same songs as the text without sampling the dataset again.
+    """
+
+    def __new__(cls, text: str, songs: Sequence[Dict] = ()):
+        result = super().__new__(cls, text)
+        result.songs = list(songs)
+        return result
+
+    def __reduce__(self):
+        return ToolResult, (str(self), self.songs)
+
+    @property
+    def track_ids(self) -> List:
+        return [song.get("track_id") for song in self.songs if song.get("track_id") is not None]
+
+
+def tool_songs(result) -> List[Dict]:
+    """Songs a tool result carries ([] for plain text answers)"""
+    return list(getattr(result, "songs", ()))
+
+
+def songs_from_steps(intermediate_steps) -> List[Dict]:
+    """Songs of the last tool call in an agent turn that picked any"""
+    songs = []
+    for step in intermediate_steps or ():
+        if isinstance(step, (tuple, list)) and len(step) == 2:
+            songs = tool_songs(step[1]) or songs
+    return songs
+
+
+def validate_and_map_mood(mood_input: str) -> str:
+    """Validate and map input mood to valid mood categories"""
+    mood = resolve_mood(mood_input)
+    log_system(f"🎯 Mood mapping: '{mood_input}' -> '{mood}'")
+    return mood
+
+
+def recommend_songs(df: pd.DataFrame, mood: str) -> str:
+    """Recommend songs with proper formatting and error handling"""
+    try:
+        validated_mood = validate_and_map_mood(mood)
+        log_system(f"🎯 Mood validation: '{mood}' -> '{validated_mood}'")
+
+        songs = get_song_recommendations(df, validated_mood, 5)
+        result = format_song_recommendations(songs, validated_mood, validated_mood)
+
+        if not result or "tidak ada lagu" in result.lower():
+            return f"Waduh, gak ada lagu yang cocok untuk mood '{validated_mood}' nih 😅 Coba mood yang lain ya!"
+
+        return ToolResult(result.strip(), songs)
+
+    except Exception as e:
+        log_error(e, f"Error in recommend_songs with input: {mood}")
+        return f"Maaf, ada error saat cari lagu: {str(e)} 😅"
+
+
+def analyze_features(df: pd.DataFrame, mood: str) -> str:
+    """Analyze music features based on mood"""
+    try:
+        validated_mood = validate_and_map_mood(mood)
+        log_system(f"🎯 Analyze mood validation: '{mood}' -> '{validated_mood}'")
+
+        analysis_result = analyze_mood_features(df, validated_mood)
+        return analysis_result.strip()
+
+    except Exception as e:
+        log_error(e, f"Error in analyze_features with input: {mood}")
+        return f"Maaf, ada error saat analisis musik: {str(e)} 😅"
+
+
+def similar_songs(df: pd.DataFrame, query: str) -> str:
+    """Find songs that sound like a given song"""
+    try:
+        seed, songs = get_similar_songs(df, query, 5)
+        return ToolResult(format_similar_songs(seed, songs, query).strip(), songs)
+
+    except Exception as e:
+        log_error(e, f"Error in similar_songs with input: {query}")
+        return f"Maaf, ada error saat cari lagu yang mirip: {str(e)} 😅"
+
+
+def search_info(query: str) -> str:
+    """Search for music, artist, or band information"""
+    return search_music_info(query)
+
+
+def search_lyrics(query: str) -> str:
+    """Cari lirik lagu dengan Gemini AI correction dan web search"""
+    try:
+        from src.services.lyrics_service import (
+            extract_song_from_query,
+            search_lyrics_with_gemini,
+        )
+
+        # Extract song info from query
+        song_query = extract_song_from_query(query)
+
+        # Search with Gemini AI
+        result = search_lyrics_with_gemini(song_query)
+
+        # Return result directly tanpa additional processing
+        return result
+
+    except ImportError:
+        return "❌ Fitur pencarian lirik belum tersedia. Install google-generativeai dengan: pip install google-generativeai"
+    except Exception as e:
+        log_error(e, f"Error in search_lyrics with query: {query}")
+        return f"❌ Maaf, ada error saat mencari lirik: {str(e)}"
@@ -10,11 +10,7 @@ import pandas as pd
 import streamlit as st
 
 from src.config.app_config import LLM_AVAILABLE
-from src.models.music_analyzer import (
-    analyze_mood_features,
-    get_enhanced_recommendations,
-    search_music_info,
-)
+from src.models.dataset_registry import pin_dataset
 from src.services.agent_callback import create_debug_callback
 from src.services.debug_logger import (
     debug_logger,
@@ -28,91 +24,8 @@ from src.services.debug_logger import (
 )
 from src.services.tool_debugger import debug_tool
 
-
-def validate_and_map_mood(mood_input: str) -> str:
-    """Validate and map input mood to valid mood categories"""
-    VALID_MOODS = {"happy", "sad", "energy", "calm", "romantic", "neutral"}
-    mood_clean = mood_input.lower().strip()
-
-    if mood_clean in VALID_MOODS:
-        return mood_clean
-
-    # SPECIAL HANDLING: Check for "musik [mood]" patterns first
-    for valid_mood in VALID_MOODS:
-        if f"musik {valid_mood}" in mood_clean:
-            log_system(
-                f"🎯 Mood mapping: '{mood_input}' -> '{valid_mood}' (pattern: 'musik {valid_mood}')"
-            )
-            return valid_mood
-        # Also check for variations like "musik [mood]o" for typos
-        if f"musik {valid_mood}o" in mood_clean:
-            log_system(
-                f"🎯 Mood mapping: '{mood_input}' -> '{valid_mood}' (pattern: 'musik {valid_mood}o')"
-            )
-            return valid_mood
-
-    MOOD_MAPPING = {
-        "makan": "happy",
-        "makano": "happy",
-        "lapar": "happy",
-        "weekend": "happy",
-        "libur": "happy",
-        "senang": "happy",
-        "gembira": "happy",
-        "suka": "happy",
-        "bahagia": "happy",
-        "olahraga": "energy",
-        "gym": "energy",
-        "workout": "energy",
-        "pagi": "energy",
-        "semangat": "energy",
-        "bangun": "energy",
-        "jogging": "energy",
-        "run": "energy",
-        "jalan": "calm",
-        "macet": "calm",
-        "kerja": "calm",
-        "belajar": "calm",
-        "fokus": "calm",
-        "santai": "calm",
-        "rileks": "calm",
-        "tenang": "calm",
-        "duduk": "calm",
-        "istirahat": "calm",
-        "sedih": "sad",
-        "sediho": "sad",
-        "musik sedih": "sad",
-        "musik sediho": "sad",
-        "galau": "sad",
-        "hujan": "sad",
-        "patah hati": "sad",
-        "ambyar": "sad",
-        "kecewa": "sad",
-        "lelah": "sad",
-        "cape": "sad",
-        "bengong": "sad",
-        "pacar": "romantic",
-        "kangen": "romantic",
-        "cinta": "romantic",
-        "rindu": "romantic",
-        "sayang": "romantic",
-        "valentine": "romantic",
-        "rekomendasi": "neutral",
-        "saran": "neutral",
-        "musik": "neutral",
-        "lagu": "neutral",
-        "playlist": "neutral",
-    }
-
-    for keyword, mapped_mood in MOOD_MAPPING.items():
-        if keyword in mood_clean:
-            log_system(
-                f"🎯 Mood mapping: '{mood_input}' -> '{mapped_mood}' (keyword: '{keyword}')"
-            )
-            return mapped_mood
-
-    log_system(f"🎯 Mood defaulting to neutral: '{mood_input}' -> 'neutral'")
-    return "neutral"
+from . import agent_tools
+from .agent_tools import validate_and_map_mood
 
 
 def setup_ai_agent(df: pd.DataFrame):
@@ -173,7 +86,7 @@ def setup_ai_agent(df: pd.DataFrame):
             - **Smart Responder:** Kalau ada tool yang butuh konfirmasi (seperti typo correction), langsung kasih respons yang meminta konfirmasi ke user dengan jelas dan friendly.
           
         **Tugas Inti:**
-        1.  **Deteksi & Klasifikasi Vibe:** Tugas PERTAMA dan UTAMA adalah menganalisis input user (eksplisit & implisit) dan WAJIB mengklasifikasikannya menjadi **SATU** dari mood berikut: `happy`, `sad`, `energy`, `calm`, `romantic`, `neutral`.
+        1.  **Deteksi & Klasifikasi Vibe:** Tugas PERTAMA dan UTAMA adalah menganalisis input user (eksplisit & implisit) dan WAJIB mengklasifikasikannya menjadi **SATU** dari mood berikut: `happy`, `sad`, `energetic`, `calm`, `romantic`, `melancholic`, `neutral`.
         2.  **Rekomendasi Cerdas:** Setelah mood terdeteksi, gunakan tool yang sesuai untuk memberikan rekomendasi lagu yang cocok. Selalu kasih alasan singkat kenapa lo merekomendasikan itu.
         3.  **Analisis Musik:** Jelasin karakteristik lagu (beat, lirik, genre, instrumen) pake bahasa yang gampang dimengerti.
         4.  **Musicopedia:** Jadi ensiklopedia musik berjalan buat cari info soal artis, band, lagu, atau sejarah musik.
@@ -200,31 +113,32 @@ def setup_ai_agent(df: pd.DataFrame):
         
         **LOGIKA DETEKSI MOOD & KLASIFIKASI (WAJIB DIIKUTI)**
         
-        Sebelum melakukan apapun, tugas pertamamu adalah menerjemahkan input user menjadi **SATU** dari enam mood berikut: `happy`, `sad`, `energy`, `calm`, `romantic`, `neutral`. 
+        Sebelum melakukan apapun, tugas pertamamu adalah menerjemahkan input user menjadi **SATU** dari tujuh mood berikut: `happy`, `sad`, `energetic`, `calm`, `romantic`, `melancholic`, `neutral`. 
         
-        **PENTING:** Kamu HARUS menggunakan salah satu dari 6 mood ini saja, JANGAN menggunakan kata lain seperti "makan", "olahraga", "kerja", dll. Gunakan mood mapping yang benar:
+        **PENTING:** Kamu HARUS menggunakan salah satu dari 7 mood ini saja, JANGAN menggunakan kata lain seperti "makan", "olahraga", "kerja", dll. Gunakan mood mapping yang benar:
         
         **2. Tabel Referensi Mood Mapping:**
         | Aktivitas/Situasi User | Mood yang BENAR |
         | :--- | :--- |
         | "mau makan", "lapar", "makanan" | `happy` |
-        | "abis olahraga", "gym", "workout" | `energy` |
+        | "abis olahraga", "gym", "workout" | `energetic` |
         | "lagi di jalan", "macet", "kerja", "belajar" | `calm` |
         | "hujan", "galau", "sedih" | `sad` |
         | "mikirin dia", "kangen", "romantic" | `romantic` |
         | "rekomendasi lagu", "musik apa" | `neutral` |
         
-        **WAJIB:** Sebelum memanggil tool, pastikan input mood hanya salah satu dari: happy, sad, energy, calm, romantic, neutral
+        **WAJIB:** Sebelum memanggil tool, pastikan input mood hanya salah satu dari: happy, sad, energetic, calm, romantic, melancholic, neutral
         
         ---
         
         **CARA MENGGUNAKAN TOOLS (SANGAT PENTING!):**
         
-        Kamu memiliki 4 tools yang bisa digunakan:
+        Kamu memiliki 5 tools yang bisa digunakan:
         1. **recommend_songs** - untuk memberikan rekomendasi lagu berdasarkan mood
         2. **analyze_features** - untuk menganalisis fitur musik 
-        3. **search_info** - untuk mencari informasi tentang musik/artis
-        4. **search_lyrics** - untuk mencari lirik lagu dengan AI correction
+        3. **similar_songs** - untuk mencari lagu yang mirip dengan lagu tertentu
+        4. **search_info** - untuk mencari informasi tentang musik/artis
+        5. **search_lyrics** - untuk mencari lirik lagu dengan AI correction
         
         **ATURAN PEMANGGILAN TOOL:**
         - SELALU gunakan format: Action: [nama_tool]
@@ -260,65 +174,27 @@ def setup_ai_agent(df: pd.DataFrame):
         # Define tools dengan deskripsi yang lebih baik dan debugging        @debug_tool("recommend_songs")
         def recommend_songs(mood: str) -> str:
             """Recommend songs with proper formatting and error handling"""
-            try:
-                validated_mood = validate_and_map_mood(mood)
-                log_system(f"🎯 Mood validation: '{mood}' -> '{validated_mood}'")
-
-                result = get_enhanced_recommendations(df, validated_mood, 5)
-
-                if not result or "tidak ada lagu" in result.lower():
-                    return f"Waduh, gak ada lagu yang cocok untuk mood '{validated_mood}' nih 😅 Coba mood yang lain ya!"
-
-                return result.strip()
-
-            except Exception as e:
-                log_error(e, f"Error in recommend_songs with input: {mood}")
-                return f"Maaf, ada error saat cari lagu: {str(e)} 😅"
+            return agent_tools.recommend_songs(df, mood)
 
         @debug_tool("analyze_features")
         def analyze_features(mood: str) -> str:
             """Analyze music features based on mood"""
-            try:
-                validated_mood = validate_and_map_mood(mood)
-                log_system(
-                    f"🎯 Analyze mood validation: '{mood}' -> '{validated_mood}'"
-                )
-
-                analysis_result = analyze_mood_features(df, validated_mood)
-                return analysis_result.strip()
+            return agent_tools.analyze_features(df, mood)
 
-            except Exception as e:
-                log_error(e, f"Error in analyze_features with input: {mood}")
-                return f"Maaf, ada error saat analisis musik: {str(e)} 😅"
+        @debug_tool("similar_songs")
+        def similar_songs(query: str) -> str:
+            """Find songs that sound like a given song"""
+            return agent_tools.similar_songs(df, query)
 
         @debug_tool("search_info")
         def search_info(query: str) -> str:
             """Search for music, artist, or band information"""
-            return search_music_info(query)
+            return agent_tools.search_info(query)
 
         @debug_tool("search_lyrics")
         def search_lyrics(query: str) -> str:
             """Cari lirik lagu dengan Gemini AI correction dan web search"""
-            try:
-                from src.services.lyrics_service import (
-                    extract_song_from_query,
-                    search_lyrics_with_gemini,
-                )
-
-                # Extract song info from query
-                song_query = extract_song_from_query(query)
-
-                # Search with Gemini AI
-                result = search_lyrics_with_gemini(song_query)
-
-                # Return result directly tanpa additional processing
-                return result
-
-            except ImportError:
-                return "❌ Fitur pencarian lirik belum tersedia. Install google-generativeai dengan: pip install google-generativeai"
-            except Exception as e:
-                log_error(e, f"Error in search_lyrics with query: {query}")
-                return f"❌ Maaf, ada error saat mencari lirik: {str(e)}"
+            return agent_tools.search_lyrics(query)
 
         tools = [
             Tool(
@@ -326,16 +202,16 @@ def setup_ai_agent(df: pd.DataFrame):
                 func=recommend_songs,
                 description="""
                         WAJIB DIGUNAKAN ketika user meminta rekomendasi musik/lagu dalam bentuk apapun.
-                        PENTING: Input harus salah satu dari mood yang valid: happy, sad, energy, calm, romantic, neutral
+                        PENTING: Input harus salah satu dari mood yang valid: happy, sad, energetic, calm, romantic, melancholic, neutral
                         Jangan gunakan kata lain seperti "makan", "olahraga", "kerja" - gunakan mood mapping yang benar.
                         Keywords trigger: 'rekomendasi', 'rekomen', 'saranin', 'kasih tau lagu', 'mood', 'lagu buat', 'musik untuk'.
                         
                         Contoh penggunaan yang BENAR:
                         - User: "mau makan nih" -> Input: happy (karena makan = aktivitas menyenangkan)
-                        - User: "abis olahraga" -> Input: energy (karena butuh semangat)
+                        - User: "abis olahraga" -> Input: energetic (karena butuh semangat)
                         - User: "lagi galau" -> Input: sad (mood negatif)
                         
-                        Input: HANYA salah satu dari: happy, sad, energy, calm, romantic, neutral
+                        Input: HANYA salah satu dari: happy, sad, energetic, calm, romantic, melancholic, neutral
                         Output: Daftar rekomendasi lagu yang sudah diformat dengan penjelasan.
                         """,
             ),
@@ -351,13 +227,28 @@ def setup_ai_agent(df: pd.DataFrame):
                         - User: "analisis karakteristik musik sedih" -> Input: sad
                         - User: "bagaimana ciri musik happy" -> Input: happy
                         
-                        PENTING: Input harus salah satu dari mood yang valid: happy, sad, energy, calm, romantic, neutral
+                        PENTING: Input harus salah satu dari mood yang valid: happy, sad, energetic, calm, romantic, melancholic, neutral
                         Tool ini akan memberikan analisis statistik dan karakteristik audio dari musik dengan mood tertentu.
                         
-                        Input: HANYA salah satu dari: happy, sad, energy, calm, romantic, neutral
+                        Input: HANYA salah satu dari: happy, sad, energetic, calm, romantic, melancholic, neutral
                         Output: Analisis karakteristik musik yang sudah diformat dengan statistik dan contoh lagu.
                         """,
             ),
+            Tool(
+                name="similar_songs",
+                func=similar_songs,
+                description="""
+                        WAJIB DIGUNAKAN ketika user minta lagu yang MIRIP dengan lagu tertentu.
+                        Keywords trigger: 'lagu mirip', 'mirip kayak', 'yang kayak lagu', 'songs like', 'similar to'.
+                        
+                        Contoh penggunaan:
+                        - User: "lagu mirip Blinding Lights dong" -> Input: Blinding Lights
+                        - User: "yang vibe-nya kayak Shape of You - Ed Sheeran" -> Input: Shape of You - Ed Sheeran
+                        
+                        Input: judul lagu, boleh ditambah " - nama artis"
+                        Output: Daftar lagu dengan karakteristik audio paling mirip dari database.
+                        """,
+            ),
             Tool(
                 name="search_info",
                 func=search_info,
@@ -426,21 +317,25 @@ Action Input: musik sedih
 Action Input: musik sediho
 
 MOOD VALIDATION - ONLY USE THESE MOODS:
-Valid moods: happy, sad, energy, calm, romantic, neutral
+Valid moods: happy, sad, energetic, calm, romantic, melancholic, neutral
 
 MOOD MAPPING EXAMPLES:
 - "mau makan" -> use "happy" (not "makan")
-- "abis olahraga" -> use "energy" (not "olahraga") 
+- "abis olahraga" -> use "energetic" (not "olahraga") 
 - "lagi galau" -> use "sad" (not "galau")
 - "musik sedih" -> use "sad" (not "musik sedih")
 - "analyze sad music" -> use "sad" (not "musik sedih")
 
 SPECIAL INSTRUCTIONS FOR ANALYZE_FEATURES TOOL:
 - When user asks for analysis of music characteristics, use analyze_features
-- Input must be a valid mood only (happy, sad, energy, calm, romantic, neutral)
+- Input must be a valid mood only (happy, sad, energetic, calm, romantic, melancholic, neutral)
 - Do NOT add extra interpretation - return the tool output directly
 - Tool output is already formatted and complete
 
+SPECIAL INSTRUCTIONS FOR SIMILAR_SONGS TOOL:
+- When user asks for songs similar to a specific song ("lagu mirip X"), use similar_songs
+- Input is the song title, optionally followed by " - artist name" (NOT a mood)
+
 SPECIAL INSTRUCTIONS FOR SEARCH_LYRICS TOOL:
 - When user asks for lyrics, use search_lyrics
 - Input should be the song title and artist name
@@ -453,7 +348,7 @@ Use the following format:
 Question: the input question you must answer
 Thought: you should always think about what to do and map the situation to a valid mood
 Action: the action to take, should be one of [{{tool_names}}]
-Action Input: the input to the action (must be a valid mood: happy, sad, energy, calm, romantic, neutral)
+Action Input: the input to the action (must be a valid mood: happy, sad, energetic, calm, romantic, melancholic, neutral)
 Observation: the result of the action
 ... (this Thought/Action/Action Input/Observation can repeat N times)
 Thought: I now know the final answer
@@ -525,13 +420,14 @@ def run_agent_with_debug(agent, user_input: str, enable_debug: bool = True):
         # Log start of processing
         log_system("Memulai pemrosesan dengan AI Agent")
 
-        # Run the agent executor
-        result = agent.invoke(
-            {
-                "input": user_input,
-                "chat_history": st.session_state.get("chat_history", ""),
-            }
-        )
+        # Run the agent executor on one pinned dataset version
+        with pin_dataset(st.session_state.get("df")):
+            result = agent.invoke(
+                {
+                    "input": user_input,
+                    "chat_history": st.session_state.get("chat_history", ""),
+                }
+            )
 
         # Extract response from result
         response = (
@@ -0,0 +1,75 @@
+"""
+Intent router - Front door of a chat turn
+Rules and the local intent classifier send clear-cut requests straight to a tool; only open-ended messages reach the agent
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from src.models.intent_classifier import IntentPrediction, classify_message
+from src.models.music_analyzer import MOOD_RESOLVER
+
+from . import agent_tools
+
+# LLM calls an agent turn costs: a tool turn plans, then writes the answer
+AGENT_CALLS_PER_TOOL_TURN = 2
+AGENT_CALLS_PER_CHAT_TURN = 1
+
+LYRICS_PATTERN = re.compile(r"\b(?:lirik\w*|lyrics?|syair|chord|kord|teks lagu|kata-kata lagu)\b")
+IDENTITY_PATTERN = re.compile(
+    r"\b(?:siapa (?:kamu|lo|lu)|(?:kamu|lo|lu) siapa|who are you|nama (?:kamu|lo)|"
+    r"what can you do|(?:kamu|lo) bisa apa|kenalin diri|introduce yourself)\b"
+)
+ANALYSIS_PATTERN = re.compile(r"\b(?:analisis|analisa|analyze|analysis|karakteristik|ciri)\w*")
+
+
+@dataclass
+class Route:
+    intent: str
+    # Tool input: a mood label or the message itself
+    argument: Optional[str]
+    # "rule", "classifier" or "agent"
+    source: str
+
+    @property
+    def direct(self) -> bool:
+        return self.source != "agent"
+
+
+def route_message(text: str, prediction: Optional[IntentPrediction] = None) -> Route:
+    """Where a message goes: a tool (rules first, then a confident classifier) or the agent"""
+    lowered = " ".join(text.lower().split())
+    prediction = prediction or classify_message(text)
+    has_mood = bool(MOOD_RESOLVER.matcher.matches(lowered))
+
+    if IDENTITY_PATTERN.search(lowered):
+        return Route("identity", None, "rule")
+    # With a mood word ("lagu galau yang liriknya dalem") it may be a song request: agent decides
+    if LYRICS_PATTERN.search(lowered) and not has_mood:
+        return Route("lyrics", text, "rule")
+    if ANALYSIS_PATTERN.search(lowered) and has_mood:
+        return Route("analyze", MOOD_RESOLVER.resolve(text), "rule")
+    if prediction.direct:
+        return Route(prediction.intent, prediction.mood, "classifier")
+    return Route(prediction.intent, None, "agent")
+
+
+def answer_route(route: Route, df: pd.DataFrame) -> str:
+    """Run the tool a direct route points at, as the agent would have"""
+    if route.intent == "identity":
+        return agent_tools.IDENTITY_RESPONSE
+    if route.intent == "lyrics":
+        return agent_tools.search_lyrics(route.argument)
+    if route.intent == "analyze":
+        return agent_tools.analyze_features(df, route.argument)
+    return agent_tools.recommend_songs(df, route.argument)
+
+
+def agent_calls_saved(route: Route) -> int:
+    """LLM calls the agent would have spent on a routed message"""
+    if route.intent == "identity":
+        return AGENT_CALLS_PER_CHAT_TURN
+    return AGENT_CALLS_PER_TOOL_TURN
@@ -3,23 +3,36 @@ Controller utilities - Session management and user input processing
 Handles core application logic and workflow coordination
 """
 
+import time
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
+from src.models.dataset_registry import pin_dataset
+from src.models.intent_classifier import log_agent_turn, log_routed_turn
 from src.models.music_analyzer import (
     analyze_mood_features,
     extract_mood_from_text,
     get_song_recommendations,
     search_music_info,
 )
+from src.views.ui_components import in_fragment_run, record_chat_turn
+
+from .agent_tools import songs_from_steps, tool_songs
+from .intent_router import agent_calls_saved, answer_route, route_message
 
 # UTILITY FUNCTIONS
 
 
 def get_ai_response(agent, user_input: str, df: pd.DataFrame) -> tuple:
     """Get response from AI agent or fallback to basic responses"""
+    # Agent tools and follow-up recommendations all read the same dataset version
+    with pin_dataset(df):
+        return _get_ai_response(agent, user_input, df)
+
+
+def _get_ai_response(agent, user_input: str, df: pd.DataFrame) -> tuple:
 
     # Check for lyrics confirmation context first
     lyrics_confirmation_response = handle_lyrics_confirmation_context(user_input)
@@ -31,8 +44,33 @@ def get_ai_response(agent, user_input: str, df: pd.DataFrame) -> tuple:
     st.session_state.analytics["total_queries"] += 1
 
     if agent:
+        # Clear-cut requests go straight to their tool, skipping the LLM round trips
+        route = route_message(user_input)
+        record_route(route)
+        if route.direct:
+            start_time = time.perf_counter()
+            result = answer_route(route, df)
+            log_routed_turn(
+                user_input,
+                route.intent,
+                route.argument,
+                route.source,
+                (time.perf_counter() - start_time) * 1000,
+            )
+            recommendations = tool_songs(result)
+            st.session_state.analytics["recommendations_given"] += len(
+                recommendations
+            )
+            return str(result), recommendations
+
         try:
+            start_time = time.perf_counter()
             response = agent.invoke({"input": user_input})
+            log_agent_turn(
+                user_input,
+                response.get("intermediate_steps"),
+                (time.perf_counter() - start_time) * 1000,
+            )
             ai_response = response.get(
                 "output", "Sorry, I encountered an error."
             )  # Clean response dari debugging output dengan intelligent handling
@@ -80,17 +118,11 @@ def get_ai_response(agent, user_input: str, df: pd.DataFrame) -> tuple:
                     ]
                     return analysis_content, []
 
-            # Check if recommendations should be shown
-            detected_mood = extract_mood_from_text(user_input)
-            recommendations = []
-            if detected_mood and any(
-                word in user_input.lower()
-                for word in ["recommend", "song", "music", detected_mood]
-            ):
-                recommendations = get_song_recommendations(df, detected_mood, 3)
-                st.session_state.analytics["recommendations_given"] += len(
-                    recommendations
-                )
+            # Songs the agent's tools already picked (and listed in its answer)
+            recommendations = songs_from_steps(response.get("intermediate_steps"))
+            st.session_state.analytics["recommendations_given"] += len(
+                recommendations
+            )
 
             return cleaned_response, recommendations
 
@@ -101,6 +133,18 @@ def get_ai_response(agent, user_input: str, df: pd.DataFrame) -> tuple:
         return get_basic_response(user_input, df)
 
 
+def record_route(route):
+    """Count routed turns, agent turns and the LLM calls routing saved"""
+    analytics = st.session_state.analytics
+    if route.direct:
+        analytics["routed_turns"] = analytics.get("routed_turns", 0) + 1
+        analytics["llm_calls_saved"] = analytics.get(
+            "llm_calls_saved", 0
+        ) + agent_calls_saved(route)
+    else:
+        analytics["agent_turns"] = analytics.get("agent_turns", 0) + 1
+
+
 def get_basic_response(user_input: str, df: pd.DataFrame) -> tuple:
     """Get basic response without AI agent dengan bahasa Indonesia"""
     user_input_lower = user_input.lower()
@@ -251,7 +295,14 @@ def process_user_input(user_input: str, agent, df: pd.DataFrame):
 
     sync_current_chat()
 
-    # Rerun to show new messages
+    # Rerun only the chat fragment to show new messages: the dashboard has
+    # nothing new. A new chat's first turn reruns everything so the sidebar
+    # lists its title.
+    if len(st.session_state.messages) > 2 and in_fragment_run():
+        record_chat_turn(dashboard_skipped=True)
+        st.rerun(scope="fragment")
+
+    record_chat_turn(dashboard_skipped=False)
     st.rerun()
 
 
@@ -1,19 +1,24 @@
 # Models package - Data models and business logic
 
-from .data_manager import load_music_data
+from .data_manager import load_music_data, load_track_store
 from .music_analyzer import (
     analyze_mood_features,
     extract_mood_from_text,
     get_enhanced_recommendations,
+    get_similar_recommendations,
     get_song_recommendations,
+    resolve_mood,
     search_music_info,
 )
 
 __all__ = [
     "load_music_data",
+    "load_track_store",
     "analyze_mood_features",
     "extract_mood_from_text",
     "get_enhanced_recommendations",
+    "get_similar_recommendations",
     "get_song_recommendations",
+    "resolve_mood",
     "search_music_info",
 ]
@@ -0,0 +1,112 @@
+"""
+Artifacts - Versioned derived data stored next to the columnar cache
+Indexes and aggregates built once (e.g. by `moodify warmup`) and memory-mapped at startup
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .track_store import TrackStore
+
+# Bump when an artifact layout changes; older artifacts are then ignored
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_DIR = "artifacts"
+META_FILE = "meta.json"
+
+def artifact_path(store: TrackStore, name: str) -> str:
+    """Artifacts live inside the cache directory, so a rewritten cache drops them"""
+    return os.path.join(store.path, ARTIFACT_DIR, name)
+
+def _expected_meta(store: TrackStore, fingerprint: str) -> Dict:
+    return {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "dataset": store.version,
+        "deltas": store.deltas,
+        "rows": len(store),
+        "fingerprint": fingerprint,
+    }
+
+def _read_meta(path: str, store: TrackStore, fingerprint: str) -> Optional[Dict]:
+    """Artifact metadata, or None if it belongs to another dataset or layout"""
+    try:
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    expected = _expected_meta(store, fingerprint)
+    if any(meta.get(key) != value for key, value in expected.items()):
+        return None
+    return meta
+
+def save_artifact(
+    store: TrackStore,
+    name: str,
+    fingerprint: str,
+    arrays: Optional[Dict[str, np.ndarray]] = None,
+    data: Optional[Dict] = None,
+) -> str:
+    """Write NPY arrays plus JSON data for a store, swapping the directory in atomically"""
+    path = artifact_path(store, name)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    try:
+        for key, values in (arrays or {}).items():
+            np.save(os.path.join(tmp_path, f"{key}.npy"), np.ascontiguousarray(values))
+
+        meta = _expected_meta(store, fingerprint)
+        meta["arrays"] = sorted(arrays or {})
+        meta["data"] = data or {}
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return path
+
+def load_artifact(
+    store: TrackStore, name: str, fingerprint: str
+) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    """Memory-mapped arrays and JSON data of a current artifact, else None"""
+    path = artifact_path(store, name)
+    meta = _read_meta(path, store, fingerprint)
+    if meta is None:
+        return None
+
+    try:
+        arrays = {
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r", allow_pickle=False)
+            for key in meta["arrays"]
+        }
+    except (OSError, ValueError):
+        return None
+    return arrays, meta["data"]
+
+def load_or_build(data, name: str, fingerprint: str, load, build, save):
+    """
+    Index from its artifact when `data` is a mapped store, else built in memory
+
+    `load(arrays, meta_data)` restores the object, `save(obj)` returns the
+    (arrays, data) to persist. Frames (partial loads) never touch artifacts.
+    """
+    if isinstance(data, TrackStore):
+        artifact = load_artifact(data, name, fingerprint)
+        if artifact is not None:
+            return load(*artifact)
+
+    built = build()
+    if isinstance(data, TrackStore):
+        try:
+            arrays, payload = save(built)
+            save_artifact(data, name, fingerprint, arrays, payload)
+        except OSError:
+            pass
+    return built
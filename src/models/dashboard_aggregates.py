@@ -0,0 +1,227 @@
+"""
+Dashboard aggregates - Counts and means behind the dataset dashboard, once per dataset version
+Mood and genre counts come from one mood x genre count matrix instead of repeated scans
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.models.artifacts import load_or_build
+from src.models.ingest_schema import AUDIO_FEATURES
+from src.models.mood_index import get_dataset_index
+from src.models.track_store import TrackStore
+
+# Bump when the aggregate layout changes
+AGGREGATES_FINGERPRINT = "dashboard-v2"
+
+# Features averaged per mood
+MEAN_FEATURES = AUDIO_FEATURES + ["popularity"]
+
+def _codes(data, column: str) -> Tuple[np.ndarray, List[str]]:
+    """Integer codes (-1 = missing) and their labels for a string column"""
+    if isinstance(data, TrackStore) and data.is_dictionary(column):
+        return np.asarray(data.values(column)), [str(v) for v in data.dictionary(column)]
+    series = data[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), [str(v) for v in series.cat.categories]
+    codes, uniques = pd.factorize(series)
+    return codes, [str(v) for v in uniques]
+
+def _values(data, feature: str) -> np.ndarray:
+    if isinstance(data, TrackStore):
+        return np.asarray(data.values(feature), dtype=np.float64)
+    return data[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _distinct(codes: np.ndarray) -> int:
+    present = codes[codes >= 0]
+    return int(np.count_nonzero(np.bincount(present))) if len(present) else 0
+
+def _align(matrix: np.ndarray, labels: List[str], target: List[str], axis: int) -> np.ndarray:
+    """Re-index one axis of a count matrix from `labels` to `target` (missing -> 0)"""
+    position = {label: i for i, label in enumerate(target)}
+    shape = list(matrix.shape)
+    shape[axis] = len(target)
+    aligned = np.zeros(shape, dtype=matrix.dtype)
+    index = [position[label] for label in labels]
+    if axis == 0:
+        aligned[index] = matrix
+    else:
+        aligned[:, index] = matrix
+    return aligned
+
+class DashboardAggregates:
+    """Mood x genre counts, per-mood feature sums and distinct counts for the dashboard"""
+
+    def __init__(
+        self,
+        moods,
+        genres,
+        mood_genre,
+        features,
+        feature_sums,
+        feature_counts,
+        n_artists: int,
+        total_rows: int,
+    ):
+        self.moods = list(moods)
+        self.genres = list(genres)
+        # Rows per (mood, genre) pair, shape (n_moods, n_genres)
+        self.mood_genre = np.asarray(mood_genre, dtype=np.int64)
+        # Per mood and feature: sum and count of non-missing values, (n_moods, n_features)
+        self.features = list(features)
+        self.feature_sums = np.asarray(feature_sums, dtype=np.float64)
+        self.feature_counts = np.asarray(feature_counts, dtype=np.int64)
+        self.n_artists = n_artists
+        self.fingerprint = AGGREGATES_FINGERPRINT
+        self.total_rows = total_rows
+
+    @classmethod
+    def build(cls, data) -> "DashboardAggregates":
+        """One pass over the mood, genre and feature columns"""
+        mood_codes, moods = _codes(data, "mood")
+        genre_codes, genres = _codes(data, "genre")
+
+        valid = (mood_codes >= 0) & (genre_codes >= 0)
+        pairs = mood_codes[valid].astype(np.int64) * len(genres) + genre_codes[valid]
+        mood_genre = np.bincount(pairs, minlength=len(moods) * len(genres))
+        mood_genre = mood_genre.reshape(len(moods), len(genres))
+
+        features = [feature for feature in MEAN_FEATURES if feature in data.columns]
+        sums = np.zeros((len(moods), len(features)))
+        counts = np.zeros((len(moods), len(features)), dtype=np.int64)
+        for j, feature in enumerate(features):
+            values = _values(data, feature)
+            present = (mood_codes >= 0) & ~np.isnan(values)
+            sums[:, j] = np.bincount(
+                mood_codes[present], weights=values[present], minlength=len(moods)
+            )
+            counts[:, j] = np.bincount(mood_codes[present], minlength=len(moods))
+
+        # Drop labels that never occur (stale dictionary entries, unused categories)
+        used_moods = (mood_genre.sum(axis=1) > 0) | (counts.sum(axis=1) > 0)
+        used_genres = mood_genre.sum(axis=0) > 0
+        return cls(
+            [mood for mood, used in zip(moods, used_moods) if used],
+            [genre for genre, used in zip(genres, used_genres) if used],
+            mood_genre[np.ix_(used_moods, used_genres)],
+            features,
+            sums[used_moods],
+            counts[used_moods],
+            _distinct(_codes(data, "artist_name")[0]),
+            len(data),
+        )
+
+    def merged(self, other: "DashboardAggregates", total_rows: int) -> "DashboardAggregates":
+        """Sum of two aggregates over disjoint rows (labels are unioned)"""
+        moods = self.moods + [mood for mood in other.moods if mood not in self.moods]
+        genres = self.genres + [genre for genre in other.genres if genre not in self.genres]
+
+        def combine(name: str, columns: List[str], columns_mine, columns_theirs):
+            mine = _align(getattr(self, name), self.moods, moods, 0)
+            theirs = _align(getattr(other, name), other.moods, moods, 0)
+            return _align(mine, columns_mine, columns, 1) + _align(
+                theirs, columns_theirs, columns, 1
+            )
+
+        return DashboardAggregates(
+            moods,
+            genres,
+            combine("mood_genre", genres, self.genres, other.genres),
+            self.features,
+            combine("feature_sums", self.features, self.features, other.features),
+            combine("feature_counts", self.features, self.features, other.features),
+            self.n_artists,
+            total_rows,
+        )
+
+    def updated(self, data, row_ids: np.ndarray, rows) -> "DashboardAggregates":
+        """
+        Copy for a new dataset version
+
+        Appended rows are aggregated on their own and added; replaced rows
+        would need their old values, so any replacement rebuilds from `data`.
+        """
+        if len(row_ids) and row_ids.min() < self.total_rows:
+            return DashboardAggregates.build(data)
+
+        aggregates = self.merged(DashboardAggregates.build(rows), len(data))
+        # Distinct artists need the whole column, but only as integer codes
+        aggregates.n_artists = _distinct(_codes(data, "artist_name")[0])
+        return aggregates
+
+    @property
+    def n_genres(self) -> int:
+        return len(self.genres)
+
+    def mood_counts(self) -> pd.Series:
+        """Rows per mood, largest first (like value_counts)"""
+        counts = pd.Series(self.mood_genre.sum(axis=1), index=self.moods, name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def genre_counts(self) -> pd.Series:
+        """Rows per genre, largest first (like value_counts)"""
+        counts = pd.Series(self.mood_genre.sum(axis=0), index=self.genres, name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def crosstab(self) -> pd.DataFrame:
+        """Mood x genre counts (like pd.crosstab on the two categorical columns)"""
+        return pd.DataFrame(self.mood_genre, index=self.moods, columns=self.genres)
+
+    def feature_means(self, mood: str) -> Dict[str, float]:
+        """Mean of every feature over a mood's rows (empty for unknown moods)"""
+        if mood not in self.moods:
+            return {}
+        i = self.moods.index(mood)
+        return {
+            feature: float(self.feature_sums[i, j] / self.feature_counts[i, j])
+            for j, feature in enumerate(self.features)
+            if self.feature_counts[i, j]
+        }
+
+    def mood_size(self, mood: str) -> int:
+        return int(self.mood_genre[self.moods.index(mood)].sum()) if mood in self.moods else 0
+
+    def to_artifact(self):
+        arrays = {
+            "mood_genre": self.mood_genre,
+            "feature_sums": self.feature_sums,
+            "feature_counts": self.feature_counts,
+        }
+        data = {
+            "moods": self.moods,
+            "genres": self.genres,
+            "features": self.features,
+            "n_artists": self.n_artists,
+        }
+        return arrays, data
+
+    @classmethod
+    def from_artifact(cls, arrays, data, total_rows: int) -> "DashboardAggregates":
+        return cls(
+            data["moods"],
+            data["genres"],
+            arrays["mood_genre"],
+            data["features"],
+            arrays["feature_sums"],
+            arrays["feature_counts"],
+            data["n_artists"],
+            total_rows,
+        )
+
+def get_dashboard_aggregates(data) -> DashboardAggregates:
+    """Dashboard aggregates for a dataset, computed once per dataset version"""
+    return get_dataset_index(
+        data,
+        "aggregates",
+        AGGREGATES_FINGERPRINT,
+        lambda: load_or_build(
+            data,
+            "dashboard_aggregates",
+            AGGREGATES_FINGERPRINT,
+            load=lambda arrays, meta: DashboardAggregates.from_artifact(arrays, meta, len(data)),
+            build=lambda: DashboardAggregates.build(data),
+            save=DashboardAggregates.to_artifact,
+        ),
+    )
@@ -4,19 +4,31 @@ Handles CSV data loading and preprocessing
 """
 
 import os
-import subprocess
+import threading
 import time
 from functools import wraps
 
-import numpy as np
-import pandas as pd
 import streamlit as st
 
-from .lfs_handler import (
-    check_lfs_file_status,
-    load_spotify_data,
-    load_spotify_data_with_fallback,
+from src.services.debug_logger import log_error
+
+from .dataset_cache import (
+    compute_sha256,
+    get_applied_deltas,
+    get_cache_path,
+    prune_cache_versions,
+    save_dataset_cache,
+    save_delta_version,
 )
+from .dataset_loader import file_lock, get_dataset_loader
+from .dataset_registry import DatasetHandle, resolve_dataset
+from .delta_ingest import apply_delta, carry_indexes, to_frame, upsert_tracks
+from .ingest_schema import SPOTIFY_SCHEMA
+from .lfs_handler import pull_lfs_file, read_lfs_pointer, stream_from_github_lfs
+from .mood_scores import classify_moods
+from .music_analyzer import MOOD_CRITERIA, prepare_indexes
+from .streaming_loader import ProgressiveDataset
+from .track_store import TrackStore
 
 # PERFORMANCE MONITORING
 
@@ -39,91 +51,150 @@ def monitor_performance(func):
 
 # DATA MANAGEMENT
 
+def get_music_loader(file_path="spotify_data.csv"):
+    """Process-wide single-flight loader behind every dataset entry point"""
+    return get_dataset_loader(
+        file_path,
+        process_chunk=process_music_data,
+        prepare=prepare_indexes,
+        fetch_source=prepare_source_file,
+        stream_source=stream_from_github_lfs,
+    )
+
+def get_load_metrics(file_path="spotify_data.csv") -> dict:
+    """Phase timings (download, parse, classify, cache, index) of the last load"""
+    return get_music_loader(file_path).metrics.as_dict()
+
 @monitor_performance
 @st.cache_data(
     ttl=3600, show_spinner=False
 )  # Cache for 1 hour, disable default spinner
 def load_music_data():
-    """Optimized spotify data loading with enhanced performance"""
+    """Full dataset as a DataFrame, from the shared load"""
+    return get_music_loader().frame()
+
+@monitor_performance
+@st.cache_resource(show_spinner=False)
+def load_track_store():
+    """Shared dataset for all sessions: mapped store, or a progressively loading handle"""
+
+    # Handle, so later dataset versions (deltas) reach every running session
+    dataset = get_music_loader().handle()
+    if dataset is None:
+        return None
 
-    # First check session state cache
-    cached_data = get_cached_data()
-    if cached_data is not None:
-        return cached_data
+    if isinstance(dataset, ProgressiveDataset) and dataset.wait_until_ready() is None:
+        st.error(f"❌ Error loading CSV: {dataset.error}")
+        return None
 
-    file_path = "spotify_data.csv"
+    return dataset
+
+# Serializes delta ingestion; readers never wait on it
+_DELTA_LOCK = threading.Lock()
+
+def refresh_track_store(file_path="spotify_data.csv") -> bool:
+    """Publish a cache version another process wrote (e.g. `moodify ingest-delta`)"""
+    refreshed = get_music_loader(file_path).refresh()
+    if refreshed:
+        load_music_data.__wrapped__.clear()
+    return refreshed
+
+def ingest_delta(handle, delta_path: str, file_path="spotify_data.csv") -> dict:
+    """
+    Apply a CSV/JSONL of new or changed tracks (keyed by track_id) without a full reload
+
+    Only the delta rows are classified. On a mapped store the new cache version
+    is written by patching column arrays (nothing is re-parsed or turned into a
+    DataFrame), derived indexes are updated for the touched rows only, and the
+    version is published to every session sharing `handle`; other processes
+    pick it up on their next refresh_track_store(). Applying the same file twice
+    is a no-op.
+    """
+    loader = get_music_loader(file_path)
+    with _DELTA_LOCK, file_lock(loader.lock_path):
+        delta_sha = compute_sha256(delta_path)
+        applied = get_applied_deltas(file_path)
+        if delta_sha in applied:
+            return {"applied": False, "reason": "already applied"}
+
+        base = resolve_dataset(handle)
+        if base is None:
+            return {"applied": False, "reason": "dataset not loaded"}
+        if isinstance(base, TrackStore) and base.path != get_cache_path(file_path):
+            # Another process wrote a newer version: build on that one
+            base = TrackStore.open(file_path) or base
+
+        delta, row_ids, summary = apply_delta(base, delta_path, process_music_data)
+
+        new_data = None
+        summary["cache_written"] = False
+        try:
+            deltas = applied + [delta_sha]
+            if isinstance(base, TrackStore):
+                save_delta_version(base.path, delta, row_ids, file_path, deltas=deltas)
+            else:
+                new_data = upsert_tracks(base, delta, row_ids)
+                save_dataset_cache(new_data, file_path, deltas=deltas)
+            summary["cache_written"] = True
+            new_data = TrackStore.open(file_path) or new_data
+        except Exception as e:
+            # The delta is served from memory only and is lost on restart
+            log_error(e, f"Writing the dataset cache after delta {delta_path} failed")
+            summary["cache_error"] = str(e)
+
+        if new_data is None:
+            new_data = upsert_tracks(to_frame(base), delta, row_ids)
+
+    summary["indexes"] = carry_indexes(base, new_data, row_ids)
+
+    if isinstance(handle, DatasetHandle):
+        handle.publish(new_data)
+        summary["version"] = handle.version
+    # Versions still mapped (pinned runs, other processes) survive until released
+    prune_cache_versions(file_path)
+
+    # Per-session DataFrame loads pick the delta up from the rewritten cache
+    # (__wrapped__ is the st.cache_data function under monitor_performance)
+    load_music_data.__wrapped__.clear()
+
+    summary["applied"] = True
+    return summary
+
+def prepare_source_file(file_path="spotify_data.csv"):
+    """
+    Make sure the CSV is present, pulling it via Git LFS if needed
+    Returns (ready, lfs_oid) where lfs_oid is the pointer's sha256 when known
+    """
 
     # Quick existence check
     if not os.path.exists(file_path):
         st.error("❌ spotify_data.csv not found!")
-        return None
+        return False, None
 
     # Check file size and LFS status
     file_size = os.path.getsize(file_path)
     file_size_mb = file_size / (1024 * 1024)
 
+    # The pointer's oid is the sha256 of the real file, reuse it as cache key
+    lfs_pointer = read_lfs_pointer(file_path)
+    lfs_oid = lfs_pointer["oid"] if lfs_pointer else None
+
     # Handle LFS files (< 1KB indicates LFS pointer)
     if file_size < 1024:
         st.info("📥 LFS file detected. Downloading...")
 
         with st.spinner("Downloading data via Git LFS..."):
-            try:
-                # Use timeout to prevent hanging
-                result = subprocess.run(
-                    ["git", "lfs", "pull"],
-                    capture_output=True,
-                    text=True,
-                    cwd=".",
-                    timeout=60,
-                )
-
-                if result.returncode == 0:
-                    # Refresh file size after download
-                    file_size = os.path.getsize(file_path)
-                    file_size_mb = file_size / (1024 * 1024)
-                    st.success(
-                        f"✅ LFS download completed! Size: {file_size_mb:.1f} MB"
-                    )
-                else:
-                    st.error(f"❌ Git LFS failed: {result.stderr}")
-                    return None
-
-            except subprocess.TimeoutExpired:
-                st.error("⏰ LFS download timeout (60s)")
-                return None
-            except Exception as e:
-                st.error(f"❌ LFS error: {str(e)}")
-                return None
-
-    # Optimized CSV loading (silent mode)
-    try:
-        # Optimized pandas parameters for performance
-        df = pd.read_csv(
-            file_path,
-            engine="c",  # Use fast C engine
-            low_memory=False,  # Read entire file at once
-            na_filter=True,  # Handle NaN values efficiently
-            verbose=False,  # Reduce output
-            encoding="utf-8",  # Explicit encoding
-        )
-
-        # Process data silently
-        processed_df = process_music_data(df)
-
-        # Cache the processed data
-        set_cached_data(processed_df)
-
-        return processed_df
-
-    except pd.errors.EmptyDataError:
-        st.error("❌ CSV file is empty")
-        return None
-    except pd.errors.ParserError as e:
-        st.error(f"❌ CSV parsing error: {str(e)}")
-        return None
-    except Exception as e:
-        st.error(f"❌ Unexpected error loading CSV: {str(e)}")
-        return None
+            success, message = pull_lfs_file(file_path)
+
+        if not success:
+            # The loader then parses the LFS object straight from the network
+            st.warning(f"⚠️ LFS download failed: {message}. Streaming data from GitHub LFS...")
+            return False, lfs_oid
+
+        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        st.success(f"✅ LFS download completed! Size: {file_size_mb:.1f} MB")
+
+    return True, lfs_oid
 
 # UTILITY FUNCTIONS
 
@@ -142,55 +213,34 @@ def get_data_info(df):
 
     return info
 
-def process_music_data(df):
-    """Optimized processing and enhancement of music data"""
+def process_music_data(df, warn=None):
+    """
+    Optimized processing and enhancement of music data
+
+    `warn` reports data problems; it defaults to st.warning, which the
+    background loader replaces because its thread has no Streamlit context.
+    """
 
     # Validate required columns exist
     required_cols = ["valence", "energy"]
     missing_cols = [col for col in required_cols if col not in df.columns]
 
     if missing_cols:
-        st.warning(f"⚠️ Missing columns: {missing_cols}. Skipping mood classification.")
+        (warn or st.warning)(f"⚠️ Missing columns: {missing_cols}. Skipping mood classification.")
         return df
 
-    # Optimized mood classification using vectorized operations
-    # Instead of apply(), use numpy conditions for better performance
-    conditions = [
-        (df["valence"] >= 0.6) & (df["energy"] >= 0.6),
-        (df["valence"] <= 0.4) | (df["energy"] <= 0.3),
-    ]
-    choices = ["happy", "sad"]
-
-    df["mood"] = np.select(conditions, choices, default="neutral")
+    # Hard mood label = best-scoring mood, so it agrees with the recommendation scores
+    df["mood"] = classify_moods(df, MOOD_CRITERIA)
 
     # Optimized duration conversion (vectorized)
     if "duration_ms" in df.columns:
         df["duration_min"] = (df["duration_ms"] / 60000).round(2)
 
-    # Optional: Data type optimization to reduce memory usage
-    # Convert object columns to category if they have limited unique values
+    # Columns outside the declared schema still get the cardinality check
     for col in df.select_dtypes(include=["object"]).columns:
+        if col in SPOTIFY_SCHEMA:
+            continue
         if df[col].nunique() / len(df) < 0.5:  # If less than 50% unique values
             df[col] = df[col].astype("category")
 
     return df
-
-# SESSION STATE OPTIMIZATION
-
-def get_cached_data():
-    """Get data from session state cache if available"""
-    if "music_data_cache" in st.session_state:
-        cache_time = st.session_state.get("music_data_cache_time", 0)
-        current_time = time.time()
-
-        # Cache valid for 1 hour (3600 seconds)
-        if current_time - cache_time < 3600:
-            st.info("📦 Using cached data from session...")
-            return st.session_state.music_data_cache
-
-    return None
-
-def set_cached_data(df):
-    """Cache data in session state"""
-    st.session_state.music_data_cache = df
-    st.session_state.music_data_cache_time = time.time()
@@ -0,0 +1,455 @@
+"""
+Dataset cache - Columnar on-disk cache for the processed music dataset
+Stores each processed column as an NPY file, keyed by the CSV fingerprint
+
+Every write creates a new, never modified version directory (`<stem>-v<N>`)
+and then atomically repoints `<stem>.current` at it. Processes that mapped an
+older version keep reading intact files; a version directory is only deleted
+once no process holds its reader lock.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bump when process_music_data or the on-disk layout changes
+CACHE_FORMAT_VERSION = 6
+CACHE_DIR = ".moodify_cache"
+MANIFEST_FILE = "manifest.json"
+POINTER_SUFFIX = ".current"
+READER_LOCK_FILE = "readers.lock"
+# Row ids a delta version changed or appended relative to its parent
+DELTA_ROWS_FILE = "delta_rows.npy"
+
+# FINGERPRINTING
+
+def compute_sha256(file_path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """Stream a file through sha256 without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_file_fingerprint(
+    file_path: str,
+    known_sha256: Optional[str] = None,
+    previous: Optional[Dict] = None,
+) -> Dict:
+    """
+    Fingerprint a source file by size, mtime and sha256
+
+    The sha256 is only recomputed when size or mtime differ from `previous`
+    and no trusted digest (e.g. the LFS oid) is supplied.
+    """
+    stat = os.stat(file_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if (
+        previous
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+        and previous.get("sha256")
+    ):
+        fingerprint["sha256"] = previous["sha256"]
+    elif known_sha256:
+        fingerprint["sha256"] = known_sha256
+    else:
+        fingerprint["sha256"] = compute_sha256(file_path)
+
+    return fingerprint
+
+def _cache_root(file_path: str, cache_dir: str) -> str:
+    """Common prefix of a source file's version directories and pointer"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, stem)
+
+def _read_pointer(root: str) -> Optional[Dict]:
+    try:
+        with open(f"{root}{POINTER_SUFFIX}", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def pointer_stamp(file_path: str, cache_dir: str = CACHE_DIR) -> Optional[tuple]:
+    """Cheap change marker of the version pointer (a stat, no read)"""
+    try:
+        stat = os.stat(f"{_cache_root(file_path, cache_dir)}{POINTER_SUFFIX}")
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def get_cache_path(file_path: str, cache_dir: str = CACHE_DIR) -> Optional[str]:
+    """Current version directory for a given source file, None before the first write"""
+    pointer = _read_pointer(_cache_root(file_path, cache_dir))
+    if pointer is None or "dir" not in pointer:
+        return None
+    return os.path.join(cache_dir, pointer["dir"])
+
+def read_manifest(cache_path: Optional[str]) -> Optional[Dict]:
+    """Read the cache manifest, returning None if missing or unreadable"""
+    if cache_path is None:
+        return None
+    try:
+        with open(os.path.join(cache_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+# COLUMN ENCODING
+
+def _smallest_code_dtype(size: int):
+    """Smallest signed integer dtype able to hold codes in [-1, size)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def _write_dictionary(cache_path: str, file_name: str, values) -> int:
+    """Write dictionary entries as a NUL separated UTF-8 blob plus byte offsets"""
+    encoded = [str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(item) + 1 for item in encoded])
+    blob = np.frombuffer(b"\x00".join(encoded) + b"\x00", dtype=np.uint8)
+
+    base = os.path.join(cache_path, file_name)
+    np.save(f"{base}.dict.npy", blob, allow_pickle=False)
+    np.save(f"{base}.offsets.npy", offsets, allow_pickle=False)
+    return len(encoded)
+
+def read_dictionary(cache_path: str, entry: Dict) -> List[str]:
+    """Decode all dictionary entries of a column"""
+    base = os.path.join(cache_path, entry["file"])
+    blob = np.load(f"{base}.dict.npy", allow_pickle=False)
+    if entry["size"] == 0:
+        return []
+    return blob.tobytes().decode("utf-8").split("\x00")[: entry["size"]]
+
+def _write_column(cache_path: str, index: int, name: str, series: pd.Series) -> Dict:
+    """Write a single column and return its manifest entry"""
+    file_name = f"col_{index:03d}"
+    entry = {"name": name, "file": file_name}
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        codes = series.cat.codes.to_numpy()
+        entry.update(kind="dictionary", categorical=True, ordered=bool(series.cat.ordered))
+    elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(
+        series.dtype
+    ):
+        entry["kind"] = "numeric"
+        np.save(
+            os.path.join(cache_path, f"{file_name}.npy"),
+            series.to_numpy(),
+            allow_pickle=False,
+        )
+        return entry
+    else:
+        # Free-text columns are dictionary encoded so they stay mmap-friendly
+        codes, categories = pd.factorize(series, use_na_sentinel=True)
+        entry.update(kind="dictionary", categorical=False, ordered=False)
+
+    entry["size"] = _write_dictionary(cache_path, file_name, categories)
+    np.save(
+        os.path.join(cache_path, f"{file_name}.npy"),
+        codes.astype(_smallest_code_dtype(entry["size"])),
+        allow_pickle=False,
+    )
+    return entry
+
+def _read_column(cache_path: str, entry: Dict):
+    """Rebuild a pandas-compatible column from its manifest entry"""
+    values = np.load(os.path.join(cache_path, f"{entry['file']}.npy"), allow_pickle=False)
+    if entry["kind"] == "numeric":
+        return values
+
+    categories = read_dictionary(cache_path, entry)
+    if entry["categorical"]:
+        return pd.Categorical.from_codes(
+            values, categories=categories, ordered=entry["ordered"]
+        )
+
+    uniques = np.asarray(categories + [np.nan], dtype=object)
+    # Code -1 (missing) indexes the trailing NaN
+    return uniques[values]
+
+# CACHE READ / WRITE
+
+def get_current_manifest(
+    file_path: str, cache_path: Optional[str], known_sha256: Optional[str] = None
+) -> Optional[Dict]:
+    """Return the cache manifest only if it was built from the current CSV"""
+    manifest = read_manifest(cache_path)
+    if manifest is None or not os.path.exists(file_path):
+        return None
+
+    cached_fingerprint = manifest.get("source", {})
+    fingerprint = get_file_fingerprint(
+        file_path, known_sha256=known_sha256, previous=cached_fingerprint
+    )
+
+    if fingerprint["sha256"] != cached_fingerprint.get("sha256"):
+        return None
+
+    # Content unchanged but file touched: refresh mtime so next start skips hashing
+    if fingerprint["mtime_ns"] != cached_fingerprint.get("mtime_ns"):
+        manifest["source"] = fingerprint
+        _write_manifest(cache_path, manifest)
+
+    return manifest
+
+def load_dataset_cache(
+    file_path: str, cache_dir: str = CACHE_DIR, known_sha256: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """Load the processed dataset if the cache matches the current CSV"""
+    cache_path = get_cache_path(file_path, cache_dir)
+    manifest = get_current_manifest(file_path, cache_path, known_sha256)
+    if manifest is None:
+        return None
+
+    try:
+        df = pd.DataFrame(
+            {entry["name"]: _read_column(cache_path, entry) for entry in manifest["columns"]}
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if len(df) != manifest.get("rows"):
+        return None
+
+    return df
+
+def save_dataset_cache(
+    df: pd.DataFrame,
+    file_path: str,
+    cache_dir: str = CACHE_DIR,
+    known_sha256: Optional[str] = None,
+    deltas: Optional[List[str]] = None,
+) -> str:
+    """
+    Write the processed dataset as a new cache version and return its path
+
+    `deltas` lists the sha256 of every delta file already applied on top of the CSV.
+    """
+    previous = (read_manifest(get_cache_path(file_path, cache_dir)) or {}).get("source")
+
+    with new_cache_version(file_path, cache_dir) as tmp_path:
+        columns = [
+            _write_column(tmp_path, i, str(name), df[name])
+            for i, name in enumerate(df.columns)
+        ]
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "source": get_file_fingerprint(
+                file_path, known_sha256=known_sha256, previous=previous
+            ),
+            "rows": len(df),
+            "columns": columns,
+            "deltas": deltas or [],
+        }
+        _write_manifest(tmp_path, manifest)
+
+    return get_cache_path(file_path, cache_dir)
+
+def save_delta_version(
+    base_path: str,
+    delta: pd.DataFrame,
+    row_ids: np.ndarray,
+    file_path: str,
+    cache_dir: str = CACHE_DIR,
+    deltas: Optional[List[str]] = None,
+) -> str:
+    """
+    Write the version that upserts `delta` into the cached version at `base_path`
+
+    Delta row i lands at row_ids[i]: an existing row id or one past the end.
+    Columns are patched as arrays and dictionaries only gain the new strings,
+    so existing codes stay valid and nothing is re-parsed or re-classified.
+    Versions are immutable, so every column file is still copied once.
+    """
+    manifest = read_manifest(base_path)
+    if manifest is None:
+        raise ValueError(f"No readable cache version at {base_path}")
+
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+    rows = max(manifest["rows"], int(row_ids.max()) + 1 if len(row_ids) else 0)
+
+    with new_cache_version(file_path, cache_dir) as tmp_path:
+        columns = [
+            _patch_column(base_path, tmp_path, entry, delta[entry["name"]], row_ids, rows)
+            for entry in manifest["columns"]
+        ]
+        np.save(os.path.join(tmp_path, DELTA_ROWS_FILE), row_ids, allow_pickle=False)
+        _write_manifest(
+            tmp_path,
+            {
+                **manifest,
+                "rows": rows,
+                "columns": columns,
+                "deltas": deltas or [],
+                "parent": os.path.basename(base_path),
+            },
+        )
+
+    return get_cache_path(file_path, cache_dir)
+
+def _patched_array(base: np.ndarray, rows: int, row_ids: np.ndarray, values: np.ndarray, path: str):
+    """Write base values, grown to `rows`, with `values` at `row_ids` as an NPY file"""
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=values.dtype, shape=(rows,))
+    out[: len(base)] = base
+    out[row_ids] = values
+    out.flush()
+    del out
+
+def _link_or_copy(source: str, dest: str):
+    """Hard link an unchanged file into the new version (copy where links fail)"""
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+def _patch_column(
+    base_path: str, tmp_path: str, entry: Dict, series: pd.Series, row_ids: np.ndarray, rows: int
+) -> Dict:
+    """Copy one column into the new version with the delta values applied"""
+    file_name = entry["file"]
+    base = np.load(os.path.join(base_path, f"{file_name}.npy"), mmap_mode="r", allow_pickle=False)
+    target = os.path.join(tmp_path, f"{file_name}.npy")
+
+    if entry["kind"] == "numeric":
+        dtype = base.dtype
+        if np.issubdtype(dtype, np.integer) and series.isna().any():
+            # A blank cell in an int column needs NaN, as in a full parse
+            dtype = np.promote_types(dtype, np.float32)
+        _patched_array(base, rows, row_ids, series.to_numpy(dtype=dtype), target)
+        return dict(entry)
+
+    # Codes of known strings are kept; unseen strings are appended to the dictionary
+    categories = read_dictionary(base_path, entry)
+    values = series.astype(object).to_numpy()
+    codes = pd.Index(categories, dtype=object).get_indexer(values)
+    unseen = (codes < 0) & ~pd.isna(values)
+    added = list(pd.unique(values[unseen]))
+    codes[unseen] = len(categories) + pd.Index(added, dtype=object).get_indexer(values[unseen])
+
+    patched = dict(entry)
+    base_source = os.path.join(base_path, file_name)
+    if added:
+        patched["size"] = _write_dictionary(tmp_path, file_name, categories + added)
+    else:
+        for suffix in (".dict.npy", ".offsets.npy"):
+            _link_or_copy(f"{base_source}{suffix}", os.path.join(tmp_path, f"{file_name}{suffix}"))
+
+    code_dtype = np.promote_types(base.dtype, _smallest_code_dtype(patched["size"]))
+    _patched_array(base, rows, row_ids, codes.astype(code_dtype), target)
+    return patched
+
+def get_applied_deltas(file_path: str, cache_dir: str = CACHE_DIR) -> List[str]:
+    """sha256 of the delta files folded into the current cache"""
+    manifest = read_manifest(get_cache_path(file_path, cache_dir))
+    return list(manifest.get("deltas", [])) if manifest else []
+
+# VERSIONS
+
+def _version_dirs(file_path: str, cache_dir: str) -> Dict[int, str]:
+    """Version number -> directory of every version on disk"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    pattern = re.compile(rf"{re.escape(stem)}-v(\d+)")
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return {}
+    versions = {}
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match:
+            versions[int(match.group(1))] = os.path.join(cache_dir, name)
+    return versions
+
+@contextmanager
+def new_cache_version(file_path: str, cache_dir: str = CACHE_DIR):
+    """
+    Directory to fill with the next version, published when the block succeeds
+
+    Callers hold the loader's file lock, so version numbers cannot collide.
+    The pointer is replaced in one rename; readers see the old or the new version.
+    """
+    root = _cache_root(file_path, cache_dir)
+    number = max(_version_dirs(file_path, cache_dir), default=0) + 1
+    version_path = f"{root}-v{number}"
+    tmp_path = f"{version_path}.tmp-{os.getpid()}"
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, version_path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    pointer_path = f"{root}{POINTER_SUFFIX}"
+    tmp_pointer = f"{pointer_path}.tmp-{os.getpid()}"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        json.dump({"version": number, "dir": os.path.basename(version_path)}, f)
+    os.replace(tmp_pointer, pointer_path)
+
+def acquire_reader_lock(cache_path: str):
+    """
+    Shared lock that keeps a version directory from being pruned
+
+    Returns the open lock file (closing it releases the lock), or None if the
+    directory is gone. Without flock (Windows) the file is opened but nothing
+    is locked, and prune_cache_versions never deletes anything.
+    """
+    try:
+        lock_file = open(os.path.join(cache_path, READER_LOCK_FILE), "a+b")
+    except OSError:
+        return None
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+    return lock_file
+
+def prune_cache_versions(file_path: str, cache_dir: str = CACHE_DIR) -> List[str]:
+    """Delete old version directories no process has mapped; returns the deleted paths"""
+    if fcntl is None:
+        return []
+
+    current = get_cache_path(file_path, cache_dir)
+    removed = []
+    for path in _version_dirs(file_path, cache_dir).values():
+        if current is not None and os.path.samefile(path, current):
+            continue
+        try:
+            with open(os.path.join(path, READER_LOCK_FILE), "a+b") as lock_file:
+                # Fails while any TrackStore, in any process, still holds a shared lock
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+        removed.append(path)
+    return removed
+
+def _write_manifest(cache_path: str, manifest: Dict):
+    """Atomically write the manifest file"""
+    manifest_path = os.path.join(cache_path, MANIFEST_FILE)
+    tmp_manifest = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, manifest_path)
@@ -0,0 +1,208 @@
+"""
+Dataset loader - Single-flight loading of the music dataset
+Concurrent sessions share one download, parse and index build; processes share the cache
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from .dataset_cache import CACHE_DIR, get_cache_path, pointer_stamp, prune_cache_versions
+from .dataset_registry import DatasetHandle, resolve_dataset
+from .delta_ingest import carry_indexes
+from .streaming_loader import LoadMetrics, ProgressiveDataset
+from .track_store import TrackStore
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Exclusive lock shared by every process on this machine (no-op where unsupported)"""
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after ~10 s; keep waiting like flock does
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class DatasetLoader:
+    """
+    The one loader of a dataset file in this process
+
+    The first caller runs the load; callers arriving meanwhile wait for it and
+    get the same handle. A file lock next to the cache makes other processes
+    wait too, and they then open the cache instead of parsing again.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        # Called as process_chunk(chunk, warn=...) on the loader thread, where
+        # Streamlit calls are dropped; warnings go to the load's metrics instead
+        process_chunk: Callable[..., pd.DataFrame],
+        prepare: Optional[Callable] = None,
+        fetch_source: Optional[Callable[[str], Tuple[bool, Optional[str]]]] = None,
+        # Chunk reader for a source fetch_source could not provide, e.g. parsing
+        # an LFS object straight from the network; None when there is none
+        stream_source: Optional[Callable[[str], Optional[Callable]]] = None,
+        cache_dir: str = CACHE_DIR,
+    ):
+        self.file_path = file_path
+        self.process_chunk = process_chunk
+        self.prepare = prepare
+        self.fetch_source = fetch_source
+        self.stream_source = stream_source
+        self.cache_dir = cache_dir
+        self.lock_path = os.path.join(cache_dir, f"{os.path.basename(file_path)}.lock")
+        self.metrics = LoadMetrics()
+        self._lock = threading.Lock()
+        self._dataset: Optional[DatasetHandle] = None
+        # Version pointer as of the last check, see refresh()
+        self._pointer_stamp = None
+
+    def handle(self) -> Optional[DatasetHandle]:
+        """Shared dataset handle, loading it on first use (or after a failed load)"""
+        with self._lock:
+            if self._dataset is None or getattr(self._dataset, "error", None) is not None:
+                self.metrics = LoadMetrics()
+                self._dataset = self._load()
+            else:
+                self.metrics.joined += 1
+            return self._dataset
+
+    def refresh(self) -> bool:
+        """
+        Publish a newer cache version, e.g. one written by another process
+
+        Costs one stat per call while nothing changed. A version that is a delta
+        on top of the loaded one inherits its indexes for the touched rows only;
+        any other version gets its indexes prepared before it is published.
+        """
+        stamp = pointer_stamp(self.file_path, self.cache_dir)
+        if stamp is None or stamp == self._pointer_stamp:
+            return False
+        # A load in progress will open the newest version itself
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            loaded = self._dataset.current() if self._dataset is not None else None
+            if not isinstance(loaded, TrackStore):
+                return False
+            self._pointer_stamp = stamp
+            if get_cache_path(self.file_path, self.cache_dir) == loaded.path:
+                return False
+
+            store = self._open_store(None)
+            if store is None or store.path == loaded.path:
+                return False
+            if store.parent == os.path.basename(loaded.path):
+                carry_indexes(loaded, store, store.delta_rows())
+            elif self.prepare is not None:
+                self.prepare(store)
+
+            self._dataset.publish(store)
+        finally:
+            self._lock.release()
+
+        prune_cache_versions(self.file_path, self.cache_dir)
+        return True
+
+    def frame(self) -> Optional[pd.DataFrame]:
+        """Full dataset as a DataFrame, from the same single load"""
+        dataset = self.handle()
+        if dataset is None:
+            return None
+        if isinstance(dataset, ProgressiveDataset):
+            dataset.wait_until_complete()
+            if dataset.error is not None:
+                return None
+
+        data = resolve_dataset(dataset)
+        return data.to_frame() if isinstance(data, TrackStore) else data
+
+    def _open_store(self, known_sha256: Optional[str]) -> Optional[TrackStore]:
+        try:
+            with self.metrics.phase("cache_open"):
+                return TrackStore.open(
+                    self.file_path, cache_dir=self.cache_dir, known_sha256=known_sha256
+                )
+        except Exception:
+            return None
+
+    def _load(self) -> Optional[DatasetHandle]:
+        known_sha256 = None
+        read_chunks = None
+        with file_lock(self.lock_path):
+            store = self._open_store(None)
+            if store is None and self.fetch_source is not None:
+                # Downloads are serialized too: two processes must not fill the same .part
+                with self.metrics.phase("download"):
+                    ready, known_sha256 = self.fetch_source(self.file_path)
+                if ready:
+                    store = self._open_store(known_sha256)
+                elif self.stream_source is not None:
+                    read_chunks = self.stream_source(self.file_path)
+                if not ready and read_chunks is None:
+                    return None
+
+        if store is not None:
+            self.metrics.source = "cache"
+            prune_cache_versions(self.file_path, self.cache_dir)
+            if self.prepare is not None:
+                with self.metrics.phase("index"):
+                    self.prepare(store)
+            self.metrics.finish()
+            return DatasetHandle(store)
+
+        # Stream the CSV in chunks so chat can answer from partial data. The
+        # loader re-checks the cache under the file lock before parsing.
+        dataset = ProgressiveDataset(
+            self.file_path,
+            process_chunk=partial(self.process_chunk, warn=self.metrics.warn),
+            known_sha256=known_sha256,
+            prepare=self.prepare,
+            lock=lambda: file_lock(self.lock_path),
+            metrics=self.metrics,
+            read_chunks=read_chunks,
+        )
+        dataset.start()
+        return dataset
+
+# One loader per dataset file for the whole process
+_LOADERS: Dict[str, DatasetLoader] = {}
+_LOADERS_LOCK = threading.Lock()
+
+def get_dataset_loader(file_path: str, **kwargs) -> DatasetLoader:
+    """Process-wide loader for a file; keyword arguments only apply on first use"""
+    key = os.path.abspath(file_path)
+    with _LOADERS_LOCK:
+        if key not in _LOADERS:
+            _LOADERS[key] = DatasetLoader(file_path, **kwargs)
+        return _LOADERS[key]
@@ -0,0 +1,103 @@
+"""
+Dataset registry - Versioned dataset handle with pinned, immutable snapshots
+A multi-step run pins one version so reloads and deltas cannot change data mid-run
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# id(handle) -> snapshot pinned by the current run (thread / task local)
+_PINNED: ContextVar[Dict[int, "DatasetSnapshot"]] = ContextVar("moodify_pinned", default={})
+
+class DatasetSnapshot:
+    """One dataset version; versions are never mutated, so sharing is copy-free"""
+
+    __slots__ = ("version", "data")
+
+    def __init__(self, version: int, data):
+        self.version = version
+        self.data = data
+
+class DatasetHandle:
+    """Shared reference to the current dataset; new versions are swapped in atomically"""
+
+    def __init__(self, data=None):
+        self.version = 0
+        self._data = data
+        self._lock = threading.Lock()
+        # Older versions kept alive only while a run pins them: version -> (pins, data)
+        self._pinned: Dict[int, list] = {}
+
+    def current(self):
+        """Latest published dataset"""
+        with self._lock:
+            return self._data
+
+    def snapshot(self) -> DatasetSnapshot:
+        """Current version without pinning it"""
+        with self._lock:
+            return DatasetSnapshot(self.version, self._data)
+
+    def publish(self, data):
+        """Replace the dataset with a single reference assignment"""
+        with self._lock:
+            self._data = data
+            self.version += 1
+
+    @contextmanager
+    def pin(self):
+        """
+        Pin the current version for the duration of a run
+
+        Inside the block resolve_dataset(handle) returns the pinned data, even if
+        a newer version is published meanwhile. Nested pins reuse the outer one.
+        """
+        active = _PINNED.get()
+        if id(self) in active:
+            yield active[id(self)]
+            return
+
+        with self._lock:
+            snapshot = DatasetSnapshot(self.version, self._data)
+            entry = self._pinned.setdefault(snapshot.version, [0, snapshot.data])
+            entry[0] += 1
+
+        token = _PINNED.set({**active, id(self): snapshot})
+        try:
+            yield snapshot
+        finally:
+            _PINNED.reset(token)
+            self._release(snapshot.version)
+
+    def _release(self, version: int):
+        """Drop a pin; the last one lets an old version be garbage collected"""
+        with self._lock:
+            entry = self._pinned[version]
+            entry[0] -= 1
+            if entry[0] == 0:
+                del self._pinned[version]
+
+    def pinned_versions(self) -> Dict[int, int]:
+        """Pin count per version still held by running work"""
+        with self._lock:
+            return {version: entry[0] for version, entry in self._pinned.items()}
+
+@contextmanager
+def pin_dataset(data):
+    """Pin a handle's current version; plain datasets are already immutable"""
+    if isinstance(data, DatasetHandle):
+        with data.pin() as snapshot:
+            yield snapshot.data
+    else:
+        yield resolve_dataset(data)
+
+def resolve_dataset(data):
+    """Unwrap a handle to the pinned version of this run, else the latest one"""
+    if isinstance(data, DatasetHandle):
+        snapshot: Optional[DatasetSnapshot] = _PINNED.get().get(id(data))
+        return snapshot.data if snapshot is not None else data.current()
+    if isinstance(data, DatasetSnapshot):
+        return data.data
+    return data
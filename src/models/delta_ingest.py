@@ -0,0 +1,112 @@
+"""
+Delta ingest - Upsert small batches of new or changed tracks keyed by track_id
+Processes only the delta rows and carries derived indexes over to the new version
+"""
+
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ingest_schema import (
+    SPOTIFY_SCHEMA,
+    get_read_csv_kwargs,
+    read_spotify_csv,
+    restore_int_columns,
+)
+from .mood_index import carry_dataset_indexes
+from .streaming_loader import concat_chunks
+from .track_store import TrackStore
+
+KEY_COLUMN = "track_id"
+
+def read_delta(file_path: str) -> pd.DataFrame:
+    """Parse a delta CSV or JSONL with the declared schema"""
+    if file_path.endswith((".jsonl", ".json")):
+        delta = pd.read_json(file_path, lines=True, dtype=False)
+        delta = delta[[col for col in delta.columns if col in SPOTIFY_SCHEMA]]
+        dtypes = get_read_csv_kwargs()["dtype"]
+        delta = restore_int_columns(delta.astype({col: dtypes[col] for col in delta.columns}))
+    else:
+        delta = read_spotify_csv(file_path)
+
+    if KEY_COLUMN not in delta.columns:
+        raise ValueError(f"Delta file has no '{KEY_COLUMN}' column")
+
+    # A track listed twice in one delta keeps its last version
+    return delta.drop_duplicates(KEY_COLUMN, keep="last").reset_index(drop=True)
+
+def to_frame(data) -> pd.DataFrame:
+    """Writable DataFrame copy of a dataset (DataFrame or TrackStore)"""
+    if isinstance(data, TrackStore):
+        return data.to_frame()
+    return data.reset_index(drop=True)
+
+def locate_tracks(data, track_ids) -> np.ndarray:
+    """Row id of the last row holding each track_id, -1 for tracks not in `data`"""
+    track_ids = pd.Index(track_ids, dtype=object)
+    if isinstance(data, TrackStore):
+        # Compare dictionary codes instead of decoding the key column
+        wanted = pd.Index(data.dictionary(KEY_COLUMN, cache=False)).get_indexer(track_ids)
+        codes = np.asarray(data.values(KEY_COLUMN))
+        hits = np.flatnonzero(np.isin(codes, wanted[wanted >= 0]))
+        positions = pd.Series(hits, index=codes[hits])
+        keys = wanted
+    else:
+        positions = pd.Series(np.arange(len(data)), index=data[KEY_COLUMN].to_numpy())
+        keys = track_ids
+
+    positions = positions[~positions.index.duplicated(keep="last")]
+    located = positions.reindex(keys).to_numpy()
+    return np.where(np.isnan(located), -1, located).astype(np.int64)
+
+def plan_upsert(data, delta: pd.DataFrame) -> np.ndarray:
+    """
+    Target row id of every delta row: the row it replaces, or a new one past the end
+
+    Existing rows keep their positions, so row ids stay stable across versions.
+    """
+    row_ids = locate_tracks(data, delta[KEY_COLUMN].to_numpy())
+    added = row_ids < 0
+    row_ids[added] = len(data) + np.arange(int(added.sum()))
+    return row_ids
+
+def upsert_tracks(base: pd.DataFrame, delta: pd.DataFrame, row_ids: np.ndarray) -> pd.DataFrame:
+    """In-memory new version: delta rows placed at `row_ids` (see plan_upsert)"""
+    # Delta rows go after the base; a take order then swaps them into place
+    combined = concat_chunks([base, delta[base.columns]])
+    order = np.arange(max(len(base), int(row_ids.max()) + 1 if len(row_ids) else 0))
+    order[row_ids] = len(base) + np.arange(len(delta))
+    return combined.iloc[order].reset_index(drop=True)
+
+def apply_delta(
+    data, delta_path: str, process_chunk: Callable[[pd.DataFrame], pd.DataFrame]
+) -> Tuple[pd.DataFrame, np.ndarray, Dict]:
+    """
+    Read a delta file and plan where its rows go in `data`
+
+    Only the delta rows go through `process_chunk` (mood classification etc.).
+    Returns the processed delta, the row id of each delta row and a summary;
+    `data` itself is not copied or materialized.
+    """
+    delta = process_chunk(read_delta(delta_path))
+    missing = pd.Index(data.columns).difference(delta.columns)
+    if len(missing):
+        raise ValueError(f"Delta rows must be complete, missing columns: {list(missing)}")
+
+    row_ids = plan_upsert(data, delta)
+    added = int(np.sum(row_ids >= len(data)))
+    summary = {
+        "updated": len(row_ids) - added,
+        "added": added,
+        "rows": len(data) + added,
+    }
+    return delta, row_ids, summary
+
+def carry_indexes(old_data, new_data, row_ids: np.ndarray) -> list:
+    """Update the old version's derived indexes for the touched rows only"""
+    if isinstance(new_data, TrackStore):
+        rows = new_data.take(row_ids)
+    else:
+        rows = new_data.iloc[row_ids]
+    return carry_dataset_indexes(old_data, new_data, row_ids, rows)
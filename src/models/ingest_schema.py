@@ -0,0 +1,79 @@
+"""
+Ingest schema - Declared dtypes for spotify_data.csv
+Applies compact dtypes and column pruning at parse time instead of after loading
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Audio features fit comfortably in float32 (CSV values have <= 6 significant digits)
+AUDIO_FEATURES = [
+    "danceability",
+    "energy",
+    "loudness",
+    "speechiness",
+    "acousticness",
+    "instrumentalness",
+    "liveness",
+    "valence",
+    "tempo",
+]
+
+# Declared dtype per column; columns not listed here are never loaded
+SPOTIFY_SCHEMA: Dict[str, object] = {
+    "artist_name": "category",
+    "track_name": "object",
+    "track_id": "object",
+    "genre": "category",
+    "popularity": "int8",  # 0..100
+    "year": "int16",
+    "key": "int8",  # -1..11
+    "mode": "int8",  # 0/1
+    "time_signature": "int8",
+    "duration_ms": "int32",
+    **{feature: "float32" for feature in AUDIO_FEATURES},
+}
+
+# Declared integer columns; blank cells make a column float32 with NaN instead
+INT_COLUMNS = [col for col, dtype in SPOTIFY_SCHEMA.items() if str(dtype).startswith("int")]
+
+def get_read_csv_kwargs() -> Dict:
+    """pd.read_csv arguments that apply the declared schema"""
+    return {
+        "usecols": lambda column: column in SPOTIFY_SCHEMA,
+        # Integers parse as floats (as fast as ints, unlike nullable dtypes) so a
+        # blank cell does not fail the file; restore_int_columns narrows them again
+        "dtype": {
+            col: ("float64" if dtype == "int32" else "float32") if col in INT_COLUMNS else dtype
+            for col, dtype in SPOTIFY_SCHEMA.items()
+        },
+        "engine": "c",
+        "encoding": "utf-8",
+    }
+
+def restore_int_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Integer columns back to their declared dtype, or float32 with NaN when values are missing"""
+    for col in INT_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=np.float64)
+        if np.isnan(values).any() or np.any(values % 1):
+            df[col] = values.astype(np.float32)
+        else:
+            df[col] = values.astype(SPOTIFY_SCHEMA[col])
+    return df
+
+def read_spotify_csv(file_path, **kwargs):
+    """Parse the Spotify CSV with the declared schema (extra kwargs, e.g. chunksize, pass through)"""
+    read_kwargs = get_read_csv_kwargs()
+    read_kwargs.update(kwargs)
+    if read_kwargs.get("chunksize") is None:
+        return restore_int_columns(pd.read_csv(file_path, **read_kwargs))
+    return _restored_chunks(pd.read_csv(file_path, **read_kwargs))
+
+def _restored_chunks(reader):
+    with reader:
+        for chunk in reader:
+            yield restore_int_columns(chunk)
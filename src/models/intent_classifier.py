@@ -0,0 +1,268 @@
+"""
+Intent classifier - Local intent and mood detection for chat messages
+Character n-gram TF-IDF with cosine centroids; runs on CPU in microseconds, no LLM call
+"""
+
+import json
+import math
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config.app_config import (
+    INTENT_EXAMPLES,
+    INTENT_LOG_MAX_BYTES,
+    INTENT_LOG_PATH,
+    MOOD_KEYWORDS,
+)
+
+from .mood_matcher import MoodResolver, normalize_text
+from .music_analyzer import MOOD_RESOLVER
+
+# Character n-gram lengths (words are padded, so n-grams do not span words)
+NGRAM_RANGE = (2, 4)
+
+# Scales cosine similarities before the softmax that turns them into confidences
+SHARPNESS = 12.0
+
+# Below this the message is left to the agent
+DIRECT_CONFIDENCE = 0.6
+
+# Typo-tolerant mood guesses below this fall back to "neutral"
+MOOD_CONFIDENCE = 0.5
+
+# Intents answered from the tools without the agent
+DIRECT_INTENTS = ("recommend", "analyze")
+
+# Agent tool -> intent of the turn (a turn without tools is small talk)
+TOOL_INTENTS = {
+    "recommend_songs": "recommend",
+    "analyze_features": "analyze",
+    "similar_songs": "similar",
+    "search_lyrics": "lyrics",
+    "search_info": "search",
+}
+
+def text_features(text: str, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Counter:
+    """Counts of the character n-grams of each space-padded word, plus the words themselves"""
+    low, high = ngram_range
+    features = Counter()
+    for word in normalize_text(text).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                features[padded[i : i + n]] += 1
+        # Whole words keep long cue words ("lirik", "analisis") distinct
+        features[f"w:{word}"] += 1
+    return features
+
+class NgramCentroidClassifier:
+    """TF-IDF over character n-grams and words; a label's centroid is the mean of its examples"""
+
+    def __init__(self, sharpness: float = SHARPNESS):
+        self.sharpness = sharpness
+        self.labels: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0)
+        self.centroids = np.zeros((0, 0))
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "NgramCentroidClassifier":
+        grams = [text_features(text) for text in texts]
+        document_frequency = Counter(gram for counts in grams for gram in counts)
+        self.vocabulary = {gram: i for i, gram in enumerate(sorted(document_frequency))}
+        self.idf = np.array(
+            [
+                math.log((1 + len(texts)) / (1 + document_frequency[gram])) + 1
+                for gram in sorted(document_frequency)
+            ]
+        )
+
+        self.labels = sorted(set(labels))
+        position = {label: i for i, label in enumerate(self.labels)}
+        centroids = np.zeros((len(self.labels), len(self.vocabulary)))
+        for counts, label in zip(grams, labels):
+            indices, weights = self._weights(counts)
+            centroids[position[label], indices] += weights
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.where(norms > 0, norms, 1)
+        return self
+
+    def _weights(self, counts: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """L2-normalized sublinear TF-IDF of known n-grams, as (indices, weights)"""
+        known = [
+            (self.vocabulary[gram], count) for gram, count in counts.items() if gram in self.vocabulary
+        ]
+        if not known:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        indices = np.fromiter((i for i, _ in known), dtype=np.int64, count=len(known))
+        tf = 1 + np.log(np.fromiter((c for _, c in known), dtype=np.float64, count=len(known)))
+        weights = tf * self.idf[indices]
+        return indices, weights / np.linalg.norm(weights)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        indices, weights = self._weights(text_features(text))
+        if not len(indices):
+            return {label: 1 / len(self.labels) for label in self.labels}
+        similarity = self.centroids[:, indices] @ weights
+        scaled = np.exp(self.sharpness * (similarity - similarity.max()))
+        return dict(zip(self.labels, (scaled / scaled.sum()).tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        proba = self.predict_proba(text)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+@dataclass
+class IntentPrediction:
+    intent: str
+    intent_confidence: float
+    mood: str
+    mood_confidence: float
+
+    @property
+    def direct(self) -> bool:
+        """Confident enough to answer with a tool instead of the agent"""
+        return self.intent in DIRECT_INTENTS and self.intent_confidence >= DIRECT_CONFIDENCE
+
+class IntentClassifier:
+    """
+    Intent from an n-gram model trained on seed and logged messages; mood from
+    the keyword resolver, with an n-gram model over the keywords for messages
+    the keywords miss (typos, inflections)
+    """
+
+    def __init__(
+        self,
+        examples: Dict[str, List[str]],
+        mood_keywords: Dict[str, List[str]],
+        resolver: MoodResolver,
+        logged_turns: Iterable[Dict] = (),
+    ):
+        texts = [text for texts in examples.values() for text in texts]
+        labels = [intent for intent, texts in examples.items() for _ in texts]
+        for turn in logged_turns:
+            # Routed turns carry this classifier's own guess, not a label
+            if not is_agent_turn(turn):
+                continue
+            if turn.get("text") and turn.get("intent") in examples:
+                texts.append(turn["text"])
+                labels.append(turn["intent"])
+        self.intents = NgramCentroidClassifier().fit(texts, labels)
+
+        keywords = [(keyword, mood) for mood, words in mood_keywords.items() for keyword in words]
+        self.moods = NgramCentroidClassifier().fit(
+            [keyword for keyword, _ in keywords], [mood for _, mood in keywords]
+        )
+        self.resolver = resolver
+
+    def predict(self, text: str) -> IntentPrediction:
+        intent, intent_confidence = self.intents.predict(text)
+
+        scores = self.resolver.matcher.scores(text)
+        positive = {mood: score for mood, score in scores.items() if score > 0}
+        if positive:
+            mood = self.resolver.resolve(text)
+            mood_confidence = positive.get(mood, 0) / sum(positive.values())
+        else:
+            mood, mood_confidence = self.moods.predict(text)
+            if mood_confidence < MOOD_CONFIDENCE:
+                mood = "neutral"
+        return IntentPrediction(intent, intent_confidence, mood, mood_confidence)
+
+# LOGGED AGENT TURNS
+
+def intent_from_steps(intermediate_steps) -> Tuple[str, Optional[str]]:
+    """(intent, tool input) of an agent turn from its first tool call"""
+    for step in intermediate_steps or ():
+        action = step[0] if isinstance(step, (tuple, list)) else step
+        tool = getattr(action, "tool", None)
+        if tool in TOOL_INTENTS:
+            tool_input = getattr(action, "tool_input", None)
+            return TOOL_INTENTS[tool], tool_input if isinstance(tool_input, str) else None
+    return "chat", None
+
+def is_agent_turn(turn: Dict) -> bool:
+    """Whether the agent chose the intent (records before routing have no route)"""
+    return turn.get("route", "agent") == "agent"
+
+def _append_turn(record: Dict, path: Optional[str], max_bytes: int = INTENT_LOG_MAX_BYTES):
+    """Append one record, rotating a full log to "<path>.1"; never fails the chat turn"""
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            os.replace(path, f"{path}.1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+def log_agent_turn(
+    text: str, intermediate_steps, latency_ms: float, path: Optional[str] = INTENT_LOG_PATH
+):
+    """Append what the agent did with a message (only when the log is enabled)"""
+    intent, tool_input = intent_from_steps(intermediate_steps)
+    mood = None
+    if intent in DIRECT_INTENTS and tool_input:
+        mood = MOOD_RESOLVER.resolve_argument(tool_input)
+    record = {
+        "text": text,
+        "intent": intent,
+        "mood": mood,
+        "route": "agent",
+        "latency_ms": round(latency_ms, 1),
+    }
+    _append_turn(record, path)
+
+def log_routed_turn(
+    text: str,
+    intent: str,
+    mood: Optional[str],
+    source: str,
+    latency_ms: float,
+    path: Optional[str] = INTENT_LOG_PATH,
+):
+    """Append a turn answered without the agent, with the rule or classifier that routed it"""
+    record = {
+        "text": text,
+        "intent": intent,
+        "mood": mood if intent in DIRECT_INTENTS else None,
+        "route": source,
+        "latency_ms": round(latency_ms, 1),
+    }
+    _append_turn(record, path)
+
+def load_logged_turns(path: Optional[str] = INTENT_LOG_PATH) -> List[Dict]:
+    """Logged turns, oldest first (the rotated file, then the current one)"""
+    turns = []
+    for part in (f"{path}.1", path) if path else ():
+        if not os.path.exists(part):
+            continue
+        with open(part, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    turns.append(json.loads(line))
+                except ValueError:
+                    continue
+    return turns
+
+_CLASSIFIER: Optional[IntentClassifier] = None
+_CLASSIFIER_LOCK = threading.Lock()
+
+def get_intent_classifier() -> IntentClassifier:
+    """Process-wide classifier, trained on first use from seeds plus logged turns"""
+    global _CLASSIFIER
+    with _CLASSIFIER_LOCK:
+        if _CLASSIFIER is None:
+            _CLASSIFIER = IntentClassifier(
+                INTENT_EXAMPLES, MOOD_KEYWORDS, MOOD_RESOLVER, load_logged_turns()
+            )
+        return _CLASSIFIER
+
+def classify_message(text: str) -> IntentPrediction:
+    return get_intent_classifier().predict(text)
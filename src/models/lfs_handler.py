@@ -5,29 +5,91 @@ Handles large file operations and storage management
 
 import os
 import subprocess
-from io import StringIO
 
-import pandas as pd
 import requests
 import streamlit as st
 
-def download_from_github_lfs(repo_owner, repo_name, file_path):
-    """Download LFS file directly from GitHub"""
+from .lfs_fetch import LFSFetchError, fetch_lfs_object, lfs_media_url, stream_lfs_csv
 
-    # GitHub LFS media URL format
-    lfs_url = f"https://media.githubusercontent.com/media/{repo_owner}/{repo_name}/main/{file_path}"
+LFS_POINTER_HEADER = "version https://git-lfs.github.com/spec/v1"
+
+def read_lfs_pointer(file_path):
+    """Parse a Git LFS pointer file and return its sha256 oid and size"""
+
+    if not os.path.exists(file_path) or os.path.getsize(file_path) >= 1024:
+        return None
 
     try:
-        response = requests.get(lfs_url)
-        if response.status_code == 200:
-            return StringIO(response.text)
-        else:
-            st.error(f"Failed to download from GitHub LFS. Status: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Error downloading from GitHub LFS: {str(e)}")
+        with open(file_path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if not lines or lines[0].strip() != LFS_POINTER_HEADER:
         return None
 
+    pointer = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(" ")
+        if key == "oid" and value.startswith("sha256:"):
+            pointer["oid"] = value[len("sha256:") :].strip()
+        elif key == "size" and value.strip().isdigit():
+            pointer["size"] = int(value.strip())
+
+    return pointer if "oid" in pointer and "size" in pointer else None
+
+def pull_lfs_file(file_path, progress=None, git_timeout=60):
+    """
+    Replace an LFS pointer with the real file
+    Fetches over HTTP (parallel ranges, resumable, sha256-checked) and falls back to git lfs pull
+    Returns (success, message)
+    """
+
+    pointer = read_lfs_pointer(file_path)
+    if pointer is None:
+        return True, "File is not an LFS pointer"
+
+    try:
+        fetch_lfs_object(
+            lfs_media_url(file_path), file_path, pointer["oid"], pointer["size"], progress=progress
+        )
+        return True, f"Downloaded {pointer['size'] / (1024 * 1024):.1f} MB"
+    except (LFSFetchError, requests.RequestException, OSError) as e:
+        fetch_error = str(e)
+
+    # Fallback: git credentials may reach repositories the media URL cannot
+    try:
+        result = subprocess.run(
+            ["git", "lfs", "pull", "--include", file_path],
+            capture_output=True,
+            text=True,
+            cwd=".",
+            timeout=git_timeout,
+        )
+    except FileNotFoundError:
+        return False, f"HTTP fetch failed ({fetch_error}) and git is not installed"
+    except subprocess.TimeoutExpired:
+        return False, f"HTTP fetch failed ({fetch_error}) and git lfs pull timed out"
+
+    if result.returncode != 0 or read_lfs_pointer(file_path) is not None:
+        return False, f"HTTP fetch failed ({fetch_error}); git lfs pull failed: {result.stderr}"
+
+    return True, f"Downloaded {os.path.getsize(file_path) / (1024 * 1024):.1f} MB via git lfs"
+
+def stream_from_github_lfs(file_path):
+    """
+    Chunk reader parsing the LFS object straight from the download stream, without a local copy
+    Returns a `read_chunks(chunksize)` callable, or None when the file is not an LFS pointer
+    """
+
+    pointer = read_lfs_pointer(file_path)
+    if pointer is None:
+        return None
+
+    # The stream is verified against the pointer's oid once the body ends
+    url = lfs_media_url(file_path)
+    return lambda chunksize: stream_lfs_csv(url, oid=pointer["oid"], chunksize=chunksize)
+
 def check_lfs_file_status(file_path):
     """Check if file is LFS pointer and handle download with git lfs pull"""
 
@@ -40,125 +102,31 @@ def check_lfs_file_status(file_path):
     if file_size < 1000:
         st.info("📥 Detecting Git LFS pointer file. Attempting download...")
 
-        try:
-            # Check if git lfs is installed
-            lfs_check = subprocess.run(
-                ["git", "lfs", "version"], capture_output=True, text=True
-            )
-
-            if lfs_check.returncode != 0:
-                return False, "Git LFS not installed"
-
-            # Pull LFS files
-            result = subprocess.run(
-                ["git", "lfs", "pull"], capture_output=True, text=True, cwd="."
-            )
-
-            if result.returncode != 0:
-                return False, f"Git LFS pull failed: {result.stderr}"
-
-            # Check if file size increased after pull
-            new_size = os.path.getsize(file_path)
-            if new_size > file_size:
-                size_mb = new_size / (1024 * 1024)
-                st.success(
-                    f"✅ Git LFS file downloaded successfully! Size: {size_mb:.1f} MB"
-                )
-                return True, f"Downloaded {size_mb:.1f} MB"
-            else:
-                return False, "File download may have failed - size unchanged"
-
-        except FileNotFoundError:
-            return False, "Git command not found"
-        except Exception as e:
-            return False, f"Error during LFS pull: {str(e)}"
+        success, message = pull_lfs_file(file_path)
+        if not success:
+            return False, message
+
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        st.success(f"✅ Git LFS file downloaded successfully! Size: {size_mb:.1f} MB")
+        return True, message
 
     # File is already the correct size
     size_mb = file_size / (1024 * 1024)
     return True, f"File ready ({size_mb:.1f} MB)"
 
-@st.cache_data
 def load_spotify_data():
-    """Load spotify data with LFS support - Enhanced version"""
+    """Load spotify data through the shared single-flight loader"""
 
-    file_path = "spotify_data.csv"
+    # Imported here: data_manager builds on this module
+    from .data_manager import load_music_data
 
-    # Check if file exists
-    if not os.path.exists(file_path):
-        st.error("spotify_data.csv not found!")
+    df = load_music_data()
+    if df is None:
+        st.error("❌ Error loading spotify_data.csv")
         return None
 
-    # Check if file is LFS pointer (small file)
-    file_size = os.path.getsize(file_path)
-
-    if file_size < 1000:  # LFS pointer files are very small
-        st.info("📥 Downloading large file via Git LFS...")
-        try:
-            # Pull LFS files
-            result = subprocess.run(
-                ["git", "lfs", "pull"], capture_output=True, text=True, cwd="."
-            )
-            if result.returncode != 0:
-                st.error(f"Git LFS pull failed: {result.stderr}")
-                return None
-            else:
-                st.success("✅ Git LFS pull completed successfully!")
-        except Exception as e:
-            st.error(f"Error pulling LFS files: {str(e)}")
-            return None
-
-    try:
-        # Load the CSV file
-        df = pd.read_csv(file_path)
-        file_size_mb = file_size / (1024 * 1024)
-        st.success(
-            f"✅ Data loaded successfully! Shape: {df.shape} | Size: {file_size_mb:.1f} MB"
-        )
-        return df
-    except Exception as e:
-        st.error(f"❌ Error loading CSV: {str(e)}")
-        return None
-
-def load_spotify_data_with_fallback():
-    """Load data with multiple fallback methods"""
-    
-    file_path = "spotify_data.csv"
-    
-    # Method 1: Try local file
-    if os.path.exists(file_path):
-        try:
-            df = pd.read_csv(file_path)
-            file_size = os.path.getsize(file_path)
-            
-            # Check if it's actual data, not LFS pointer
-            if len(df) > 1000 and file_size > 1000:  
-                st.success(f"✅ Data loaded from local file! Shape: {df.shape}")
-                return df
-            else:
-                st.info("📝 Local file appears to be LFS pointer, trying GitHub LFS...")
-        except Exception as e:
-            st.warning(f"⚠️ Error reading local file: {str(e)}")
-    
-    # Method 2: Try GitHub LFS direct download
-    st.info("📥 Downloading data from GitHub LFS...")
-    csv_buffer = download_from_github_lfs("masuden0000", "Celerates_Moodify", "spotify_data.csv")
-    
-    if csv_buffer:
-        try:
-            df = pd.read_csv(csv_buffer)
-            st.success(f"✅ Data loaded from GitHub LFS! Shape: {df.shape}")
-            return df
-        except Exception as e:
-            st.error(f"❌ Error parsing CSV from GitHub LFS: {str(e)}")
-    
-    # Method 3: Error state
-    st.error("❌ Unable to load Spotify data from any source")
-    st.info("🔧 Available fallback options:")
-    st.info("- Check if Git LFS is properly configured")
-    st.info("- Verify GitHub repository access")
-    st.info("- Consider using alternative data sources")
-    
-    return None
+    st.success(f"✅ Data loaded successfully! Shape: {df.shape}")
+    return df
 
 def get_file_info(df):
     """Get file information for display"""
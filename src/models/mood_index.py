@@ -0,0 +1,134 @@
+"""
+Mood index - Precomputed row ids per mood and a per-dataset index cache
+Evaluates MOOD_CRITERIA once per dataset so lookups cost O(result)
+"""
+
+import hashlib
+import json
+import weakref
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.models.artifacts import load_or_build
+from src.models.query_backend import get_backend
+
+def criteria_fingerprint(criteria: Dict) -> str:
+    """Stable hash of a criteria table, used to detect edits to MOOD_CRITERIA"""
+    payload = json.dumps(criteria, sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class MoodIndex:
+    """Sorted int32 row ids for every mood in a criteria table"""
+
+    def __init__(self, row_ids: Dict[str, np.ndarray], criteria: Dict, total_rows: int):
+        self.row_ids = row_ids
+        self.criteria = criteria
+        self.fingerprint = criteria_fingerprint(criteria)
+        self.total_rows = total_rows
+
+    @classmethod
+    def build(cls, data, criteria: Dict) -> "MoodIndex":
+        """Run every mood filter once over the dataset"""
+        backend = get_backend()
+        row_ids = {}
+        for mood, mood_criteria in criteria.items():
+            ids = backend.filter_rows(data, mood_criteria)
+            row_ids[mood] = np.sort(ids).astype(np.int32)
+        return cls(row_ids, criteria, len(data))
+
+    def updated(self, data, row_ids: np.ndarray, rows) -> "MoodIndex":
+        """Copy for a new dataset version where only `row_ids` (values in `rows`) changed"""
+        backend = get_backend()
+        merged = {}
+        for mood, mood_criteria in self.criteria.items():
+            kept = np.setdiff1d(self.row_ids[mood], row_ids, assume_unique=True)
+            matched = row_ids[backend.filter_rows(rows, mood_criteria)]
+            merged[mood] = np.union1d(kept, matched).astype(np.int32)
+        return MoodIndex(merged, self.criteria, len(data))
+
+    def to_artifact(self):
+        return {f"mood_{i}": self.row_ids[mood] for i, mood in enumerate(self.criteria)}, {}
+
+    @classmethod
+    def from_artifact(cls, arrays, data, criteria: Dict, total_rows: int) -> "MoodIndex":
+        row_ids = {mood: arrays[f"mood_{i}"] for i, mood in enumerate(criteria)}
+        return cls(row_ids, criteria, total_rows)
+
+    def rows(self, mood: str) -> np.ndarray:
+        """Row ids for a mood; unknown moods use the neutral criteria"""
+        if mood in self.row_ids:
+            return self.row_ids[mood]
+        return self.row_ids.get("neutral", np.empty(0, dtype=np.int32))
+
+    def count(self, mood: str) -> int:
+        return len(self.rows(mood))
+
+    def nbytes(self) -> int:
+        return sum(ids.nbytes for ids in self.row_ids.values())
+
+# PER-DATASET CACHE
+
+# (id(dataset), kind) -> (weakref to dataset, index)
+_INDEXES: Dict[tuple, tuple] = {}
+
+def _forget(key: tuple, ref: weakref.ref):
+    """Weakref callback: drop the entry unless the id was already reused"""
+    entry = _INDEXES.get(key)
+    if entry is not None and entry[0] is ref:
+        del _INDEXES[key]
+
+def get_dataset_index(data, kind: str, fingerprint: str, builder: Callable):
+    """Index of a given kind for a dataset, rebuilt if the dataset or its fingerprint changed"""
+    key = (id(data), kind)
+    entry = _INDEXES.get(key)
+
+    if (
+        entry is not None
+        and entry[0]() is data
+        and entry[1].fingerprint == fingerprint
+        and entry[1].total_rows == len(data)
+    ):
+        return entry[1]
+
+    return _register(data, kind, builder())
+
+def _register(data, kind: str, index):
+    """Cache an index for a dataset, dropping it together with the dataset"""
+    key = (id(data), kind)
+    ref = weakref.ref(data, lambda ref, key=key: _forget(key, ref))
+    _INDEXES[key] = (ref, index)
+    return index
+
+def carry_dataset_indexes(old_data, new_data, row_ids: np.ndarray, rows) -> List[str]:
+    """
+    Derive the new version's indexes from the old ones after an upsert
+
+    Only `row_ids` changed or were appended; `rows` holds their values in the
+    same order. Indexes without an `updated` method are rebuilt lazily.
+    """
+    carried = []
+    for (data_id, kind), (ref, index) in list(_INDEXES.items()):
+        if data_id != id(old_data) or ref() is not old_data:
+            continue
+        if hasattr(index, "updated"):
+            _register(new_data, kind, index.updated(new_data, row_ids, rows))
+            carried.append(kind)
+    return carried
+
+def get_mood_index(data, criteria: Dict) -> MoodIndex:
+    """Mood index for a dataset, rebuilt only if the dataset or criteria changed"""
+    fingerprint = criteria_fingerprint(criteria)
+    return get_dataset_index(
+        data,
+        "mood",
+        fingerprint,
+        lambda: load_or_build(
+            data,
+            "mood_index",
+            fingerprint,
+            load=lambda arrays, meta: MoodIndex.from_artifact(arrays, meta, criteria, len(data)),
+            build=lambda: MoodIndex.build(data, criteria),
+            save=MoodIndex.to_artifact,
+        ),
+    )
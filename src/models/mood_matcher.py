@@ -0,0 +1,185 @@
+"""
+Mood matcher - Keyword scoring of free text for every mood in one pass
+Keywords are compiled once into a trie-shaped regex; matches map to precomputed per-mood weights
+"""
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Score a context keyword adds to its mood (plain keywords score their word count)
+CONTEXT_BOOST_WEIGHT = 3
+
+# Score of a hint word: decides only when no real keyword matched
+HINT_WEIGHT = 0.1
+
+# Distinct normalized inputs remembered by MoodResolver
+RESOLVER_CACHE_SIZE = 4096
+
+def _trie_regex(words: List[str]) -> str:
+    """
+    Regex matching the longest of `words` that starts at the current position
+
+    A trie keeps the alternation cheap: each position branches on one
+    character instead of trying every keyword.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy optional: the longer keyword is tried before stopping here
+        return f"(?:{body})?" if "" in node else body
+
+    return render(trie)
+
+class MoodKeywordMatcher:
+    """
+    Scores text against mood keyword lists plus context keywords
+
+    Semantics match the substring scan it replaces: every keyword contained
+    in the lowercased text counts once, weighted by its word count, and a
+    context keyword adds CONTEXT_BOOST_WEIGHT to its mood and a hint word
+    adds HINT_WEIGHT.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, List[str]],
+        context_boost: Dict[str, str],
+        hints: Optional[Dict[str, str]] = None,
+    ):
+        self.moods = list(keywords)
+
+        # keyword -> mood -> weight (a keyword may sit in several lists, or twice in one)
+        weights: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        boosts: Dict[str, List[tuple]] = defaultdict(list)
+        for rank, (keyword, mood) in enumerate(context_boost.items()):
+            weights[keyword][mood] += CONTEXT_BOOST_WEIGHT
+            boosts[keyword].append((rank, mood))
+        for mood, mood_keywords in keywords.items():
+            for keyword in mood_keywords:
+                weights[keyword][mood] += len(keyword.split())
+        for keyword, mood in (hints or {}).items():
+            weights[keyword][mood] += HINT_WEIGHT
+
+        vocabulary = [keyword for keyword in weights if keyword]
+        self._weights = {keyword: dict(weights[keyword]) for keyword in vocabulary}
+        self._boosts = dict(boosts)
+        # The regex reports the longest keyword per start; shorter ones there are its prefixes
+        self._prefixes = {
+            keyword: [other for other in vocabulary if keyword.startswith(other)]
+            for keyword in vocabulary
+        }
+        self._pattern = re.compile(f"(?=({_trie_regex(vocabulary)}))")
+
+    def matches(self, text: str) -> set:
+        """Keywords contained in `text` (already lowercased)"""
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._prefixes[match.group(1)])
+        return found
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """
+        Score per mood, in the order the scan built them: boosted moods first
+        (context keyword order), then the keyword lists. Ties go to the first.
+        """
+        found = self.matches(text.lower())
+        totals: Dict[str, float] = defaultdict(float)
+        # Boosted mood -> position of its first matching context keyword
+        boosted: Dict[str, int] = {}
+        for keyword in found:
+            for mood, weight in self._weights[keyword].items():
+                totals[mood] += weight
+            for rank, mood in self._boosts.get(keyword, ()):
+                boosted[mood] = min(rank, boosted.get(mood, rank))
+
+        order = sorted(boosted, key=boosted.get)
+        order += [mood for mood in self.moods if mood not in boosted]
+        return {mood: totals[mood] for mood in order}
+
+    def best(self, text: str) -> str:
+        """Highest-scoring mood, or "neutral" if no keyword matched"""
+        scores = self.scores(text)
+        if not scores:
+            return "neutral"
+        mood = max(scores, key=scores.get)
+        return mood if scores[mood] > 0 else "neutral"
+
+def normalize_text(text: str) -> str:
+    """Lowercased, with runs of whitespace collapsed (the resolver's cache key)"""
+    return " ".join(str(text).lower().split())
+
+_WORD = re.compile(r"[a-z]+")
+
+class MoodResolver:
+    """
+    The one mapping from free text or a tool argument to a canonical mood label
+
+    Exact labels and aliases ("energy" -> "energetic") are a dict lookup;
+    anything else is scored by the keyword matcher. A label or alias named
+    inside a tool argument wins over scoring ("musik calm"); in a chat
+    message it may be negated ("gak happy, lagi galau"), so there it only
+    decides when no keyword matched. Results are memoized on the normalized
+    input, so repeated lookups within a message are free.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, List[str]],
+        context_boost: Dict[str, str],
+        hints: Optional[Dict[str, str]] = None,
+        aliases: Optional[Dict[str, str]] = None,
+        cache_size: int = RESOLVER_CACHE_SIZE,
+    ):
+        self.labels = list(keywords)
+        self.matcher = MoodKeywordMatcher(keywords, context_boost, hints)
+        self._aliases = {label: label for label in self.labels}
+        self._aliases.update(aliases or {})
+        self._resolve = lru_cache(maxsize=cache_size)(self._resolve_normalized)
+        self._resolve_argument = lru_cache(maxsize=cache_size)(self._resolve_argument_normalized)
+
+    def resolve(self, text: str) -> str:
+        """Canonical mood label for free text ("neutral" if nothing matched)"""
+        return self._resolve(normalize_text(text or ""))
+
+    def resolve_argument(self, text: str) -> str:
+        """Canonical mood label for a tool argument ("musik calm" names calm)"""
+        return self._resolve_argument(normalize_text(text or ""))
+
+    def _resolve_normalized(self, text: str) -> str:
+        label = self._aliases.get(text)
+        if label is None:
+            label = self.matcher.best(text)
+        if label == "neutral":
+            label = self._named_label(text) or label
+        return label
+
+    def _resolve_argument_normalized(self, text: str) -> str:
+        label = self._aliases.get(text) or self._named_label(text)
+        return label if label is not None else self.matcher.best(text)
+
+    def _named_label(self, text: str) -> Optional[str]:
+        """
+        First label or alias named as a word of `text` ("musik calm", "energy
+        music"), also with a trailing typo "o" ("musik sediho")
+        """
+        for word in _WORD.findall(text):
+            label = self._aliases.get(word)
+            if label is None and word.endswith("o"):
+                label = self._aliases.get(word[:-1])
+            if label is not None:
+                return label
+        return None
+
+    def cache_info(self):
+        return self._resolve.cache_info()
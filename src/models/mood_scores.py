@@ -0,0 +1,308 @@
+"""
+Mood scores - Continuous per-mood affinity for every track
+Soft version of MOOD_CRITERIA: each range box becomes a centroid with per-feature bandwidth
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.models.artifacts import load_or_build
+from src.models.mood_index import criteria_fingerprint, get_dataset_index
+from src.models.sampling import AliasTable
+from src.models.track_store import TrackStore
+
+# Best-scoring rows kept per mood as the candidate pool for sampling
+MOOD_POOL_SIZE = 20_000
+
+# Share of the sampling weight given to popularity vs. a uniform random floor, matching
+# the legacy weighted_sample (src/benchmarks.py): 0.6 * popularity/max + 0.4 * (0.4 * U), E[U] = 0.5
+POPULARITY_WEIGHT = 0.6
+RANDOM_WEIGHT = 0.4 * 0.4 * 0.5
+
+# Squared distance a missing feature adds: three bandwidths from the centroid
+MISSING_Z2 = 9.0
+
+# Largest genres of a pool that each get a share of a diversified draw
+TOP_GENRES = 3
+
+GENRE_COLUMNS = ("track_genre", "genre")
+
+def _feature_values(data, feature: str) -> np.ndarray:
+    if isinstance(data, TrackStore):
+        return np.asarray(data.values(feature), dtype=np.float32)
+    return data[feature].to_numpy(dtype=np.float32, na_value=np.nan)
+
+def _popularity(data) -> np.ndarray:
+    """Popularity for every row as float64 (uniform when the column is missing)"""
+    if "popularity" not in data.columns:
+        return np.ones(len(data))
+    if isinstance(data, TrackStore):
+        values = data.values("popularity")
+    else:
+        values = data["popularity"].to_numpy()
+    return np.nan_to_num(np.asarray(values, dtype=np.float64))
+
+def _genre_codes(data, rows: np.ndarray) -> np.ndarray:
+    """Genre codes of `rows`, comparable within one call (0 without a genre column)"""
+    genre_col = next((col for col in GENRE_COLUMNS if col in data.columns), None)
+    if genre_col is None:
+        return np.zeros(len(rows), dtype=np.int32)
+    if isinstance(data, TrackStore):
+        return np.asarray(data.values(genre_col))[rows]
+
+    column = data[genre_col]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()[rows]
+    return pd.factorize(column.iloc[rows])[0]
+
+def _sampling_weights(popularity: np.ndarray) -> np.ndarray:
+    """Expected legacy weighted_sample weight per row, scaled by the scope's max popularity"""
+    max_popularity = popularity.max() if len(popularity) else 0.0
+    if max_popularity <= 0:
+        return np.ones(len(popularity))
+    return POPULARITY_WEIGHT * popularity / max_popularity + RANDOM_WEIGHT
+
+def score_moods(data, criteria: Dict) -> np.ndarray:
+    """
+    Affinity in (0, 1] of every row to every mood, shape (n_moods, n_rows)
+
+    A feature's range center is the mood centroid and its half-width the
+    bandwidth, so affinity = exp(-0.5 * mean(z^2)) with z = (x - center) / half.
+    A missing value counts as MISSING_Z2 (three bandwidths away), so rows
+    with gaps rank below complete rows that fit the mood.
+    """
+    return _score_moods(data, criteria)[0]
+
+def _score_moods(data, criteria: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores plus, per mood, which rows have every feature the mood uses"""
+    scores = np.empty((len(criteria), len(data)), dtype=np.float32)
+    complete = np.ones((len(criteria), len(data)), dtype=bool)
+    columns = {}
+    for i, mood_criteria in enumerate(criteria.values()):
+        distance = np.zeros(len(data), dtype=np.float32)
+        features = [feature for feature in mood_criteria if feature in data.columns]
+        for feature in features:
+            if feature not in columns:
+                columns[feature] = _feature_values(data, feature)
+            min_val, max_val = mood_criteria[feature]
+            half = (max_val - min_val) / 2 or 1.0
+            z = (columns[feature] - (min_val + max_val) / 2) / half
+            missing = np.isnan(z)
+            distance += np.where(missing, MISSING_Z2, z * z)
+            complete[i] &= ~missing
+        if features:
+            distance /= len(features)
+        scores[i] = np.exp(-0.5 * distance)
+    return scores, complete
+
+def classify_moods(data, criteria: Dict) -> pd.Categorical:
+    """Best-scoring mood per row, the hard label consistent with the scores"""
+    moods = list(criteria)
+    best = score_moods(data, criteria).argmax(axis=0)
+    return pd.Categorical.from_codes(best, categories=moods)
+
+def _rank_pool(candidates: np.ndarray, scores: np.ndarray, popularity, size: int):
+    """Best `size` candidates by score (best first) and their sampling weights"""
+    size = min(size, len(candidates))
+    if size == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+    # Partial sort: only the pool is ordered, not every candidate
+    top = np.argpartition(-scores, size - 1)[:size]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    pool = candidates[top]
+    weights = scores[top] * _sampling_weights(popularity[pool])
+    return pool.astype(np.int32), weights.astype(np.float32)
+
+def _genre_strata(genres: np.ndarray, top_genres: int = TOP_GENRES) -> List[np.ndarray]:
+    """Pool positions of the largest genres in a pool, largest first"""
+    if len(genres) == 0:
+        return []
+    codes, inverse, counts = np.unique(genres, return_inverse=True, return_counts=True)
+    largest = np.argsort(-counts, kind="stable")[:top_genres]
+    return [np.flatnonzero(inverse == code) for code in largest]
+
+class MoodPool:
+    """
+    One mood's best rows (best first) with alias tables for the whole pool
+    and for each of its largest genres
+
+    A draw takes a few songs from each top genre and fills up from the whole
+    pool, so recommendations are not all from the mood's dominant genre.
+    """
+
+    def __init__(self, rows: np.ndarray, weights: np.ndarray, genres: np.ndarray):
+        self.rows = rows
+        self.weights = weights
+        self.genres = genres
+        self.table = AliasTable(weights)
+        self.strata = _genre_strata(genres)
+        self.strata_tables = [AliasTable(weights[positions]) for positions in self.strata]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _songs_per_genre(self, n: int) -> int:
+        return max(1, n // max(len(self.strata), 1))
+
+    def sample(self, n: int, rng) -> np.ndarray:
+        """n distinct rows: a share from each top genre, then weighted fill from the pool"""
+        if len(self) <= n:
+            return self.rows.copy()
+
+        picked: List[int] = []
+        per_genre = self._songs_per_genre(n)
+        for positions, table in zip(self.strata, self.strata_tables):
+            picked += positions[table.draw_distinct(per_genre, rng)].tolist()
+
+        remaining = n - len(picked)
+        if remaining > 0:
+            picked += self.table.draw_distinct(remaining, rng, exclude=picked).tolist()
+
+        return self.rows[np.asarray(picked[:n], dtype=np.int64)]
+
+    def sample_batch(self, count: int, n: int, rng) -> np.ndarray:
+        """count independent sample(n) draws as a (count, <= n) row-id matrix"""
+        if len(self) <= n:
+            return np.tile(self.rows, (count, 1))
+
+        per_genre = self._songs_per_genre(n)
+        blocks = []
+        for positions, table in zip(self.strata, self.strata_tables):
+            local = table.draw_distinct_batch(count, per_genre, rng)
+            blocks.append(np.where(local >= 0, positions[np.maximum(local, 0)], -1))
+        picked = np.hstack(blocks) if blocks else np.empty((count, 0), dtype=np.int64)
+
+        remaining = n - picked.shape[1]
+        if remaining > 0:
+            fill = self.table.draw_distinct_batch(count, remaining, rng, exclude=picked)
+            picked = np.hstack((picked, fill))
+
+        # -1 marks slots that could not be filled
+        picked = picked[:, :n]
+        return np.where(picked >= 0, self.rows[np.maximum(picked, 0)], -1)
+
+    def nbytes(self) -> int:
+        strata = sum(positions.nbytes for positions in self.strata)
+        tables = sum(table.nbytes() for table in self.strata_tables)
+        return self.rows.nbytes + self.weights.nbytes + self.table.nbytes() + strata + tables
+
+class MoodScores:
+    """float16 affinity matrix plus a ranked, genre-stratified candidate pool per mood"""
+
+    def __init__(self, matrix, pools, criteria, total_rows, pool_size=MOOD_POOL_SIZE):
+        self.moods = list(criteria)
+        self.matrix = matrix
+        self.pools: Dict[str, MoodPool] = pools
+        self.criteria = criteria
+        self.pool_size = pool_size
+        self.fingerprint = criteria_fingerprint(criteria)
+        self.total_rows = total_rows
+
+    @classmethod
+    def build(cls, data, criteria: Dict, pool_size: int = MOOD_POOL_SIZE) -> "MoodScores":
+        """
+        Score every row once, then keep each mood's best rows ranked by affinity
+
+        Rows missing a feature the mood uses stay out of that mood's pool.
+        """
+        scores, complete = _score_moods(data, criteria)
+        popularity = _popularity(data)
+
+        pools = {}
+        for i, mood in enumerate(criteria):
+            candidates = np.flatnonzero(complete[i])
+            rows, weights = _rank_pool(
+                candidates, scores[i, candidates], popularity, pool_size
+            )
+            pools[mood] = MoodPool(rows, weights, _genre_codes(data, rows))
+
+        return cls(scores.astype(np.float16), pools, criteria, len(data), pool_size)
+
+    def updated(self, data, row_ids: np.ndarray, rows) -> "MoodScores":
+        """
+        Copy for a new dataset version where only `row_ids` (values in `rows`) changed
+
+        Only those rows are scored. Each pool is re-ranked from its old members
+        plus the changed rows, so it can shrink by the rows that dropped out.
+        """
+        matrix = np.empty((len(self.moods), len(data)), dtype=np.float16)
+        matrix[:, : self.matrix.shape[1]] = self.matrix
+        changed_scores, changed_complete = _score_moods(rows, self.criteria)
+        matrix[:, row_ids] = changed_scores
+        popularity = _popularity(data)
+
+        pools = {}
+        for i, mood in enumerate(self.moods):
+            # Changed rows re-enter only if they still have every feature
+            kept = np.setdiff1d(self.pools[mood].rows, row_ids)
+            candidates = np.union1d(kept, row_ids[changed_complete[i]])
+            scores = matrix[i, candidates].astype(np.float32)
+            pool_rows, weights = _rank_pool(candidates, scores, popularity, self.pool_size)
+            pools[mood] = MoodPool(pool_rows, weights, _genre_codes(data, pool_rows))
+
+        return MoodScores(matrix, pools, self.criteria, len(data), self.pool_size)
+
+    def to_artifact(self):
+        """Arrays and settings to persist; moods are numbered in criteria order"""
+        arrays = {"matrix": self.matrix}
+        for i, mood in enumerate(self.moods):
+            arrays[f"pool_{i}"] = self.pools[mood].rows
+            arrays[f"weight_{i}"] = self.pools[mood].weights
+            arrays[f"genre_{i}"] = self.pools[mood].genres
+        return arrays, {"pool_size": self.pool_size}
+
+    @classmethod
+    def from_artifact(cls, arrays, data, criteria: Dict, total_rows: int) -> "MoodScores":
+        # Alias tables are rebuilt from the weights: a few ms for every pool
+        pools = {
+            mood: MoodPool(arrays[f"pool_{i}"], arrays[f"weight_{i}"], arrays[f"genre_{i}"])
+            for i, mood in enumerate(criteria)
+        }
+        return cls(arrays["matrix"], pools, criteria, total_rows, data["pool_size"])
+
+    def _mood(self, mood: str) -> str:
+        """Unknown moods use neutral"""
+        return mood if mood in self.pools else "neutral"
+
+    def affinity(self, mood: str) -> np.ndarray:
+        return self.matrix[self.moods.index(self._mood(mood))]
+
+    def top_k(self, mood: str, k: int) -> np.ndarray:
+        """The k best-scoring rows for a mood, best first"""
+        return self.pools[self._mood(mood)].rows[:k]
+
+    def sample(self, mood: str, n: int, rng) -> np.ndarray:
+        """n distinct rows from the mood's pool, weighted by affinity x popularity, spread over genres"""
+        return self.pools[self._mood(mood)].sample(n, rng)
+
+    def sample_batch(self, mood: str, count: int, n: int, rng) -> np.ndarray:
+        """count independent sample(n) draws as a (count, <= n) row-id matrix"""
+        return self.pools[self._mood(mood)].sample_batch(count, n, rng)
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + sum(pool.nbytes() for pool in self.pools.values())
+
+def get_mood_scores(data, criteria: Dict) -> MoodScores:
+    """Mood scores for a dataset, rebuilt only if the dataset or criteria changed"""
+    fingerprint = criteria_fingerprint(criteria)
+    # Sampling settings change the pools and tables, so they version the artifact too
+    settings = (
+        f"{fingerprint}/{MOOD_POOL_SIZE}/{POPULARITY_WEIGHT}/{RANDOM_WEIGHT}"
+        f"/{MISSING_Z2}/genres-{TOP_GENRES}"
+    )
+    return get_dataset_index(
+        data,
+        "scores",
+        fingerprint,
+        lambda: load_or_build(
+            data,
+            "mood_scores",
+            settings,
+            load=lambda arrays, meta: MoodScores.from_artifact(arrays, meta, criteria, len(data)),
+            build=lambda: MoodScores.build(data, criteria),
+            save=MoodScores.to_artifact,
+        ),
+    )
@@ -3,14 +3,33 @@ Music analyzer - Core music analysis and recommendation engine
 Handles mood detection, music feature analysis, and recommendations
 """
 
-import random
-from datetime import datetime
 from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
-from src.config.app_config import GENRE_EMOJIS, MOOD_EMOJIS, MOOD_KEYWORDS, SEARCH_AVAILABLE
+from src.config.app_config import (
+    GENRE_EMOJIS,
+    MOOD_ALIASES,
+    MOOD_CONTEXT_BOOST,
+    MOOD_EMOJIS,
+    MOOD_HINTS,
+    MOOD_KEYWORDS,
+    SEARCH_AVAILABLE,
+)
+from src.models.dashboard_aggregates import get_dashboard_aggregates
+from src.models.dataset_registry import resolve_dataset
+from src.models.mood_index import get_mood_index
+from src.models.mood_matcher import MoodResolver
+from src.models.mood_scores import get_mood_scores
+from src.models.sampling import make_rng
+from src.models.similarity import (
+    find_similar_rows,
+    find_track,
+    get_similarity_index,
+    parse_song_query,
+)
+from src.models.track_store import TrackStore
 
 # Valid moods for the system
 VALID_MOODS = [
@@ -58,6 +77,9 @@ MOOD_CRITERIA = {
     "neutral": {"valence": (0.3, 0.7), "energy": (0.3, 0.7), "tempo": (70, 140)},
 }
 
+# Every mood lookup (chat text, agent tool arguments) goes through this resolver
+MOOD_RESOLVER = MoodResolver(MOOD_KEYWORDS, MOOD_CONTEXT_BOOST, MOOD_HINTS, MOOD_ALIASES)
+
 # CORE FUNCTIONALITY
 
 def normalize_mood(mood: str) -> str:
@@ -66,168 +88,108 @@ def normalize_mood(mood: str) -> str:
 
 def extract_mood_from_text(text: str) -> Optional[str]:
     """Extract mood from user input using advanced scoring"""
-    text = text.lower()
-    mood_scores = {}
-
-    # Enhanced keyword matching with context
-    context_boost = {
-        "workout": "energetic",
-        "gym": "energetic",
-        "party": "happy",
-        "galau": "sad",
-        "putus": "sad",
-        "sarapan": "happy",
-        "makan pagi": "happy",
-        "santai": "calm",
-        "relax": "calm",
-        "romantic": "romantic",
-        "cinta": "romantic",
-    }
+    return MOOD_RESOLVER.resolve(text)
 
-    # Check context boost first
-    for keyword, boosted_mood in context_boost.items():
-        if keyword in text:
-            mood_scores[boosted_mood] = mood_scores.get(boosted_mood, 0) + 3
-
-    # Standard mood keyword matching
-    for mood, keywords in MOOD_KEYWORDS.items():
-        score = 0
-        for keyword in keywords:
-            if keyword in text:
-                # Weight longer keywords more heavily
-                score += len(keyword.split())
-        mood_scores[mood] = mood_scores.get(mood, 0) + score
-
-    if mood_scores:
-        detected_mood = max(mood_scores.keys(), key=lambda x: mood_scores[x])
-        return detected_mood if mood_scores[detected_mood] > 0 else "neutral"
-    return "neutral"
-
-def get_song_recommendations(df: pd.DataFrame, mood: str, n: int = 5) -> List[Dict]:
+def resolve_mood(mood_input: str) -> str:
+    """Canonical mood label (one of VALID_MOODS) for a mood argument: label, alias or short text"""
+    return MOOD_RESOLVER.resolve_argument(mood_input)
+
+def get_song_recommendations(
+    df: pd.DataFrame, mood: str, n: int = 5, seed: Optional[int] = None
+) -> List[Dict]:
     """
-    Advanced song recommendation system with diversified sampling
+    Advanced song recommendation system ranked by continuous mood affinity
+    Pass a seed (or set MOODIFY_RECOMMENDATION_SEED) for reproducible results
     """
     try:
-        # Detect mood from text if needed
-        if mood.lower() not in VALID_MOODS:
-            detected_mood = extract_mood_from_text(mood)
-            mood_norm = detected_mood if detected_mood else "neutral"
-        else:
-            mood_norm = normalize_mood(mood)
-
-        # Apply multi-criteria filtering
-        filtered_df = apply_mood_criteria(df, mood_norm)
-
-        if filtered_df.empty:
+        df = resolve_dataset(df)
+        if df is None:
             return []
 
-        # Get diversified recommendations
-        recommendations = get_diversified_recommendations(filtered_df, mood_norm, n)
+        mood_norm = resolve_request_mood(mood)
 
-        return recommendations.to_dict("records")
+        # Weighted draw from the mood's best-scoring rows; every mood has a full pool
+        row_ids = get_mood_scores(df, MOOD_CRITERIA).sample(mood_norm, n, make_rng(seed))
+        return take_rows(df, row_ids).to_dict("records")
 
     except Exception as e:
         print(f"Error in get_song_recommendations: {str(e)}")
         return []
 
-def apply_mood_criteria(df: pd.DataFrame, mood: str) -> pd.DataFrame:
-    """
-    Apply multi-criteria filtering based on audio features
-    """
-    criteria = MOOD_CRITERIA.get(mood, MOOD_CRITERIA["neutral"])
-    filtered_df = df.copy()
-
-    # Apply criteria for each audio feature
-    for feature, (min_val, max_val) in criteria.items():
-        if feature in df.columns:
-            filtered_df = filtered_df[
-                (filtered_df[feature] >= min_val) & (filtered_df[feature] <= max_val)
-            ]
+def resolve_request_mood(mood: str) -> str:
+    """Valid mood for a request, detecting it from free text if needed"""
+    return resolve_mood(mood)
 
-    return filtered_df
-
-def get_diversified_recommendations(
-    df: pd.DataFrame, mood: str, n_recommendations: int = 5
-) -> pd.DataFrame:
-    """
-    Diversified sampling algorithm to avoid repetitive results
+def get_song_recommendations_batch(
+    df: pd.DataFrame, requests: List[tuple], seed: Optional[int] = None
+) -> List[Dict]:
     """
-    if len(df) <= n_recommendations:
-        return df
-
-    recommendations = pd.DataFrame()
-
-    # 1. STRATIFIED SAMPLING by genre (if genre column exists)
-    if "track_genre" in df.columns or "genre" in df.columns:
-        genre_col = "track_genre" if "track_genre" in df.columns else "genre"
-        genre_counts = df[genre_col].value_counts()
-        top_genres = genre_counts.head(3).index.tolist()
-        songs_per_genre = max(1, n_recommendations // len(top_genres))
-
-        for genre in top_genres:
-            genre_songs = df[df[genre_col] == genre]
-            if not genre_songs.empty:
-                sampled = weighted_sample(
-                    genre_songs, min(songs_per_genre, len(genre_songs))
-                )
-                recommendations = pd.concat([recommendations, sampled])
-
-    # 2. FILL REMAINING SLOTS with weighted random sampling
-    remaining_slots = n_recommendations - len(recommendations)
-    if remaining_slots > 0:
-        remaining_df = (
-            df[~df.index.isin(recommendations.index)]
-            if not recommendations.empty
-            else df
-        )
-        if not remaining_df.empty:
-            additional = weighted_sample(
-                remaining_df, min(remaining_slots, len(remaining_df))
-            )
-            recommendations = pd.concat([recommendations, additional])
-
-    # 3. TEMPORAL RANDOMIZATION (use timestamp for seed)
-    random.seed(int(datetime.now().timestamp()) % 1000)
+    Recommendations for many (user_id, mood, n, exclusions) requests in one pass
 
-    return recommendations.head(n_recommendations)
-
-def weighted_sample(df: pd.DataFrame, n: int) -> pd.DataFrame:
-    """
-    Weighted sampling based on popularity with randomization factor
+    Requests are grouped by mood, each group is sampled as one matrix, and all
+    chosen rows are materialized with a single take. Exclusions are track_ids.
+    Returns one {"user_id", "mood", "songs"} entry per request, in order.
     """
-    if len(df) <= n:
-        return df
-
-    # Use popularity for weighting if available
-    if "popularity" in df.columns:
-        # Normalize popularity to create weights
-        pop_series = df["popularity"]
-        max_pop = pop_series.max()
-
-        if max_pop > 0:
-            weights = pop_series / max_pop
-        else:
-            weights = pd.Series(np.ones(len(df)) / len(df), index=df.index)
+    results = [
+        {"user_id": user_id, "mood": None, "songs": []} for user_id, _, _, _ in requests
+    ]
+    try:
+        df = resolve_dataset(df)
+        if df is None or not requests:
+            return results
+
+        rng = make_rng(seed)
+        scores = get_mood_scores(df, MOOD_CRITERIA)
+
+        # Group by (mood, draw size); excluded songs are oversampled, then dropped
+        groups: Dict[tuple, List[int]] = {}
+        mood_cache: Dict[str, str] = {}
+        for i, (_, mood, n, exclusions) in enumerate(requests):
+            if mood not in mood_cache:
+                mood_cache[mood] = resolve_request_mood(mood)
+            results[i]["mood"] = mood_cache[mood]
+            size = n + len(exclusions or ())
+            groups.setdefault((mood_cache[mood], size), []).append(i)
+
+        drawn: Dict[int, np.ndarray] = {}
+        for (mood_norm, size), members in groups.items():
+            matrix = scores.sample_batch(mood_norm, len(members), size, rng)
+            for i, row_ids in zip(members, matrix):
+                drawn[i] = row_ids[row_ids >= 0]
+
+        if not drawn:
+            return results
+
+        # One take + one dict conversion for every request in the batch
+        unique_ids, inverse = np.unique(
+            np.concatenate(list(drawn.values())), return_inverse=True
+        )
+        records = take_rows(df, unique_ids).to_dict("records")
+
+        offset = 0
+        for i, row_ids in drawn.items():
+            _, _, n, exclusions = requests[i]
+            excluded = set(exclusions or ())
+            songs = []
+            for position in inverse[offset : offset + len(row_ids)]:
+                record = records[position]
+                if record.get("track_id") not in excluded:
+                    songs.append(record)
+                    if len(songs) >= n:
+                        break
+            results[i]["songs"] = songs
+            offset += len(row_ids)
 
-        # Add random factor to avoid always picking the most popular
-        random_factor = pd.Series(np.random.random(len(df)), index=df.index) * 0.4
-        combined_weights = weights * 0.6 + random_factor * 0.4
+    except Exception as e:
+        print(f"Error in get_song_recommendations_batch: {str(e)}")
 
-        # Normalize weights
-        combined_weights = combined_weights / combined_weights.sum()
+    return results
 
-        # Sample based on weights
-        try:
-            sampled_indices = np.random.choice(
-                df.index, size=n, replace=False, p=combined_weights.values
-            )
-            return df.loc[sampled_indices]
-        except:
-            # Fallback to simple random sampling
-            return df.sample(n=n)
-    else:
-        # Simple random sampling if no popularity column
-        return df.sample(n=n)
+def take_rows(df, row_ids) -> pd.DataFrame:
+    """Materialize only the given row positions from a DataFrame or TrackStore"""
+    if isinstance(df, TrackStore):
+        return df.take(row_ids)
+    return df.iloc[row_ids]
 
 def format_song_recommendations(
     recommendations: List[Dict], mood: str, original_input: str = ""
@@ -297,47 +259,121 @@ def get_enhanced_recommendations(df: pd.DataFrame, mood_input: str, n: int = 5)
     # Get raw recommendations
     recommendations = get_song_recommendations(df, mood_input, n)
 
-    # Detect the mood for formatting
-    detected_mood = (
-        extract_mood_from_text(mood_input)
-        if mood_input.lower() not in VALID_MOODS
-        else mood_input.lower()
-    )
-
-    # Fallback to neutral if mood detection fails
-    if detected_mood is None:
-        detected_mood = "neutral"
+    # Detect the mood for formatting (memoized: same lookup as the recommendation)
+    detected_mood = resolve_mood(mood_input)
 
     # Format and return results
     return format_song_recommendations(recommendations, detected_mood, mood_input)
 
-def analyze_mood_features(df: pd.DataFrame, mood: str) -> str:
-    """Analisis statistik dan contoh lagu untuk mood tertentu."""
-    mood_norm = normalize_mood(mood)
-    if mood_norm not in VALID_MOODS:
-        extracted = extract_mood_from_text(mood)
-        if extracted:
-            mood_norm = extracted
-        else:
-            return f"Mood '{mood}' tidak dikenali."
+def get_similar_songs(df, query: str, n: int = 5):
+    """Seed song matched from "judul - artis" plus its n nearest songs by audio features"""
+    df = resolve_dataset(df)
+    if df is None:
+        return None, []
+
+    title, artist = parse_song_query(query)
+    seed_row = find_track(df, title, artist)
+    if seed_row is None:
+        return None, []
+
+    row_ids, _ = find_similar_rows(df, seed_row, n)
+    seed = take_rows(df, [seed_row]).to_dict("records")[0]
+    return seed, take_rows(df, row_ids).to_dict("records")
+
+def get_similar_recommendations(df, query: str, n: int = 5) -> str:
+    """Formatted "lagu mirip X" answer for the agent"""
+    seed, songs = get_similar_songs(df, query, n)
+    return format_similar_songs(seed, songs, query)
+
+def format_similar_songs(seed: Optional[Dict], songs: List[Dict], query: str) -> str:
+    """Chat answer listing songs similar to the seed, or a hint when no seed matched"""
+    if seed is None:
+        return f"Waduh, gw gak nemu lagu '{query}' di database 😅 Coba tulis judulnya lebih lengkap, misal 'judul - artis'."
+
+    seed_name = seed.get("track_name", "Unknown Song")
+    seed_artist = seed.get("artist_name", "Unknown Artist")
+    result = f"🎧 **Lagu yang vibe-nya mirip {seed_name} - {seed_artist}:**\n\n"
+
+    for i, song in enumerate(songs, 1):
+        track_name = song.get("track_name", "Unknown Song")
+        artist_name = song.get("artist_name", "Unknown Artist")
+        genre = song.get("track_genre", song.get("genre", "unknown"))
+        result += f"{i}. 🎵 **{track_name}** - {artist_name}\n"
+
+        info_parts = [f"Genre: {genre}"]
+        if song.get("tempo"):
+            info_parts.append(f"Tempo: {song['tempo']:.0f} BPM")
+        if song.get("popularity") is not None:
+            info_parts.append(f"Popularity: {song['popularity']}/100")
+        result += f"   {' | '.join(info_parts)}\n\n"
+
+    result += "Dipilih dari kemiripan danceability, energy, valence, tempo, dan fitur audio lainnya 🎶"
+    return result
 
-    mood_data = (
-        df[df["mood"] == mood_norm]
-        if "mood" in df.columns
-        else apply_mood_criteria(df, mood_norm)
+def get_store_mood_stats(store: TrackStore, mood: str):
+    """Feature means and sample songs for a mood, computed on mapped columns"""
+    row_ids = (
+        store.row_ids_where("mood", mood)
+        if "mood" in store.columns
+        else get_mood_index(store, MOOD_CRITERIA).rows(mood)
     )
-    if mood_data.empty:
-        return f"Tidak ada data untuk mood '{mood_norm}'"
+    if len(row_ids) == 0:
+        return None
+
+    # Labelled moods: means come precomputed with the dashboard aggregates
+    means = get_dashboard_aggregates(store).feature_means(mood) if "mood" in store.columns else {}
 
-    # Calculate statistics
     stats = {}
     for feature in ["danceability", "energy", "valence", "popularity"]:
-        if feature in mood_data.columns:
-            stats[feature] = mood_data[feature].mean()
+        if feature in means:
+            stats[feature] = means[feature]
+        elif feature in store.columns:
+            stats[feature] = float(np.nanmean(store.values(feature)[row_ids]))
+
+    stats["count"] = len(row_ids)
+
+    sample_ids = make_rng().choice(row_ids, size=min(3, len(row_ids)), replace=False)
+    return stats, store.take(sample_ids)
+
+def prepare_indexes(df):
+    """Build (or map from artifacts) derived indexes for a freshly loaded dataset"""
+    get_mood_scores(df, MOOD_CRITERIA)
+    get_similarity_index(df)
+    get_dashboard_aggregates(df)
+    return df
+
+def analyze_mood_features(df: pd.DataFrame, mood: str) -> str:
+    """Analisis statistik dan contoh lagu untuk mood tertentu."""
+    df = resolve_dataset(df)
+    if df is None:
+        return "Database musik masih dimuat, coba lagi sebentar ya."
+
+    mood_norm = resolve_mood(mood)
+
+    if isinstance(df, TrackStore):
+        mood_stats = get_store_mood_stats(df, mood_norm)
+        if mood_stats is None:
+            return f"Tidak ada data untuk mood '{mood_norm}'"
+        stats, sample_songs = mood_stats
+    else:
+        mood_data = (
+            df[df["mood"] == mood_norm]
+            if "mood" in df.columns
+            else df.iloc[get_mood_index(df, MOOD_CRITERIA).rows(mood_norm)]
+        )
+        if mood_data.empty:
+            return f"Tidak ada data untuk mood '{mood_norm}'"
+
+        # Calculate statistics
+        stats = {}
+        for feature in ["danceability", "energy", "valence", "popularity"]:
+            if feature in mood_data.columns:
+                stats[feature] = mood_data[feature].mean()
+
+        stats["count"] = len(mood_data)
 
-    stats["count"] = len(mood_data)
+        sample_songs = mood_data.sample(min(3, len(mood_data)))
 
-    sample_songs = mood_data.sample(min(3, len(mood_data)))
     output = f"\n{'='*60}\n"
     output += f"   📊 ANALISIS MUSIK UNTUK MOOD '{mood_norm.upper()}'\n"
     output += f"{'='*60}\n"
@@ -0,0 +1,125 @@
+"""
+Query backend - Pluggable execution engines for mood filtering
+pandas/numpy is the reference engine; Polars runs the same predicates as one lazy scan
+"""
+
+import weakref
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config.app_config import POLARS_AVAILABLE, QUERY_BACKEND
+from src.models.track_store import TrackStore
+
+def _column_values(data, feature: str) -> np.ndarray:
+    """Numeric column as a numpy array for a DataFrame or TrackStore"""
+    if isinstance(data, TrackStore):
+        return data.values(feature)
+    return data[feature].to_numpy()
+
+class PandasBackend:
+    """Reference engine: vectorized numpy masks, no intermediate frames"""
+
+    name = "pandas"
+
+    def filter_rows(self, data, criteria: Dict) -> np.ndarray:
+        """Row positions whose features fall within the inclusive criteria ranges"""
+        if isinstance(data, TrackStore):
+            return data.filter_rows(criteria)
+
+        mask = None
+        for feature, (min_val, max_val) in criteria.items():
+            if feature not in data.columns:
+                continue
+            values = _column_values(data, feature)
+            feature_mask = (values >= min_val) & (values <= max_val)
+            mask = feature_mask if mask is None else mask & feature_mask
+
+        if mask is None:
+            return np.arange(len(data))
+        return np.flatnonzero(mask)
+
+class PolarsBackend:
+    """Lazy engine: all range predicates fused into a single multithreaded scan"""
+
+    name = "polars"
+
+    def __init__(self):
+        import polars as pl
+
+        self._pl = pl
+        # id(dataset) -> (weakref to dataset, {feature: polars Series})
+        self._columns: Dict[int, tuple] = {}
+
+    def _forget(self, key: int, ref: weakref.ref):
+        """Weakref callback: drop a dead dataset's columns unless the id was already reused"""
+        entry = self._columns.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._columns[key]
+
+    def _feature_frame(self, data, features: List[str]):
+        """Polars view of the needed feature columns, converted once per dataset"""
+        key = id(data)
+        entry = self._columns.get(key)
+        if entry is None or entry[0]() is not data:
+            ref = weakref.ref(data, lambda ref, key=key: self._forget(key, ref))
+            entry = (ref, {})
+            self._columns[key] = entry
+
+        columns = entry[1]
+        for feature in features:
+            if feature not in columns:
+                columns[feature] = self._pl.Series(
+                    feature, np.asarray(_column_values(data, feature))
+                )
+
+        return self._pl.DataFrame([columns[feature] for feature in features])
+
+    def filter_rows(self, data, criteria: Dict) -> np.ndarray:
+        """Row positions whose features fall within the inclusive criteria ranges"""
+        pl = self._pl
+        features = [feature for feature in criteria if feature in data.columns]
+        if not features:
+            return np.arange(len(data))
+
+        predicate = pl.all_horizontal(
+            [
+                pl.col(feature).is_between(*criteria[feature], closed="both")
+                for feature in features
+            ]
+        )
+        result = (
+            self._feature_frame(data, features)
+            .lazy()
+            .with_row_index("row_id")
+            .filter(predicate)
+            .select("row_id")
+            .collect()
+        )
+        return result["row_id"].to_numpy().astype(np.int64)
+
+_BACKENDS: Dict[str, object] = {}
+
+def get_backend(name: Optional[str] = None):
+    """Return the configured backend, falling back to pandas if Polars is missing"""
+    name = (name or QUERY_BACKEND).lower()
+    if name == "polars" and not POLARS_AVAILABLE:
+        name = "pandas"
+
+    if name not in _BACKENDS:
+        _BACKENDS[name] = PolarsBackend() if name == "polars" else PandasBackend()
+    return _BACKENDS[name]
+
+def check_backend_parity(data, criteria_by_mood: Dict[str, Dict]) -> Dict[str, bool]:
+    """Compare every available backend against the pandas reference, per mood"""
+    reference = get_backend("pandas")
+    candidates = [get_backend("polars")] if POLARS_AVAILABLE else []
+
+    parity = {}
+    for mood, criteria in criteria_by_mood.items():
+        expected = np.sort(reference.filter_rows(data, criteria))
+        parity[mood] = all(
+            np.array_equal(expected, np.sort(backend.filter_rows(data, criteria)))
+            for backend in candidates
+        )
+    return parity
@@ -0,0 +1,154 @@
+"""
+Sampling - Weighted sampling without replacement for recommendations
+Gumbel top-k for one-shot draws, alias tables for repeated draws on a fixed pool
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from src.config.app_config import RECOMMENDATION_SEED
+
+def make_rng(seed: Optional[int] = None) -> np.random.Generator:
+    """Explicit generator: given seed, else MOODIFY_RECOMMENDATION_SEED, else fresh entropy"""
+    if seed is None:
+        seed = RECOMMENDATION_SEED
+    return np.random.default_rng(seed)
+
+def gumbel_top_k(weights: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw k distinct indices with probability proportional to weights, in O(n)
+
+    Perturbing log-weights with Gumbel noise and keeping the k largest keys is
+    equivalent to successive weighted draws without replacement.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(weights)
+    if k >= n:
+        return rng.permutation(n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    with np.errstate(divide="ignore"):
+        keys = np.where(weights > 0, np.log(weights), -np.inf)
+    keys = keys + rng.gumbel(size=n)
+
+    top = np.argpartition(-keys, k - 1)[:k]
+    return top[np.argsort(-keys[top])]
+
+class AliasTable:
+    """Vose alias table: O(n) build, O(1) per weighted draw"""
+
+    def __init__(self, weights: np.ndarray):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        self.size = n
+        self.prob = np.ones(n, dtype=np.float32)
+        self.alias = np.arange(n, dtype=np.int32)
+
+        total = weights.sum()
+        if n == 0 or total <= 0:
+            return
+
+        prob = weights * (n / total)
+        alias = np.arange(n, dtype=np.int32)
+        small = np.flatnonzero(prob < 1.0)
+        large = np.flatnonzero(prob >= 1.0)
+
+        # Vectorized Vose: each large slot absorbs a run of small slots per round.
+        # Small slot i goes to the large slot whose cumulative excess covers the
+        # start of its cumulative deficit; overdrawn large slots become small.
+        while len(small) and len(large):
+            deficit = 1.0 - prob[small]
+            excess_end = np.cumsum(prob[large] - 1.0)
+            deficit_start = np.cumsum(deficit) - deficit
+            owner = np.searchsorted(excess_end, deficit_start, side="right")
+
+            assigned = owner < len(large)
+            if not assigned.any():
+                break
+            alias[small[assigned]] = large[owner[assigned]]
+            prob[large] -= np.bincount(
+                owner[assigned], weights=deficit[assigned], minlength=len(large)
+            )
+
+            overdrawn = prob[large] < 1.0
+            small = np.concatenate((small[~assigned], large[overdrawn]))
+            large = large[~overdrawn]
+
+        # Leftovers are 1.0 up to rounding error
+        prob[small] = 1.0
+        prob[large] = 1.0
+
+        self.prob = prob.astype(np.float32)
+        self.alias = alias
+
+    def draw(self, k: int, rng: np.random.Generator) -> np.ndarray:
+        """k independent weighted draws (with replacement)"""
+        slots = rng.integers(self.size, size=k)
+        keep = rng.random(k) < self.prob[slots]
+        return np.where(keep, slots, self.alias[slots])
+
+    def draw_distinct(self, k: int, rng: np.random.Generator, exclude=()) -> np.ndarray:
+        """k distinct weighted draws, rejecting repeats and excluded indices"""
+        k = min(k, self.size - len(exclude))
+        picked = []
+        seen = set(exclude)
+        for _ in range(20):
+            if len(picked) >= k:
+                break
+            for index in self.draw(2 * (k - len(picked)) + 4, rng):
+                index = int(index)
+                if index not in seen:
+                    seen.add(index)
+                    picked.append(index)
+                    if len(picked) >= k:
+                        break
+
+        # Rare: pool nearly exhausted by exclusions, fill with what is left
+        if len(picked) < k:
+            rest = np.setdiff1d(np.arange(self.size), np.fromiter(seen, dtype=np.int64))
+            picked += rng.permutation(rest)[: k - len(picked)].tolist()
+
+        return np.asarray(picked, dtype=np.int64)
+
+    def draw_distinct_batch(
+        self, count: int, k: int, rng: np.random.Generator, exclude: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        count independent draw_distinct(k) samples as a (count, k) matrix
+
+        All candidates are drawn in one call and deduplicated per row with a
+        stable sort; only rows that run short fall back to draw_distinct.
+        """
+        k = min(k, self.size)
+        width = 2 * k + 4
+        candidates = self.draw(count * width, rng).reshape(count, width)
+
+        # First occurrence of each value in a row (stable sort keeps the earliest)
+        order = np.argsort(candidates, axis=1, kind="stable")
+        ordered = np.take_along_axis(candidates, order, axis=1)
+        repeated = np.zeros_like(ordered, dtype=bool)
+        repeated[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+        valid = np.empty_like(repeated)
+        np.put_along_axis(valid, order, ~repeated, axis=1)
+
+        if exclude is not None and exclude.shape[1]:
+            valid &= ~(candidates[:, :, None] == exclude[:, None, :]).any(axis=2)
+
+        rank = np.cumsum(valid, axis=1)
+        full = rank[:, -1] >= k
+        result = np.empty((count, k), dtype=np.int64)
+        keep = valid & (rank <= k)
+        result[full] = candidates[full][keep[full]].reshape(-1, k)
+
+        for row in np.flatnonzero(~full):
+            row_exclude = exclude[row].tolist() if exclude is not None else ()
+            drawn = self.draw_distinct(k, rng, exclude=row_exclude)
+            result[row, : len(drawn)] = drawn
+            result[row, len(drawn) :] = -1
+
+        return result
+
+    def nbytes(self) -> int:
+        return self.prob.nbytes + self.alias.nbytes
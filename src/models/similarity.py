@@ -0,0 +1,310 @@
+"""
+Similarity - "Songs like this" search over standardized audio feature vectors
+Exact top-k via one BLAS matrix-vector product, optional random-projection LSH
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config.app_config import SIMILARITY_INDEX
+from src.models.artifacts import load_or_build
+from src.models.ingest_schema import AUDIO_FEATURES
+from src.models.mood_index import get_dataset_index
+from src.models.track_store import TrackStore
+
+# Audio features that make up a song's vector
+SIMILARITY_FEATURES = list(AUDIO_FEATURES)
+
+# Random-projection LSH shape: more tables raise recall, more bits shrink buckets
+LSH_TABLES = 8
+LSH_BITS = 12
+
+def _numeric_column(data, name: str) -> np.ndarray:
+    if isinstance(data, TrackStore):
+        return np.asarray(data.values(name), dtype=np.float32)
+    return data[name].to_numpy(dtype=np.float32, na_value=np.nan)
+
+class SimilarityIndex:
+    """Standardized float32 feature matrix with exact Euclidean top-k search"""
+
+    def __init__(self, matrix, features, mean, scale, fingerprint, total_rows, sq_norms=None):
+        self.matrix = matrix
+        self.features = features
+        self.mean = mean
+        self.scale = scale
+        # ||x||^2 per row, so distances need only one matrix-vector product
+        if sq_norms is None:
+            sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        self.sq_norms = sq_norms
+        self.fingerprint = fingerprint
+        self.total_rows = total_rows
+
+    @classmethod
+    def build(cls, data, fingerprint: str) -> "SimilarityIndex":
+        """Z-score every available feature once (missing values sit at the mean)"""
+        features = [feature for feature in SIMILARITY_FEATURES if feature in data.columns]
+        matrix = np.empty((len(data), len(features)), dtype=np.float32)
+        mean = np.zeros(len(features), dtype=np.float32)
+        scale = np.ones(len(features), dtype=np.float32)
+
+        for j, feature in enumerate(features):
+            values = _numeric_column(data, feature)
+            mean[j] = np.nanmean(values)
+            std = np.nanstd(values)
+            scale[j] = std if std > 0 else 1.0
+            matrix[:, j] = np.nan_to_num((values - mean[j]) / scale[j])
+
+        return cls(matrix, features, mean, scale, fingerprint, len(data))
+
+    def updated(self, data, row_ids: np.ndarray, rows) -> "SimilarityIndex":
+        """Copy for a new dataset version; changed rows reuse the original standardization"""
+        matrix = np.empty((len(data), len(self.features)), dtype=np.float32)
+        matrix[: len(self.matrix)] = self.matrix
+        for j, feature in enumerate(self.features):
+            values = _numeric_column(rows, feature)
+            matrix[row_ids, j] = np.nan_to_num((values - self.mean[j]) / self.scale[j])
+        return SimilarityIndex(
+            matrix, self.features, self.mean, self.scale, self.fingerprint, len(data)
+        )
+
+    def to_artifact(self):
+        arrays = {
+            "matrix": self.matrix,
+            "mean": self.mean,
+            "scale": self.scale,
+            "sq_norms": self.sq_norms,
+        }
+        return arrays, {"features": self.features}
+
+    @classmethod
+    def from_artifact(cls, arrays, data, fingerprint: str, total_rows: int) -> "SimilarityIndex":
+        return cls(
+            arrays["matrix"],
+            data["features"],
+            np.asarray(arrays["mean"]),
+            np.asarray(arrays["scale"]),
+            fingerprint,
+            total_rows,
+            sq_norms=arrays["sq_norms"],
+        )
+
+    def vector(self, row_id: int) -> np.ndarray:
+        return self.matrix[row_id]
+
+    def standardize(self, values: dict) -> np.ndarray:
+        """Query vector from raw feature values; missing features sit at the mean"""
+        raw = np.array([values.get(f, m) for f, m in zip(self.features, self.mean)])
+        return ((raw - self.mean) / self.scale).astype(np.float32)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        exclude: Optional[np.ndarray] = None,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids and Euclidean distances of the k nearest rows, closest first"""
+        if candidates is None:
+            pool, norms = self.matrix, self.sq_norms
+        else:
+            pool, norms = self.matrix[candidates], self.sq_norms[candidates]
+
+        # ||x - q||^2 up to the constant ||q||^2, which is added back for the winners only
+        distances = pool @ query
+        distances *= -2.0
+        distances += norms
+        excluded = 0
+        if exclude is not None and len(exclude):
+            mask = exclude if candidates is None else np.isin(candidates, exclude)
+            distances[mask] = np.inf
+            excluded = int(np.count_nonzero(np.isinf(distances)))
+
+        k = min(k, len(distances) - excluded)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        row_ids = top if candidates is None else candidates[top]
+        nearest = distances[top] + float(query @ query)
+        return row_ids.astype(np.int64), np.sqrt(np.maximum(nearest, 0.0))
+
+class LSHIndex:
+    """Random-projection LSH buckets over a SimilarityIndex, re-ranked exactly"""
+
+    def __init__(self, index: SimilarityIndex, n_tables=LSH_TABLES, n_bits=LSH_BITS, seed=0):
+        self.index = index
+        self.fingerprint = index.fingerprint
+        self.total_rows = index.total_rows
+
+        rng = np.random.default_rng(seed)
+        dims = index.matrix.shape[1]
+        self.planes = rng.standard_normal((n_tables, dims, n_bits)).astype(np.float32)
+        self.bit_values = (1 << np.arange(n_bits)).astype(np.int32)
+
+        # Per table: row ids sorted by bucket code, and the sorted codes
+        self.orders = []
+        self.codes = []
+        for planes in self.planes:
+            codes = self._hash(index.matrix, planes)
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            self.orders.append(order)
+            self.codes.append(codes[order])
+
+    def to_artifact(self):
+        arrays = {"planes": self.planes}
+        for i, (order, codes) in enumerate(zip(self.orders, self.codes)):
+            arrays[f"order_{i}"] = order
+            arrays[f"codes_{i}"] = codes
+        return arrays, {}
+
+    @classmethod
+    def from_artifact(cls, arrays, index: SimilarityIndex) -> "LSHIndex":
+        """Buckets from saved arrays, skipping hashing and sorting every row"""
+        lsh = cls.__new__(cls)
+        lsh.index = index
+        lsh.fingerprint = index.fingerprint
+        lsh.total_rows = index.total_rows
+        lsh.planes = np.asarray(arrays["planes"])
+        lsh.bit_values = (1 << np.arange(lsh.planes.shape[2])).astype(np.int32)
+        lsh.orders = [arrays[f"order_{i}"] for i in range(len(lsh.planes))]
+        lsh.codes = [arrays[f"codes_{i}"] for i in range(len(lsh.planes))]
+        return lsh
+
+    def _hash(self, vectors: np.ndarray, planes: np.ndarray) -> np.ndarray:
+        return ((vectors @ planes) > 0).astype(np.int32) @ self.bit_values
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        """Union of the query's bucket in every table"""
+        found = []
+        for planes, order, codes in zip(self.planes, self.orders, self.codes):
+            code = self._hash(query[None, :], planes)[0]
+            lo = np.searchsorted(codes, code, side="left")
+            hi = np.searchsorted(codes, code, side="right")
+            found.append(order[lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int32)
+
+    def search(self, query: np.ndarray, k: int = 10, exclude: Optional[np.ndarray] = None):
+        """Approximate top-k; falls back to the exact scan when buckets are too thin"""
+        candidates = self.candidates(query)
+        if len(candidates) < k + (len(exclude) if exclude is not None else 0):
+            return self.index.search(query, k, exclude)
+        return self.index.search(query, k, exclude, candidates=candidates)
+
+# TRACK LOOKUP
+
+class TrackTitles:
+    """Lower-cased title dictionary for resolving "lagu mirip X" to a row"""
+
+    def __init__(self, data, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.total_rows = len(data)
+        if isinstance(data, TrackStore):
+            codes = np.asarray(data.values("track_name"))
+            uniques = data.dictionary("track_name")
+        else:
+            codes, uniques = pd.factorize(data["track_name"])
+        self.titles = pd.Index(pd.Series(uniques, dtype=object).astype(str).str.lower())
+
+        # Rows grouped by title code, so a lookup costs O(matches)
+        self.row_order = np.argsort(codes, kind="stable")
+        self.sorted_codes = codes[self.row_order]
+
+    def rows_matching(self, title: str) -> np.ndarray:
+        """Row ids whose title equals the query, else contains it (case-insensitive)"""
+        title = title.lower().strip()
+        matched = self.titles.get_indexer_for([title])
+        matched = matched[matched >= 0]
+        if len(matched) == 0:
+            matched = np.flatnonzero(self.titles.str.contains(title, regex=False))
+        if len(matched) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        starts = np.searchsorted(self.sorted_codes, matched, side="left")
+        ends = np.searchsorted(self.sorted_codes, matched, side="right")
+        return np.concatenate(
+            [self.row_order[start:end] for start, end in zip(starts, ends)]
+        ).astype(np.int64)
+
+def get_similarity_index(data, kind: Optional[str] = None):
+    """Similarity index for a dataset: "exact" (default) or "lsh" (MOODIFY_SIMILARITY_INDEX)"""
+    fingerprint = ",".join(SIMILARITY_FEATURES)
+    exact = get_dataset_index(
+        data,
+        "similarity",
+        fingerprint,
+        lambda: load_or_build(
+            data,
+            "similarity",
+            fingerprint,
+            load=lambda arrays, meta: SimilarityIndex.from_artifact(
+                arrays, meta, fingerprint, len(data)
+            ),
+            build=lambda: SimilarityIndex.build(data, fingerprint),
+            save=SimilarityIndex.to_artifact,
+        ),
+    )
+    if (kind or SIMILARITY_INDEX).lower() != "lsh":
+        return exact
+    return get_dataset_index(
+        data,
+        "similarity_lsh",
+        fingerprint,
+        lambda: load_or_build(
+            data,
+            "similarity_lsh",
+            f"{fingerprint}/{LSH_TABLES}x{LSH_BITS}",
+            load=lambda arrays, meta: LSHIndex.from_artifact(arrays, exact),
+            build=lambda: LSHIndex(exact),
+            save=LSHIndex.to_artifact,
+        ),
+    )
+
+def get_track_titles(data) -> Optional[TrackTitles]:
+    if "track_name" not in data.columns:
+        return None
+    return get_dataset_index(data, "titles", "track_name", lambda: TrackTitles(data, "track_name"))
+
+def find_track(data, title: str, artist: Optional[str] = None) -> Optional[int]:
+    """Row id of the most popular track matching a title (and artist, if given)"""
+    titles = get_track_titles(data)
+    if titles is None or not title.strip():
+        return None
+
+    row_ids = titles.rows_matching(title)
+    if len(row_ids) == 0:
+        return None
+
+    columns = [col for col in ("artist_name", "popularity") if col in data.columns]
+    if isinstance(data, TrackStore):
+        rows = data.take(row_ids, columns)
+    else:
+        rows = data.iloc[row_ids][columns].set_axis(row_ids)
+
+    if artist and "artist_name" in rows.columns:
+        by_artist = rows["artist_name"].astype(str).str.lower().str.contains(
+            artist.lower().strip(), regex=False
+        )
+        if by_artist.any():
+            rows = rows[by_artist.to_numpy()]
+
+    if "popularity" in rows.columns:
+        return int(rows["popularity"].idxmax())
+    return int(rows.index[0])
+
+def find_similar_rows(data, row_id: int, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest neighbours of a row, excluding the row itself"""
+    index = get_similarity_index(data)
+    exact = index.index if isinstance(index, LSHIndex) else index
+    return index.search(exact.vector(row_id), k, exclude=np.array([row_id]))
+
+def parse_song_query(query: str) -> Tuple[str, Optional[str]]:
+    """Split "judul - artis" / "judul by artis" into (title, artist)"""
+    query = query.strip().strip("\"'")
+    for separator in (" - ", " by ", " dari "):
+        if separator in query.lower():
+            cut = query.lower().index(separator)
+            return query[:cut].strip(), query[cut + len(separator) :].strip()
+    return query, None
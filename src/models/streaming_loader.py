@@ -0,0 +1,244 @@
+"""
+Streaming loader - Chunked CSV ingestion with progressive availability
+Publishes a growing dataset while spotify_data.csv is still being parsed
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.services.debug_logger import log_error, log_system
+
+from .dataset_cache import save_dataset_cache
+from .dataset_registry import DatasetHandle
+from .ingest_schema import read_spotify_csv
+from .mood_index import carry_dataset_indexes
+from .track_store import TrackStore
+
+# Rows per parsed chunk
+CHUNK_ROWS = 100_000
+# Rows needed before the first partial dataset is published
+FIRST_PUBLISH_ROWS = 200_000
+# Parses tried before the load is marked failed
+LOAD_ATTEMPTS = 2
+
+@dataclass
+class LoadMetrics:
+    """Wall time per load phase (download, parse, classify, cache_write, index, ...)"""
+
+    phases: Dict[str, float] = field(default_factory=dict)
+    source: Optional[str] = None
+    # Callers that joined this load instead of starting their own
+    joined: int = 0
+    started_at: float = field(default_factory=time.time)
+    total: Optional[float] = None
+    # Why the columnar cache was not written (the load then serves from memory)
+    cache_error: Optional[str] = None
+    # Data problems found while processing, e.g. missing columns
+    warnings: List[str] = field(default_factory=list)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        self.total = time.time() - self.started_at
+
+    def warn(self, message: str):
+        """Record a processing warning once (chunks repeat the same problem)"""
+        if message not in self.warnings:
+            self.warnings.append(message)
+            log_system(message)
+
+    def as_dict(self) -> Dict:
+        metrics = {"source": self.source, "joined": self.joined, "total_s": self.total}
+        if self.cache_error is not None:
+            metrics["cache_error"] = self.cache_error
+        if self.warnings:
+            metrics["warnings"] = list(self.warnings)
+        metrics.update({f"{name}_s": round(seconds, 3) for name, seconds in self.phases.items()})
+        return metrics
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate processed chunks, merging per-chunk categories instead of decaying to object"""
+    if len(chunks) == 1:
+        return chunks[0]
+
+    first = chunks[0]
+    cat_cols = [
+        col for col in first.columns if isinstance(first[col].dtype, pd.CategoricalDtype)
+    ]
+
+    frame = pd.concat([chunk.drop(columns=cat_cols) for chunk in chunks], ignore_index=True)
+    for col in cat_cols:
+        frame[col] = union_categoricals(
+            [chunk[col] for chunk in chunks], sort_categories=True
+        )
+
+    return frame[first.columns]
+
+class ProgressiveDataset(DatasetHandle):
+    """Dataset handle that grows while the CSV is parsed in a background thread"""
+
+    def __init__(
+        self,
+        file_path: str,
+        process_chunk: Callable[[pd.DataFrame], pd.DataFrame],
+        known_sha256: Optional[str] = None,
+        prepare: Optional[Callable] = None,
+        chunksize: int = CHUNK_ROWS,
+        first_publish_rows: int = FIRST_PUBLISH_ROWS,
+        lock: Optional[Callable[[], ContextManager]] = None,
+        metrics: Optional[LoadMetrics] = None,
+        read_chunks: Optional[Callable[[int], Iterable[pd.DataFrame]]] = None,
+    ):
+        super().__init__()
+        self.file_path = file_path
+        self.process_chunk = process_chunk
+        # Raw chunks of the source; the local CSV unless e.g. an LFS stream is given
+        self.read_chunks = read_chunks
+        self.known_sha256 = known_sha256
+        self.prepare = prepare
+        self.chunksize = chunksize
+        self.first_publish_rows = first_publish_rows
+        # Held while parsing and writing the cache, e.g. a cross-process file lock
+        self.lock = lock or nullcontext
+        self.metrics = metrics or LoadMetrics()
+
+        self.rows_loaded = 0
+        self.complete = False
+        # Set once every attempt failed; rows published before stay readable
+        self.error: Optional[Exception] = None
+
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start parsing in a daemon thread"""
+        self._thread = threading.Thread(
+            target=self._run, name="moodify-csv-loader", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    @property
+    def finished(self) -> bool:
+        """Nothing more will be published: loaded completely or failed"""
+        return self.complete or self.failed
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """Block until the first rows are published (or loading failed)"""
+        self._ready.wait(timeout)
+        return self.current()
+
+    def wait_until_complete(self, timeout: Optional[float] = None):
+        """Block until the full dataset is published"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.current()
+
+    def _publish(self, data, rows: int, complete: bool = False):
+        """Swap in a partial or final dataset together with its progress"""
+        with self._lock:
+            self._data = data
+            self.version += 1
+            self.rows_loaded = rows
+            self.complete = complete
+        self._ready.set()
+
+    def _publish_partial(self, data: pd.DataFrame, rows: int):
+        """Publish a longer partial frame, extending indexes already built on the last one"""
+        previous = self.current()
+        if previous is not None:
+            appended = np.arange(len(previous), len(data))
+            carry_dataset_indexes(previous, data, appended, data.iloc[len(previous) :])
+        self._publish(data, rows)
+
+    def _run(self):
+        for attempt in range(1, LOAD_ATTEMPTS + 1):
+            try:
+                with self.lock():
+                    # A retry must not publish partials shorter than the ones already out
+                    final, rows = self._load_locked(publish_partials=self.current() is None)
+
+                # Build derived indexes before readers can see the full dataset
+                if self.prepare is not None:
+                    with self.metrics.phase("index"):
+                        self.prepare(final)
+
+                self.metrics.finish()
+                self._publish(final, rows, complete=True)
+                return
+
+            except Exception as e:
+                log_error(e, f"Loading {self.file_path} failed (attempt {attempt}/{LOAD_ATTEMPTS})")
+                if attempt == LOAD_ATTEMPTS:
+                    self.metrics.finish()
+                    self.error = e
+                    self._ready.set()
+
+    def _load_locked(self, publish_partials: bool = True):
+        """Parse and cache the CSV, unless another process cached it while we waited"""
+        try:
+            store = TrackStore.open(self.file_path, known_sha256=self.known_sha256)
+        except Exception:
+            store = None
+        if store is not None:
+            self.metrics.source = "cache"
+            return store, len(store)
+
+        chunks: List[pd.DataFrame] = []
+        rows = 0
+        next_publish = self.first_publish_rows
+        if self.read_chunks is not None:
+            reader = iter(self.read_chunks(self.chunksize))
+        else:
+            reader = iter(read_spotify_csv(self.file_path, chunksize=self.chunksize))
+
+        while True:
+            with self.metrics.phase("parse"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            with self.metrics.phase("classify"):
+                chunks.append(self.process_chunk(chunk))
+            rows += len(chunk)
+
+            # Publish at geometric intervals so re-concatenation stays linear overall
+            if publish_partials and rows >= next_publish:
+                self._publish_partial(concat_chunks(chunks), rows)
+                next_publish = rows * 2
+
+        if not chunks:
+            raise ValueError("CSV file is empty")
+
+        full_df = concat_chunks(chunks)
+        chunks.clear()
+
+        # Prefer the shared mapped store once the cache is written
+        final = full_df
+        try:
+            with self.metrics.phase("cache_write"):
+                save_dataset_cache(full_df, self.file_path, known_sha256=self.known_sha256)
+                store = TrackStore.open(self.file_path, known_sha256=self.known_sha256)
+            if store is not None:
+                final = store
+        except Exception as e:
+            log_error(e, f"Writing the dataset cache for {self.file_path} failed, serving from memory")
+            self.metrics.cache_error = str(e)
+
+        self.metrics.source = "csv" if self.read_chunks is None else "stream"
+        return final, rows
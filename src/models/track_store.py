@@ -0,0 +1,208 @@
+"""
+Track store - Shared, read-only view of the music dataset
+Memory-maps the columnar cache so every session and worker shares the same pages
+"""
+
+import os
+import weakref
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .dataset_cache import (
+    CACHE_DIR,
+    DELTA_ROWS_FILE,
+    acquire_reader_lock,
+    get_cache_path,
+    get_current_manifest,
+)
+
+# Retries when the version read from the pointer is pruned before it is locked
+OPEN_ATTEMPTS = 3
+
+class TrackStore:
+    """Read-only column store over memory-mapped NPY files"""
+
+    def __init__(self, cache_path: str, manifest: Dict, reader_lock=None):
+        self.path = cache_path
+        self.version = manifest["source"]["sha256"]
+        self.deltas = list(manifest.get("deltas", []))
+        # Version directory this one was derived from by a delta, if any
+        self.parent = manifest.get("parent")
+        self._rows = manifest["rows"]
+        self._entries = {entry["name"]: entry for entry in manifest["columns"]}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._dictionaries: Dict[str, np.ndarray] = {}
+        self._blobs: Dict[str, tuple] = {}
+        self.columns = pd.Index(list(self._entries))
+        # Held until the store is collected, so the directory is not pruned under it
+        if reader_lock is not None:
+            weakref.finalize(self, reader_lock.close)
+
+    @classmethod
+    def open(
+        cls, file_path: str, cache_dir: str = CACHE_DIR, known_sha256: Optional[str] = None
+    ) -> Optional["TrackStore"]:
+        """Open the current version of the store for a CSV, or None if its cache is missing or stale"""
+        for _ in range(OPEN_ATTEMPTS):
+            cache_path = get_cache_path(file_path, cache_dir)
+            if cache_path is None:
+                return None
+            reader_lock = acquire_reader_lock(cache_path)
+            if reader_lock is None:
+                continue
+            manifest = get_current_manifest(file_path, cache_path, known_sha256)
+            if manifest is not None:
+                return cls(cache_path, manifest, reader_lock)
+            reader_lock.close()
+            # A newer version replaced this one meanwhile: read the pointer again
+            if get_cache_path(file_path, cache_dir) == cache_path:
+                return None
+        return None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, name) -> bool:
+        return name in self._entries
+
+    @property
+    def shape(self):
+        return (self._rows, len(self.columns))
+
+    # RAW ARRAY ACCESS
+
+    def values(self, name: str) -> np.ndarray:
+        """Memory-mapped numeric values, or dictionary codes for string columns"""
+        if name not in self._arrays:
+            entry = self._entries[name]
+            self._arrays[name] = np.load(
+                os.path.join(self.path, f"{entry['file']}.npy"),
+                mmap_mode="r",
+                allow_pickle=False,
+            )
+        return self._arrays[name]
+
+    def is_dictionary(self, name: str) -> bool:
+        """Whether a column is dictionary encoded"""
+        return self._entries[name]["kind"] == "dictionary"
+
+    def dictionary(self, name: str, cache: bool = True) -> np.ndarray:
+        """Decoded dictionary of a string column (object array, code -> value)"""
+        if name in self._dictionaries:
+            return self._dictionaries[name]
+
+        blob, _ = self._blob(name)
+        size = self._entries[name]["size"]
+        categories = bytes(blob).decode("utf-8").split("\x00")[:size] if size else []
+        dictionary = np.asarray(categories, dtype=object)
+        # One-off lookups (e.g. a delta's track_ids) need not keep a large dictionary alive
+        if cache:
+            self._dictionaries[name] = dictionary
+        return dictionary
+
+    def _blob(self, name: str) -> tuple:
+        """Mapped dictionary blob and offsets of a string column"""
+        if name not in self._blobs:
+            base = os.path.join(self.path, self._entries[name]["file"])
+            self._blobs[name] = (
+                np.load(f"{base}.dict.npy", mmap_mode="r", allow_pickle=False),
+                np.load(f"{base}.offsets.npy", mmap_mode="r", allow_pickle=False),
+            )
+        return self._blobs[name]
+
+    def delta_rows(self) -> Optional[np.ndarray]:
+        """Row ids this version changed relative to its parent, None for a full write"""
+        if self.parent is None:
+            return None
+        return np.load(os.path.join(self.path, DELTA_ROWS_FILE), allow_pickle=False)
+
+    def decode(self, name: str, codes: np.ndarray) -> np.ndarray:
+        """Decode a few codes straight from the mapped blob without a full dictionary"""
+        if name in self._dictionaries:
+            codes = np.asarray(codes)
+            decoded = self._dictionaries[name][np.maximum(codes, 0)]
+            # Code -1 marks a missing value
+            decoded[codes < 0] = np.nan
+            return decoded
+
+        blob, offsets = self._blob(name)
+
+        decoded = np.empty(len(codes), dtype=object)
+        for i, code in enumerate(codes):
+            if code < 0:
+                decoded[i] = np.nan
+            else:
+                decoded[i] = bytes(blob[offsets[code] : offsets[code + 1] - 1]).decode("utf-8")
+        return decoded
+
+    def lookup(self, name: str, value) -> int:
+        """Dictionary code of a value, or -1 when it never occurs"""
+        matches = np.flatnonzero(self.dictionary(name) == value)
+        return int(matches[0]) if len(matches) else -1
+
+    def row_ids_where(self, name: str, value) -> np.ndarray:
+        """Row ids where a dictionary column equals `value`"""
+        code = self.lookup(name, value)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.values(name) == code)
+
+    def filter_rows(self, criteria: Dict, row_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row ids whose numeric features fall within inclusive (min, max) ranges"""
+        mask = None
+        for feature, (min_val, max_val) in criteria.items():
+            if feature not in self._entries:
+                continue
+            column = self.values(feature)
+            if row_ids is not None:
+                column = column[row_ids]
+            feature_mask = (column >= min_val) & (column <= max_val)
+            mask = feature_mask if mask is None else mask & feature_mask
+
+        if row_ids is None:
+            return np.arange(self._rows) if mask is None else np.flatnonzero(mask)
+        return row_ids if mask is None else row_ids[mask]
+
+    # PANDAS INTEROP
+
+    def __getitem__(self, name: str) -> pd.Series:
+        """Column as a pandas Series (categorical for dictionary columns)"""
+        values = self.values(name)
+        if not self.is_dictionary(name):
+            return pd.Series(values, name=name, copy=False)
+
+        entry = self._entries[name]
+        categorical = pd.Categorical.from_codes(
+            values, categories=pd.Index(self.dictionary(name)), ordered=entry["ordered"]
+        )
+        return pd.Series(categorical, name=name)
+
+    def take(self, row_ids: Iterable[int], columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Materialize only the requested rows into a small DataFrame"""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        data = {}
+        for name in columns if columns is not None else self.columns:
+            values = np.asarray(self.values(name)[row_ids])
+            if self.is_dictionary(name):
+                values = self.decode(name, values)
+            data[name] = values
+        return pd.DataFrame(data, index=row_ids)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the whole store with the dtypes the loader produced"""
+        data = {}
+        for name in self.columns:
+            entry = self._entries[name]
+            if entry["kind"] == "dictionary" and not entry["categorical"]:
+                # Full dictionary first, so decoding is one vectorized take
+                self.dictionary(name)
+                data[name] = self.decode(name, np.asarray(self.values(name)))
+            else:
+                data[name] = self[name]
+        return pd.DataFrame(data)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Mapped bytes per column (shared page cache, not private heap)"""
+        return {name: int(self.values(name).nbytes) for name in self.columns}
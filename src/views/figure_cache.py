@@ -0,0 +1,77 @@
+"""
+Figure cache - Dashboard figures built once per dataset version
+Figures are reduced server-side, serialized once and sized so a page load stays within budget
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from src.models.mood_index import get_dataset_index
+
+# Bump when a figure's layout changes
+FIGURES_FINGERPRINT = "figures-v2"
+
+# Bytes of figure JSON one dashboard run may send; later figures are skipped
+PAGE_PAYLOAD_CAP = 2 * 1024 * 1024
+
+FigureKey = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+def figure_key(kind: str, **filters) -> FigureKey:
+    """(figure type, filter) part of the cache key; the dataset version is the cache itself"""
+    return kind, tuple(sorted(filters.items()))
+
+class CachedFigure:
+    """A built figure with its serialized Plotly JSON"""
+
+    def __init__(self, figure: go.Figure):
+        self.figure = figure
+        self.spec = figure.to_json()
+        self.payload_bytes = len(self.spec.encode("utf-8"))
+
+class FigureCache:
+    """Figures of one dataset version, keyed by figure type and filter"""
+
+    def __init__(self, total_rows: int):
+        self.fingerprint = FIGURES_FINGERPRINT
+        self.total_rows = total_rows
+        # Figures are only read once cached, so sessions can share them
+        self._figures: Dict[FigureKey, CachedFigure] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: FigureKey, build: Callable[[], go.Figure]) -> CachedFigure:
+        """Cached figure for a key, built and serialized on first use"""
+        with self._lock:
+            cached = self._figures.get(key)
+        if cached is None:
+            built = CachedFigure(build())
+            with self._lock:
+                cached = self._figures.setdefault(key, built)
+        return cached
+
+    def payload_sizes(self) -> Dict[str, int]:
+        """Serialized bytes of every cached figure, by "kind[filter]" """
+        with self._lock:
+            items = list(self._figures.items())
+        return {
+            kind + (str(dict(filters)) if filters else ""): cached.payload_bytes
+            for (kind, filters), cached in items
+        }
+
+def get_figure_cache(data) -> FigureCache:
+    """Figure cache of a dataset version; a new version (delta, partial load) starts empty"""
+    return get_dataset_index(data, "figures", FIGURES_FINGERPRINT, lambda: FigureCache(len(data)))
+
+def cached_figure(data, kind: str, build: Callable[[], go.Figure], **filters) -> CachedFigure:
+    return get_figure_cache(data).get(figure_key(kind, **filters), build)
+
+# REDUCTION
+
+def top_n(counts: pd.Series, n: int, other: Optional[str] = None) -> pd.Series:
+    """The n largest counts; with `other`, the remainder is summed into one extra bar"""
+    top = counts.nlargest(n)
+    if other is not None and len(counts) > n:
+        top = pd.concat([top, pd.Series({other: counts.sum() - top.sum()})])
+    return top
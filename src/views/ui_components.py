@@ -3,6 +3,7 @@ UI components - Main interface elements and data visualization
 Handles charts, statistics, and interactive components
 """
 
+import time
 from typing import Dict
 
 import pandas as pd
@@ -10,10 +11,17 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from plotly.subplots import make_subplots
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from src.models.dashboard_aggregates import get_dashboard_aggregates
+from src.views.figure_cache import PAGE_PAYLOAD_CAP, cached_figure, top_n
 
 
 def render_main_data_analysis(df):
     st.header("🎧 Dataset Analysis")
+
+    # Counts come from the per-version aggregates, not from rescanning df
+    aggregates = get_dashboard_aggregates(df)
     
     # Enhanced metrics with colorful containers
     col1, col2, col3 = st.columns(3)
@@ -28,14 +36,14 @@ def render_main_data_analysis(df):
     with col2:
         st.metric(
             label="🎤 Total Artists", 
-            value=f"{df['artist_name'].nunique():,}",
+            value=f"{aggregates.n_artists:,}",
             delta="Diverse talent!"
         )
     
     with col3:
         st.metric(
             label="🎭 Total Genres",
-            value=f"{df['genre'].nunique():,}",
+            value=f"{aggregates.n_genres:,}",
             delta="Musical variety!"
         )
     
@@ -43,8 +51,59 @@ def render_main_data_analysis(df):
     
     # Enhanced Mood Distribution with custom colors and animation
     st.subheader("🌈 Mood Distribution")
-    mood_counts = df['mood'].value_counts()
+    mood_counts = aggregates.mood_counts()
+    
+    render_figure(df, "mood_distribution", lambda: _mood_figure(mood_counts, len(df)))
+    
+    # Enhanced Genre Distribution with gradient colors and animation
+    st.subheader("🎸 Genre Popularity")
+    genre_counts = top_n(aggregates.genre_counts(), 10)
+    
+    render_figure(
+        df, "genre_popularity", lambda: _genre_figure(genre_counts, len(df)), top=10
+    )
     
+    # Additional fun visualization: Mood vs Genre heatmap
+    st.subheader("🔥 Mood-Genre Correlation Heatmap")
+    
+    # Create cross-tabulation
+    mood_genre_crosstab = aggregates.crosstab()
+
+    # Get top genres for better visualization
+    top_genres = top_n(aggregates.genre_counts(), 8).index
+    mood_genre_subset = mood_genre_crosstab[top_genres]
+
+    render_figure(
+        df, "mood_genre_heatmap", lambda: _heatmap_figure(mood_genre_subset), top=8
+    )
+      # Fun stats section
+    st.markdown("---")
+    st.subheader("🎯 Fun Statistics")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        most_popular_mood = mood_counts.index[0]
+        mood_percentage = (mood_counts.iloc[0] / len(df)) * 100
+        st.markdown(f'<div style="background: #d1ecf1; padding: 1rem; border-radius: 8px; border: 1px solid #bee5eb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎭 Most Popular Mood:</strong> <span style="color: #000000 !important;">{most_popular_mood} ({mood_percentage:.1f}%)</span></div>', unsafe_allow_html=True)
+        
+        most_popular_genre = genre_counts.index[0]
+        genre_percentage = (genre_counts.iloc[0] / len(df)) * 100
+        st.markdown(f'<div style="background: #d4edda; padding: 1rem; border-radius: 8px; border: 1px solid #c3e6cb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎵 Most Popular Genre:</strong> <span style="color: #000000 !important;">{most_popular_genre} ({genre_percentage:.1f}%)</span></div>', unsafe_allow_html=True)
+    
+    with col2:
+        # Calculate some interesting stats
+        unique_combinations = int((mood_genre_crosstab > 0).to_numpy().sum())
+        st.markdown(f'<div style="background: #fff3cd; padding: 1rem; border-radius: 8px; border: 1px solid #ffeaa7; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎨 Unique Mood-Genre Combinations:</strong> <span style="color: #000000 !important;">{unique_combinations}</span></div>', unsafe_allow_html=True)
+        
+        avg_songs_per_artist = len(df) / aggregates.n_artists
+        st.markdown(f'<div style="background: #f8d7da; padding: 1rem; border-radius: 8px; border: 1px solid #f5c6cb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎤 Average Songs per Artist:</strong> <span style="color: #000000 !important;">{avg_songs_per_artist:.1f}</span></div>', unsafe_allow_html=True)
+
+# FIGURES
+# Built from the aggregates and cached per dataset version (see figure_cache)
+
+def _mood_figure(mood_counts: pd.Series, total: int) -> go.Figure:
+    """Donut chart of rows per mood"""
     # Custom color palette for moods
     mood_colors = {
         'Happy': '#FFD700',
@@ -98,7 +157,7 @@ def render_main_data_analysis(df):
         ),
         annotations=[
             dict(
-                text=f'Total<br><b>{len(df):,}</b><br>Songs',
+                text=f'Total<br><b>{total:,}</b><br>Songs',
                 x=0.5, y=0.5,
                 font_size=16,
                 font_color='#2E4057',
@@ -109,13 +168,11 @@ def render_main_data_analysis(df):
         margin=dict(t=80, b=20, l=20, r=120),
         height=500
     )
-    
-    st.plotly_chart(fig_mood, use_container_width=True)
-    
-    # Enhanced Genre Distribution with gradient colors and animation
-    st.subheader("🎸 Genre Popularity")
-    genre_counts = df['genre'].value_counts().nlargest(10)
-    
+
+    return fig_mood
+
+def _genre_figure(genre_counts: pd.Series, total: int) -> go.Figure:
+    """Bar chart of the most common genres"""
     # Create gradient colors for bars
     colors_gradient = px.colors.sequential.Viridis_r[:len(genre_counts)]
     
@@ -135,7 +192,7 @@ def render_main_data_analysis(df):
                           'Songs: %{y}<br>' +
                           'Percentage: %{customdata:.1f}%<br>' +
                           '<extra></extra>',
-            customdata=(genre_counts.values / len(df) * 100)
+            customdata=(genre_counts.values / total * 100)
         )
     ])
     
@@ -182,19 +239,11 @@ def render_main_data_analysis(df):
         marker_line_width=2,
         selector=dict(type="bar")
     )
-    
-    st.plotly_chart(fig_genre, use_container_width=True)
-    
-    # Additional fun visualization: Mood vs Genre heatmap
-    st.subheader("🔥 Mood-Genre Correlation Heatmap")
-    
-    # Create cross-tabulation
-    mood_genre_crosstab = pd.crosstab(df['mood'], df['genre'])
-    
-    # Get top genres for better visualization
-    top_genres = df['genre'].value_counts().head(8).index
-    mood_genre_subset = mood_genre_crosstab[top_genres]
-    
+
+    return fig_genre
+
+def _heatmap_figure(mood_genre_subset: pd.DataFrame) -> go.Figure:
+    """Mood x genre count heatmap"""
     fig_heatmap = go.Figure(data=go.Heatmap(
         z=mood_genre_subset.values,
         x=mood_genre_subset.columns,
@@ -232,61 +281,123 @@ def render_main_data_analysis(df):
         height=400,
         margin=dict(t=80, b=100, l=100, r=40)
     )
-    
-    st.plotly_chart(fig_heatmap, use_container_width=True)
-      # Fun stats section
-    st.markdown("---")
-    st.subheader("🎯 Fun Statistics")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        most_popular_mood = mood_counts.index[0]
-        mood_percentage = (mood_counts.iloc[0] / len(df)) * 100
-        st.markdown(f'<div style="background: #d1ecf1; padding: 1rem; border-radius: 8px; border: 1px solid #bee5eb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎭 Most Popular Mood:</strong> <span style="color: #000000 !important;">{most_popular_mood} ({mood_percentage:.1f}%)</span></div>', unsafe_allow_html=True)
-        
-        most_popular_genre = genre_counts.index[0]
-        genre_percentage = (genre_counts.iloc[0] / len(df)) * 100
-        st.markdown(f'<div style="background: #d4edda; padding: 1rem; border-radius: 8px; border: 1px solid #c3e6cb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎵 Most Popular Genre:</strong> <span style="color: #000000 !important;">{most_popular_genre} ({genre_percentage:.1f}%)</span></div>', unsafe_allow_html=True)
-    
-    with col2:
-        # Calculate some interesting stats
-        unique_combinations = df.groupby(['mood', 'genre']).size().shape[0]
-        st.markdown(f'<div style="background: #fff3cd; padding: 1rem; border-radius: 8px; border: 1px solid #ffeaa7; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎨 Unique Mood-Genre Combinations:</strong> <span style="color: #000000 !important;">{unique_combinations}</span></div>', unsafe_allow_html=True)
-        
-        avg_songs_per_artist = len(df) / df['artist_name'].nunique()
-        st.markdown(f'<div style="background: #f8d7da; padding: 1rem; border-radius: 8px; border: 1px solid #f5c6cb; margin: 0.5rem 0;"><strong style="color: #000000 !important;">🎤 Average Songs per Artist:</strong> <span style="color: #000000 !important;">{avg_songs_per_artist:.1f}</span></div>', unsafe_allow_html=True)
+
+    return fig_heatmap
 
 # MINIMALIST UI COMPONENTS
 
+def _stats_html(items) -> str:
+    """Stats grid markup for (value, label) pairs, with forced black text"""
+    cells = "".join(
+        f"""
+            <div class="stat-item" style="padding: 0 !important;">
+                <span class="stat-value" style="font-size: 2rem !important; font-weight: 300 !important; color: #000000 !important; display: block !important; text-shadow: none !important; -webkit-text-fill-color: #000000 !important; -moz-text-fill-color: #000000 !important;">{value:,}</span>
+                <div class="stat-label" style="font-size: 0.8rem !important; color: #333333 !important; margin-top: 0.25rem !important; text-transform: uppercase !important; letter-spacing: 0.5px !important; text-shadow: none !important; -webkit-text-fill-color: #333333 !important; -moz-text-fill-color: #333333 !important;">{label}</div>
+            </div>"""
+        for value, label in items
+    )
+    return f"""
+    <div class="stats-container" style="background: white !important; border: 1px solid #e0e0e0 !important; border-radius: 12px !important; padding: 2rem !important; margin: 2rem 0 !important;">
+        <div class="stats-grid" style="display: grid !important; grid-template-columns: repeat(auto-fit, minmax(120px, 1fr)) !important; gap: 2rem !important; text-align: center !important;">{cells}
+        </div>
+    </div>
+    """
+
 def render_statistics(df: pd.DataFrame):
-    """Render minimalist app statistics with forced black text"""
+    """Render minimalist dataset statistics with forced black text"""
+    aggregates = get_dashboard_aggregates(df)
+    st.markdown(
+        _stats_html(
+            [
+                (len(df), "Songs"),
+                (aggregates.n_artists, "Artists"),
+                (aggregates.n_genres, "Genres"),
+            ]
+        ),
+        unsafe_allow_html=True,
+    )
+
+def render_session_statistics():
+    """
+    Per-session chat counters; rendered by the chat fragment, so they update
+    on every chat turn instead of waiting for a full rerun
+    """
     analytics = st.session_state.get(
         "analytics", {"total_queries": 0, "recommendations_given": 0}
     )
-
     st.markdown(
-        f"""
-    <div class="stats-container" style="background: white !important; border: 1px solid #e0e0e0 !important; border-radius: 12px !important; padding: 2rem !important; margin: 2rem 0 !important;">
-        <div class="stats-grid" style="display: grid !important; grid-template-columns: repeat(auto-fit, minmax(120px, 1fr)) !important; gap: 2rem !important; text-align: center !important;">
-            <div class="stat-item" style="padding: 0 !important;">
-                <span class="stat-value" style="font-size: 2rem !important; font-weight: 300 !important; color: #000000 !important; display: block !important; text-shadow: none !important; -webkit-text-fill-color: #000000 !important; -moz-text-fill-color: #000000 !important;">{len(df):,}</span>
-                <div class="stat-label" style="font-size: 0.8rem !important; color: #333333 !important; margin-top: 0.25rem !important; text-transform: uppercase !important; letter-spacing: 0.5px !important; text-shadow: none !important; -webkit-text-fill-color: #333333 !important; -moz-text-fill-color: #333333 !important;">Songs</div>
-            </div>
-            <div class="stat-item" style="padding: 0 !important;">
-                <span class="stat-value" style="font-size: 2rem !important; font-weight: 300 !important; color: #000000 !important; display: block !important; text-shadow: none !important; -webkit-text-fill-color: #000000 !important; -moz-text-fill-color: #000000 !important;">{df['artist_name'].nunique():,}</span>
-                <div class="stat-label" style="font-size: 0.8rem !important; color: #333333 !important; margin-top: 0.25rem !important; text-transform: uppercase !important; letter-spacing: 0.5px !important; text-shadow: none !important; -webkit-text-fill-color: #333333 !important; -moz-text-fill-color: #333333 !important;">Artists</div>
-            </div>
-            <div class="stat-item" style="padding: 0 !important;">
-                <span class="stat-value" style="font-size: 2rem !important; font-weight: 300 !important; color: #000000 !important; display: block !important; text-shadow: none !important; -webkit-text-fill-color: #000000 !important; -moz-text-fill-color: #000000 !important;">{df['genre'].nunique():,}</span>
-                <div class="stat-label" style="font-size: 0.8rem !important; color: #333333 !important; margin-top: 0.25rem !important; text-transform: uppercase !important; letter-spacing: 0.5px !important; text-shadow: none !important; -webkit-text-fill-color: #333333 !important; -moz-text-fill-color: #333333 !important;">Genres</div>
-            </div>
-            <div class="stat-item" style="padding: 0 !important;">
-                <span class="stat-value" style="font-size: 2rem !important; font-weight: 300 !important; color: #000000 !important; display: block !important; text-shadow: none !important; -webkit-text-fill-color: #000000 !important; -moz-text-fill-color: #000000 !important;">{analytics['total_queries']:,}</span>
-                <div class="stat-label" style="font-size: 0.8rem !important; color: #333333 !important; margin-top: 0.25rem !important; text-transform: uppercase !important; letter-spacing: 0.5px !important; text-shadow: none !important; -webkit-text-fill-color: #333333 !important; -moz-text-fill-color: #333333 !important;">Queries</div>
-            </div>
-        </div>
-    </div>
-    """,
+        _stats_html(
+            [
+                (analytics.get("total_queries", 0), "Queries"),
+                (analytics.get("llm_calls_saved", 0), "LLM Calls Saved"),
+            ]
+        ),
         unsafe_allow_html=True,
     )
+
+# DASHBOARD ISOLATION
+
+# With st.fragment (Streamlit >= 1.37) chat and dashboard rerun independently
+FRAGMENTS_AVAILABLE = hasattr(st, "fragment")
+
+def isolated(func, run_every=None):
+    """`func` as a fragment that reruns on its own; unchanged without fragment support"""
+    if not FRAGMENTS_AVAILABLE:
+        return func
+    return st.fragment(func, run_every=run_every)
+
+def in_fragment_run() -> bool:
+    """Whether this script run only reruns fragments (st.rerun(scope="fragment") is allowed)"""
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and getattr(ctx, "fragment_ids_this_run", None))
+
+def get_render_metrics() -> Dict:
+    """Per-session dashboard cost and how much of it chat turns skipped"""
+    if "render_metrics" not in st.session_state:
+        st.session_state.render_metrics = {
+            "dashboard_ms": 0.0,
+            "dashboard_runs": 0,
+            "chat_turns": 0,
+            "dashboard_skips": 0,
+            "saved_ms": 0.0,
+            # Figure JSON bytes of the current / last dashboard run
+            "page_bytes": 0,
+            "payload_bytes": 0,
+            "payload_peak_bytes": 0,
+            "figures_capped": 0,
+        }
+    return st.session_state.render_metrics
+
+def render_dashboard(df):
+    """Statistics and charts of a dataset version, timed for get_render_metrics"""
+    metrics = get_render_metrics()
+    metrics["page_bytes"] = 0
+
+    start = time.perf_counter()
+    render_statistics(df)
+    render_main_data_analysis(df)
+
+    metrics["payload_bytes"] = metrics["page_bytes"]
+    metrics["payload_peak_bytes"] = max(metrics["payload_peak_bytes"], metrics["page_bytes"])
+    metrics["dashboard_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    metrics["dashboard_runs"] += 1
+
+def render_figure(df, kind: str, build, **filters):
+    """Plot a cached figure unless it would push this run past PAGE_PAYLOAD_CAP"""
+    cached = cached_figure(df, kind, build, **filters)
+    metrics = get_render_metrics()
+    if metrics["page_bytes"] + cached.payload_bytes > PAGE_PAYLOAD_CAP:
+        metrics["figures_capped"] += 1
+        st.caption("📉 Grafik dilewati supaya halaman tetap ringan.")
+        return
+
+    metrics["page_bytes"] += cached.payload_bytes
+    st.plotly_chart(cached.figure, use_container_width=True)
+
+def record_chat_turn(dashboard_skipped: bool):
+    """Count a chat turn; a skipped dashboard saves what its last render cost"""
+    metrics = get_render_metrics()
+    metrics["chat_turns"] += 1
+    if dashboard_skipped:
+        metrics["dashboard_skips"] += 1
+        metrics["saved_ms"] = round(metrics["saved_ms"] + metrics["dashboard_ms"], 2)
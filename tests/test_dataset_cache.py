@@ -0,0 +1,236 @@
+"""Columnar cache versions, fingerprint invalidation and delta ingestion across processes"""
+
+import gc
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import dataset_cache
+from src.models.data_manager import get_music_loader, ingest_delta, process_music_data
+from src.models.dataset_cache import (
+    get_applied_deltas,
+    get_cache_path,
+    prune_cache_versions,
+    save_dataset_cache,
+)
+from src.models.dataset_loader import DatasetLoader
+from src.models.dataset_registry import pin_dataset, resolve_dataset
+from src.models.ingest_schema import read_spotify_csv
+from src.models.mood_index import MoodIndex, get_mood_index
+from src.models.music_analyzer import MOOD_CRITERIA, prepare_indexes
+from src.models.streaming_loader import ProgressiveDataset
+from src.models.track_store import TrackStore
+
+ROWS = 2000
+CSV = "spotify_data.csv"
+
+
+def _tracks(ids, artists, seed=3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    count = len(ids)
+    return pd.DataFrame(
+        {
+            "artist_name": artists,
+            "track_name": [f"Lagu {i}" for i in ids],
+            "track_id": [f"id{i:05d}" for i in ids],
+            "popularity": rng.integers(0, 101, count),
+            "year": rng.integers(1990, 2024, count),
+            "genre": rng.choice(["pop", "indie", "rock", "jazz"], count),
+            "danceability": rng.random(count).round(3),
+            "energy": rng.random(count).round(3),
+            "loudness": (-rng.random(count) * 30).round(3),
+            "speechiness": rng.random(count).round(3),
+            "acousticness": rng.random(count).round(3),
+            "instrumentalness": rng.random(count).round(3),
+            "liveness": rng.random(count).round(3),
+            "valence": rng.random(count).round(3),
+            "tempo": (60 + rng.random(count) * 120).round(3),
+            "key": rng.integers(0, 12, count),
+            "mode": rng.integers(0, 2, count),
+            "time_signature": 4,
+            "duration_ms": rng.integers(100_000, 300_000, count),
+        }
+    )
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A CSV in a fresh directory; the cache lands in ./.moodify_cache"""
+    monkeypatch.chdir(tmp_path)
+    _tracks(range(ROWS), [f"Artist {100 + i % 700}" for i in range(ROWS)]).to_csv(CSV, index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def loaded(workdir):
+    """Dataset loaded through the shared loader, cache written"""
+    handle = get_music_loader(CSV).handle()
+    if isinstance(handle, ProgressiveDataset):
+        handle.wait_until_complete()
+    assert isinstance(resolve_dataset(handle), TrackStore)
+    return handle
+
+
+@pytest.fixture
+def delta(workdir):
+    """Changes track 5 and adds three tracks by artists that sort before every existing one"""
+    tracks = _tracks([5, ROWS, ROWS + 1, ROWS + 2], ["Artist 1", "Artist 0", "Artist 00", "Artist 000"], seed=9)
+    tracks.to_csv("delta.csv", index=False)
+    return tracks
+
+
+def _other_process_loader():
+    """A second loader of the same file, as another worker process would have"""
+    return DatasetLoader(CSV, process_chunk=process_music_data, prepare=prepare_indexes)
+
+
+# VERSIONS AND INVALIDATION
+
+def test_every_write_is_a_new_version(workdir):
+    frame = process_music_data(read_spotify_csv(CSV))
+
+    first = save_dataset_cache(frame, CSV)
+    store = TrackStore.open(CSV)
+    second = save_dataset_cache(frame, CSV)
+
+    assert os.path.basename(first).endswith("-v1") and os.path.basename(second).endswith("-v2")
+    assert get_cache_path(CSV) == second
+    assert TrackStore.open(CSV).path == second
+
+    # v1 is still mapped by `store`
+    assert prune_cache_versions(CSV) == []
+    assert os.path.isdir(first)
+    del store
+    gc.collect()
+    assert prune_cache_versions(CSV) == [first]
+    assert not os.path.exists(first)
+
+
+def test_changed_csv_invalidates_cache(workdir):
+    save_dataset_cache(process_music_data(read_spotify_csv(CSV)), CSV)
+    assert TrackStore.open(CSV) is not None
+
+    _tracks(range(ROWS), ["Someone Else"] * ROWS).to_csv(CSV, index=False)
+    assert TrackStore.open(CSV) is None
+
+
+def test_touched_csv_keeps_cache_and_refreshes_mtime(workdir):
+    path = save_dataset_cache(process_music_data(read_spotify_csv(CSV)), CSV)
+    stat = os.stat(CSV)
+    os.utime(CSV, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert TrackStore.open(CSV) is not None
+    with open(os.path.join(path, dataset_cache.MANIFEST_FILE), encoding="utf-8") as f:
+        assert json.load(f)["source"]["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+
+def test_other_format_version_is_ignored(workdir):
+    path = save_dataset_cache(process_music_data(read_spotify_csv(CSV)), CSV)
+    manifest_path = os.path.join(path, dataset_cache.MANIFEST_FILE)
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["format_version"] = dataset_cache.CACHE_FORMAT_VERSION - 1
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    assert TrackStore.open(CSV) is None
+
+
+# DELTA INGESTION
+
+def test_delta_upserts_rows_and_is_idempotent(loaded, delta):
+    base = resolve_dataset(loaded)
+    columns = ["track_id", "artist_name", "popularity", "valence"]
+    expected = pd.concat([base.take(range(ROWS), columns), delta[columns].iloc[1:]], ignore_index=True)
+    expected.iloc[5] = delta[columns].iloc[0]
+
+    summary = ingest_delta(loaded, "delta.csv", CSV)
+
+    assert summary["applied"] and summary["cache_written"]
+    assert (summary["updated"], summary["added"], summary["rows"]) == (1, 3, ROWS + 3)
+    store = resolve_dataset(loaded)
+    assert isinstance(store, TrackStore) and store.path != base.path
+    assert store.parent == os.path.basename(base.path)
+    actual = store.take(range(ROWS + 3), columns).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    assert len(get_applied_deltas(CSV)) == 1
+    assert ingest_delta(loaded, "delta.csv", CSV) == {"applied": False, "reason": "already applied"}
+
+
+def test_delta_keeps_existing_dictionary_codes(loaded, delta):
+    base = resolve_dataset(loaded)
+    before = np.asarray(base.values("artist_name"))
+
+    ingest_delta(loaded, "delta.csv", CSV)
+
+    after = np.asarray(resolve_dataset(loaded).values("artist_name"))
+    unchanged = np.arange(ROWS) != 5
+    np.testing.assert_array_equal(after[:ROWS][unchanged], before[unchanged])
+
+
+def test_delta_carries_mood_index(loaded, delta):
+    get_mood_index(resolve_dataset(loaded), MOOD_CRITERIA)
+
+    summary = ingest_delta(loaded, "delta.csv", CSV)
+
+    store = resolve_dataset(loaded)
+    assert "mood" in summary["indexes"]
+    carried = get_mood_index(store, MOOD_CRITERIA)
+    rebuilt = MoodIndex.build(store, MOOD_CRITERIA)
+    for mood in MOOD_CRITERIA:
+        np.testing.assert_array_equal(carried.rows(mood), rebuilt.rows(mood))
+
+
+def test_store_in_another_process_keeps_reading_its_version(loaded, delta):
+    other_loader = _other_process_loader()
+    other_handle = other_loader.handle()
+    other = resolve_dataset(other_handle)
+    # Only the codes are mapped before the delta lands, as in a long-running worker
+    codes = np.asarray(other.values("artist_name")[:3])
+
+    ingest_delta(loaded, "delta.csv", CSV)
+
+    assert list(other.decode("artist_name", codes)) == ["Artist 100", "Artist 101", "Artist 102"]
+    assert len(other) == len(other.values("popularity")) == ROWS
+    assert os.path.isdir(other.path)
+
+    assert other_loader.refresh()
+    refreshed = resolve_dataset(other_handle)
+    assert refreshed.path == get_cache_path(CSV)
+    assert len(refreshed) == ROWS + 3
+    assert list(refreshed.take([ROWS], ["artist_name"])["artist_name"]) == ["Artist 0"]
+    # Nothing new since: a stat, no reload
+    assert not other_loader.refresh()
+
+    # The old version goes once no store maps it any more
+    old_path = other.path
+    del other, other_handle, other_loader, refreshed
+    gc.collect()
+    assert old_path in prune_cache_versions(CSV)
+    assert not os.path.exists(old_path)
+
+
+def test_pinned_run_keeps_version_during_delta(loaded, delta):
+    with pin_dataset(loaded) as pinned:
+        ingest_delta(loaded, "delta.csv", CSV)
+        assert len(resolve_dataset(loaded)) == ROWS
+        assert len(pinned.values("popularity")) == ROWS
+        assert os.path.isdir(pinned.path)
+    assert len(resolve_dataset(loaded)) == ROWS + 3
+
+
+def test_failed_cache_write_serves_delta_from_memory(loaded, delta, monkeypatch):
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr("src.models.data_manager.save_delta_version", disk_full)
+    summary = ingest_delta(loaded, "delta.csv", CSV)
+
+    assert summary["applied"] and not summary["cache_written"]
+    assert "No space left" in summary["cache_error"]
+    data = resolve_dataset(loaded)
+    assert isinstance(data, pd.DataFrame) and len(data) == ROWS + 3
+    assert get_applied_deltas(CSV) == []
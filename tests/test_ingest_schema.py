@@ -0,0 +1,71 @@
+"""Declared schema: compact dtypes, and blank cells in integer columns"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.data_manager import process_music_data
+from src.models.ingest_schema import INT_COLUMNS, SPOTIFY_SCHEMA, read_spotify_csv
+from src.models.streaming_loader import ProgressiveDataset
+
+CSV = """Unnamed: 0,artist_name,track_name,track_id,popularity,year,genre,danceability,energy,loudness,valence,tempo,duration_ms,key
+0,Tulus,Hati-Hati di Jalan,id0,71,2022,pop,0.58,0.42,-7.1,0.31,120.0,242000,5
+1,Hindia,Evaluasi,id1,,2019,indie,0.51,0.63,-6.3,0.44,98.5,215000,-1
+2,Raisa,Kali Kedua,id2,64,2016,pop,0.49,0.37,-8.2,0.28,76.0,,7
+3,Sheila on 7,Dan,id3,80,1999,rock,0.55,0.71,-5.0,0.62,132.2,260000,2
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "spotify_data.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def test_schema_dtypes_and_pruned_columns(tmp_path):
+    path = tmp_path / "clean.csv"
+    path.write_text("\n".join(line for line in CSV.splitlines() if ",," not in line), encoding="utf-8")
+
+    df = read_spotify_csv(str(path))
+
+    assert "Unnamed: 0" not in df.columns
+    for col in df.columns:
+        assert str(df[col].dtype) == SPOTIFY_SCHEMA[col]
+
+
+def test_blank_int_cell_becomes_nan(csv_path):
+    df = read_spotify_csv(csv_path)
+
+    assert df["popularity"].dtype == np.float32 and np.isnan(df["popularity"][1])
+    assert df["duration_ms"].dtype == np.float32 and np.isnan(df["duration_ms"][2])
+    # Complete integer columns keep their declared dtype
+    assert df["year"].dtype == np.int16 and df["key"].dtype == np.int8
+    assert list(df["key"]) == [5, -1, 7, 2]
+
+
+def test_chunked_parse_restores_each_chunk(csv_path):
+    chunks = list(read_spotify_csv(csv_path, chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    assert all(chunk["year"].dtype == np.int16 for chunk in chunks)
+    assert np.isnan(chunks[0]["popularity"][1])
+    assert chunks[1]["duration_ms"].dtype == np.float32
+    for col in INT_COLUMNS:
+        if col in chunks[0]:
+            assert not pd.api.types.is_extension_array_dtype(chunks[0][col])
+
+
+def test_streaming_load_survives_blank_int_cell(csv_path, tmp_path, monkeypatch):
+    # The cache is written next to the test CSV
+    monkeypatch.chdir(tmp_path)
+    dataset = ProgressiveDataset(
+        csv_path, process_chunk=process_music_data, chunksize=2, first_publish_rows=2
+    )
+    dataset.start()
+
+    data = dataset.wait_until_complete()
+
+    assert dataset.error is None and dataset.complete
+    assert len(data) == 4
+    assert "mood" in data.columns
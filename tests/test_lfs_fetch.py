@@ -0,0 +1,260 @@
+"""LFS fetch against a local HTTP stand-in: ranges, resume, sha mismatch and chunked streaming into the loader"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.data_manager import process_music_data
+from src.models.dataset_loader import DatasetLoader
+from src.models.ingest_schema import read_spotify_csv
+from src.models.lfs_fetch import LFSFetchError, fetch_lfs_object, plan_parts, stream_lfs_csv
+from src.models.lfs_handler import stream_from_github_lfs
+from src.models.streaming_loader import ProgressiveDataset, concat_chunks
+from src.models.track_store import TrackStore
+
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d+)")
+PART_SIZE = 4096
+
+
+def _payload(rows: int = 300) -> bytes:
+    """A small Spotify-shaped CSV"""
+    rng = np.random.default_rng(11)
+    frame = pd.DataFrame(
+        {
+            "artist_name": rng.choice(["Tulus", "Hindia", "Raisa", "Sheila on 7"], rows),
+            "track_name": [f"Lagu {i}" for i in range(rows)],
+            "track_id": [f"id{i:05d}" for i in range(rows)],
+            "popularity": rng.integers(0, 101, rows),
+            "year": rng.integers(1990, 2024, rows),
+            "genre": rng.choice(["pop", "indie", "rock", "jazz"], rows),
+            "danceability": rng.random(rows).round(3),
+            "energy": rng.random(rows).round(3),
+            "loudness": (-rng.random(rows) * 30).round(3),
+            "acousticness": rng.random(rows).round(4),
+            "valence": rng.random(rows).round(3),
+            "tempo": (60 + rng.random(rows) * 120).round(3),
+        }
+    )
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body = server.payload
+        header = self.headers.get("Range")
+        server.requests.append(header)
+
+        match = RANGE_HEADER.fullmatch(header or "")
+        if match and server.ranges:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(body) - 1)
+            if start in server.fail_starts:
+                server.fail_starts.discard(start)
+                self._send(500, b"injected failure")
+                return
+            self._send(206, body[start : end + 1], {"Content-Range": f"bytes {start}-{end}/{len(body)}"})
+        elif server.chunked:
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for offset in range(0, len(body), 1000):
+                piece = body[offset : offset + 1000]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send(200, body)
+
+    def _send(self, status: int, body: bytes, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.payload = _payload()
+    httpd.ranges = True
+    httpd.chunked = False
+    httpd.fail_starts = set()
+    httpd.requests = []
+    httpd.oid = hashlib.sha256(httpd.payload).hexdigest()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/spotify_data.csv"
+
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _part_requests(server):
+    """Range requests made for parts (the one-byte probe excluded)"""
+    return [header for header in server.requests if header and header != "bytes=0-0"]
+
+
+def test_plan_parts_covers_every_byte_once():
+    assert plan_parts(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert plan_parts(8, 4) == [(0, 3), (4, 7)]
+    assert plan_parts(0, 4) == []
+
+
+def test_parallel_range_fetch(server, tmp_path):
+    dest = tmp_path / "spotify_data.csv"
+    size = len(server.payload)
+    progress = []
+
+    fetch_lfs_object(
+        server.url, str(dest), server.oid, size, workers=4, part_size=PART_SIZE,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+
+    assert dest.read_bytes() == server.payload
+    assert len(_part_requests(server)) == len(plan_parts(size, PART_SIZE)) > 1
+    assert progress[-1] == (size, size)
+    assert not os.path.exists(f"{dest}.part")
+    assert not os.path.exists(f"{dest}.part.json")
+
+
+def test_interrupted_fetch_resumes_without_refetching_done_parts(server, tmp_path):
+    dest = tmp_path / "spotify_data.csv"
+    size = len(server.payload)
+    parts = plan_parts(size, PART_SIZE)
+    server.fail_starts.add(parts[2][0])
+
+    with pytest.raises(LFSFetchError):
+        fetch_lfs_object(server.url, str(dest), server.oid, size, workers=1, part_size=PART_SIZE)
+
+    assert not dest.exists()
+    with open(f"{dest}.part.json", encoding="utf-8") as f:
+        done = set(json.load(f)["done"])
+    assert 2 not in done and {0, 1} <= done
+
+    server.requests.clear()
+    fetch_lfs_object(server.url, str(dest), server.oid, size, workers=4, part_size=PART_SIZE)
+
+    assert dest.read_bytes() == server.payload
+    refetched = {f"bytes={start}-{end}" for start, end in (parts[i] for i in done)}
+    assert not refetched & set(_part_requests(server))
+    assert len(_part_requests(server)) == len(parts) - len(done)
+
+
+def test_sha_mismatch_discards_download(server, tmp_path):
+    dest = tmp_path / "spotify_data.csv"
+
+    with pytest.raises(LFSFetchError, match="sha256 mismatch"):
+        fetch_lfs_object(
+            server.url, str(dest), "0" * 64, len(server.payload), part_size=PART_SIZE
+        )
+
+    assert not dest.exists()
+    assert not os.path.exists(f"{dest}.part")
+    assert not os.path.exists(f"{dest}.part.json")
+
+
+def test_server_without_ranges_falls_back_to_one_get(server, tmp_path):
+    server.ranges = False
+    dest = tmp_path / "spotify_data.csv"
+
+    fetch_lfs_object(server.url, str(dest), server.oid, len(server.payload), part_size=PART_SIZE)
+
+    assert dest.read_bytes() == server.payload
+    # The probe, then a single plain GET
+    assert server.requests == ["bytes=0-0", None]
+
+
+@pytest.mark.parametrize("chunked", [True, False])
+def test_stream_parses_chunks_while_downloading(server, chunked):
+    server.ranges = False
+    server.chunked = chunked
+    expected = read_spotify_csv(io.BytesIO(server.payload))
+
+    chunks = list(stream_lfs_csv(server.url, oid=server.oid, chunksize=70))
+
+    assert [len(chunk) for chunk in chunks] == [70, 70, 70, 70, 20]
+    pd.testing.assert_frame_equal(concat_chunks(chunks), expected)
+
+
+def test_stream_applies_process_chunk(server):
+    server.chunked = True
+    seen = []
+
+    def process(chunk):
+        seen.append(len(chunk))
+        return chunk.assign(processed=True)
+
+    chunks = list(stream_lfs_csv(server.url, process_chunk=process, chunksize=100))
+
+    assert seen == [100, 100, 100]
+    assert all(chunk["processed"].all() for chunk in chunks)
+
+
+def test_stream_sha_mismatch_raises_after_last_chunk(server):
+    server.chunked = True
+    chunks = []
+
+    with pytest.raises(LFSFetchError, match="sha256 mismatch"):
+        for chunk in stream_lfs_csv(server.url, oid="0" * 64, chunksize=100):
+            chunks.append(chunk)
+
+    assert sum(len(chunk) for chunk in chunks) == 300
+
+
+def _streamed_load(server, tmp_path, monkeypatch, oid):
+    """Load a pointer-only working copy whose download failed, through the loader"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("src.models.lfs_handler.lfs_media_url", lambda path: server.url)
+    pointer = tmp_path / "spotify_data.csv"
+    pointer.write_text(
+        f"version https://git-lfs.github.com/spec/v1\noid sha256:{oid}\nsize {len(server.payload)}\n",
+        encoding="utf-8",
+    )
+    loader = DatasetLoader(
+        "spotify_data.csv",
+        process_chunk=process_music_data,
+        fetch_source=lambda path: (False, oid),
+        stream_source=stream_from_github_lfs,
+    )
+    dataset = loader.handle()
+    assert isinstance(dataset, ProgressiveDataset)
+    dataset.wait_until_complete()
+    return dataset
+
+
+def test_failed_download_streams_into_loader(server, tmp_path, monkeypatch):
+    server.chunked = True
+
+    dataset = _streamed_load(server, tmp_path, monkeypatch, server.oid)
+
+    assert dataset.complete and dataset.error is None
+    assert dataset.metrics.source == "stream"
+    assert len(dataset.current()) == 300
+    assert "mood" in dataset.current().columns
+    # Cached under the pointer's oid: the next start maps it without the network
+    assert TrackStore.open("spotify_data.csv", known_sha256=server.oid) is not None
+
+
+def test_streamed_sha_mismatch_is_not_cached(server, tmp_path, monkeypatch):
+    server.chunked = True
+
+    dataset = _streamed_load(server, tmp_path, monkeypatch, "0" * 64)
+
+    assert dataset.failed and "sha256 mismatch" in str(dataset.error)
+    assert TrackStore.open("spotify_data.csv") is None
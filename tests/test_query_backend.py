@@ -0,0 +1,77 @@
+"""Polars backend parity: same filtered row sets as the pandas reference"""
+
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+from src.models.music_analyzer import MOOD_CRITERIA
+from src.models.query_backend import PandasBackend, PolarsBackend
+
+FEATURES = sorted({feature for criteria in MOOD_CRITERIA.values() for feature in criteria})
+
+
+def _frame(dtype) -> pd.DataFrame:
+    """Random rows plus every range boundary, values just outside it and NaNs"""
+    rng = np.random.default_rng(7)
+    columns = {}
+    for feature in FEATURES:
+        bounds = [
+            value
+            for criteria in MOOD_CRITERIA.values()
+            if feature in criteria
+            for value in criteria[feature]
+        ]
+        low, high = min(bounds), max(bounds)
+        edges = [edge + delta for edge in bounds for delta in (-1e-3, 0.0, 1e-3)]
+        random = rng.uniform(low - (high - low) * 0.1, high + (high - low) * 0.1, 500)
+        values = np.concatenate([random, edges, [np.nan] * 5])
+        columns[feature] = rng.permutation(values)
+    length = min(len(values) for values in columns.values())
+    return pd.DataFrame({f: v[:length] for f, v in columns.items()}).astype(dtype)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+@pytest.mark.parametrize("mood", sorted(MOOD_CRITERIA))
+def test_polars_matches_pandas(mood, dtype):
+    data = _frame(dtype)
+    criteria = MOOD_CRITERIA[mood]
+    expected = np.sort(PandasBackend().filter_rows(data, criteria))
+    actual = np.sort(PolarsBackend().filter_rows(data, criteria))
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_nan_rows_never_match():
+    data = pd.DataFrame({"valence": [np.nan, 0.6, 0.5], "energy": [0.5, np.nan, 0.5]})
+    criteria = {"valence": (0.5, 1.0), "energy": (0.4, 1.0)}
+    for backend in (PandasBackend(), PolarsBackend()):
+        assert backend.filter_rows(data, criteria).tolist() == [2]
+
+
+def test_missing_features_are_ignored():
+    data = pd.DataFrame({"valence": [0.1, 0.9]})
+    criteria = {"valence": (0.5, 1.0), "tempo": (80, 200)}
+    assert PolarsBackend().filter_rows(data, criteria).tolist() == [1]
+    assert PolarsBackend().filter_rows(data, {"tempo": (80, 200)}).tolist() == [0, 1]
+
+
+def test_dead_datasets_are_evicted():
+    backend = PolarsBackend()
+    data = _frame("float32")
+    backend.filter_rows(data, MOOD_CRITERIA["happy"])
+    assert len(backend._columns) == 1
+
+    del data
+    gc.collect()
+    assert backend._columns == {}
+
+
+def test_check_backend_parity_reports_every_mood():
+    from src.models.query_backend import check_backend_parity
+
+    assert check_backend_parity(_frame("float32"), MOOD_CRITERIA) == {
+        mood: True for mood in MOOD_CRITERIA
+    }
@@ -0,0 +1,69 @@
+"""Background load: cache-write failures and data warnings reach the load metrics"""
+
+import pytest
+
+from src.models.data_manager import process_music_data
+from src.models.dataset_loader import DatasetLoader
+from src.models.streaming_loader import ProgressiveDataset
+
+HEADER = "artist_name,track_name,track_id,popularity,genre,danceability,energy,valence,tempo"
+ROWS = [
+    "Tulus,Hati-Hati di Jalan,id0,71,pop,0.58,0.42,0.31,120.0",
+    "Hindia,Evaluasi,id1,55,indie,0.51,0.63,0.44,98.5",
+    "Raisa,Kali Kedua,id2,64,pop,0.49,0.37,0.28,76.0",
+]
+
+
+def _load(path) -> ProgressiveDataset:
+    loader = DatasetLoader(str(path), process_chunk=process_music_data)
+    dataset = loader.handle()
+    assert isinstance(dataset, ProgressiveDataset)
+    dataset.wait_until_complete()
+    return dataset
+
+
+@pytest.fixture
+def no_streamlit_warning(monkeypatch):
+    """Fail if the loader thread calls st.warning (dropped without a ScriptRunContext)"""
+    def fail(message):
+        raise AssertionError(f"st.warning called from the loader: {message}")
+
+    monkeypatch.setattr("src.models.data_manager.st.warning", fail)
+
+
+def test_cache_write_failure_is_recorded(tmp_path, monkeypatch, no_streamlit_warning):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "spotify_data.csv"
+    path.write_text("\n".join([HEADER, *ROWS]), encoding="utf-8")
+    logged = []
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr("src.models.streaming_loader.save_dataset_cache", disk_full)
+    monkeypatch.setattr(
+        "src.models.streaming_loader.log_error", lambda error, context="": logged.append(context)
+    )
+
+    dataset = _load(path)
+
+    assert dataset.complete and dataset.error is None
+    assert len(dataset.current()) == 3
+    assert "No space left" in dataset.metrics.cache_error
+    assert "No space left" in dataset.metrics.as_dict()["cache_error"]
+    assert any("cache" in context for context in logged)
+
+
+def test_missing_columns_warn_through_metrics(tmp_path, monkeypatch, no_streamlit_warning):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "spotify_data.csv"
+    header = HEADER.replace(",valence", "")
+    rows = [",".join(row.split(",")[:7] + row.split(",")[8:]) for row in ROWS]
+    path.write_text("\n".join([header, *rows]), encoding="utf-8")
+
+    dataset = _load(path)
+
+    assert dataset.complete
+    assert "mood" not in dataset.current().columns
+    assert len(dataset.metrics.warnings) == 1
+    assert "valence" in dataset.metrics.warnings[0]